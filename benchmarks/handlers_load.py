@@ -0,0 +1,357 @@
+"""
+Load test of the bot handlers with a fake Telegram transport.
+
+Synthetic updates go through the real `apps.register_handlers` / `admin.register_handlers`
+and middlewares, Telegram API calls are answered in process by `FakeTelegram`. Every
+(backend, traffic mix) pair runs on a fresh synthetic dataset, see db/synthetic.py, and
+reports p50/p99 latency, updates per second and SQL statements per update. The results
+are written as JSON, pass an earlier file as `--baseline` to compare two commits.
+
+Run from the repository root: `python benchmarks/handlers_load.py --updates 500`
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("BOT_TOKEN", "1:benchmark")
+
+import telebot  # noqa: E402
+from telebot import apihelper  # noqa: E402
+from telebot.states.sync.middleware import StateMiddleware  # noqa: E402
+from telebot.types import Update  # noqa: E402
+
+from tablettop_bot.api.handlers import admin, apps  # noqa: E402
+from tablettop_bot.api.handlers.apps import join_game  # noqa: E402
+from tablettop_bot.api.middlewares.user import UserCallbackMiddleware, UserMessageMiddleware  # noqa: E402
+from tablettop_bot.api.outbound import outbound  # noqa: E402
+from tablettop_bot.db import crud, database, instrumentation, synthetic  # noqa: E402
+from tablettop_bot.db.catalog import catalog  # noqa: E402
+
+BACKENDS = ["sqlite-file", "sqlite-memory"]
+
+# Relative weights of the scenarios in each traffic mix
+MIXES = {
+    "start": {"start": 1},
+    "browse": {"start": 4, "enroll_page": 3, "my_games": 3},
+    "enroll": {"start": 2, "enroll_game": 6, "my_games": 2},
+    "host": {"host_flow": 1},
+    "mixed": {"start": 4, "enroll_page": 2, "enroll_game": 2, "my_games": 2, "host_flow": 1},
+}
+
+WARMUP_UPDATES = 20
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class FakeResponse:
+    """The part of `requests.Response` telebot reads."""
+
+    def __init__(self, payload: dict):
+        self.status_code = 200
+        self.text = json.dumps(payload)
+        self._payload = payload
+
+    def json(self) -> dict:
+        return self._payload
+
+
+class FakeTelegram:
+    """In-process Telegram Bot API, installed as `apihelper.CUSTOM_REQUEST_SENDER`."""
+
+    BOT_USER = {"id": 1, "is_bot": True, "first_name": "Benchmark", "username": "benchmark_bot"}
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1_000_000)
+
+    def __call__(self, method, url, params=None, files=None, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls[api_method] += 1
+        return FakeResponse({"ok": True, "result": self.result(api_method, params or {})})
+
+    def result(self, api_method: str, params: dict):
+        if api_method == "getMe":
+            return self.BOT_USER
+        if api_method in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            return {
+                "message_id": int(params.get("message_id") or next(self._message_ids)),
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id") or 0), "type": "private"},
+                "from": self.BOT_USER,
+                "text": params.get("text", ""),
+            }
+        if api_method == "getChatMember":
+            user_id = int(params["user_id"])
+            return {"status": "member", "user": make_user(user_id)}
+        return True
+
+
+def make_user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"Игрок {user_id}", "username": f"player{user_id}"}
+
+
+class TrafficGenerator:
+    """Seeded stream of synthetic updates, grouped into scenarios."""
+
+    def __init__(self, rng: random.Random, users: range, game_ids: range, game_keys: list[str]):
+        self.rng = rng
+        self.users = users
+        self.game_ids = game_ids
+        self.game_keys = game_keys
+        self._update_ids = itertools.count(1)
+
+    def user_id(self) -> int:
+        return self.users[self.rng.randrange(len(self.users))]
+
+    def message(self, user_id: int, text: str) -> Update:
+        update_id = next(self._update_ids)
+        return Update.de_json({
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "username": f"player{user_id}"},
+                "from": make_user(user_id),
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+            },
+        })
+
+    def callback(self, user_id: int, data: str) -> Update:
+        update_id = next(self._update_ids)
+        return Update.de_json({
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": make_user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {
+                    "message_id": update_id,
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private", "username": f"player{user_id}"},
+                    "from": FakeTelegram.BOT_USER,
+                    "text": "",
+                },
+            },
+        })
+
+    def scenario(self, name: str) -> list[Update]:
+        """Updates one user sends in a scenario."""
+        user_id = self.user_id()
+        if name == "start":
+            return [self.message(user_id, "/start")]
+        if name == "enroll_page":
+            return [self.callback(user_id, "enroll")]
+        if name == "enroll_game":
+            return [self.callback(user_id, f"enroll_game_{self.rng.choice(self.game_keys)}")]
+        if name == "my_games":
+            return [self.callback(user_id, "my_games")]
+        if name == "host_flow":
+            day = date.today() + timedelta(days=self.rng.randrange(1, 14))
+            slot = f"{self.rng.randrange(10, 24):02d}:{self.rng.choice((0, 30)):02d}"
+            return [
+                self.message(user_id, "/host_game"),
+                self.callback(user_id, f"select_game_{self.rng.choice(self.game_ids)}"),
+                self.callback(user_id, f"date_{day}"),
+                self.callback(user_id, f"time_{slot}"),
+                self.callback(user_id, "steam_no"),
+                self.callback(user_id, "repeat_no"),
+            ]
+        raise ValueError(f"Unknown scenario {name}")
+
+    def stream(self, mix: dict[str, int], n_updates: int):
+        """Yield (scenario, update) pairs until `n_updates` updates have been produced."""
+        names, weights = list(mix), list(mix.values())
+        produced = 0
+        while produced < n_updates:
+            name = self.rng.choices(names, weights)[0]
+            for update in self.scenario(name):
+                if produced >= n_updates:
+                    return
+                produced += 1
+                yield name, update
+
+
+def create_bot() -> telebot.TeleBot:
+    """Bot wired like `api.bot.start_bot`, without polling, antiflood or background workers."""
+    bot = telebot.TeleBot(os.environ["BOT_TOKEN"], threaded=False, use_class_middlewares=True)
+    apps.register_handlers(bot)
+    admin.register_handlers(bot)
+    bot.setup_middleware(UserMessageMiddleware(bot))
+    bot.setup_middleware(UserCallbackMiddleware(bot))
+    bot.setup_middleware(StateMiddleware(bot))
+    bot.add_custom_filter(telebot.custom_filters.StateFilter(bot))
+    return bot
+
+
+def open_database(backend: str, tmp_dir: str, run: int):
+    """Point the app at a fresh database. Return a connection that keeps an in-memory database alive."""
+    keeper = None
+    if backend == "sqlite-file":
+        database.DATABASE_URL = f"sqlite:///{os.path.join(tmp_dir, f'bench_{run}.db')}"
+    else:
+        name = f"file:handlers_bench_{run}?mode=memory&cache=shared"
+        keeper = sqlite3.connect(name, uri=True)
+        database.DATABASE_URL = f"sqlite:///{name}&uri=true"
+    database.create_tables()
+    catalog.invalidate()
+    join_game.schedule_cache.invalidate()
+    return keeper
+
+
+def summarize(latencies: list[float], queries: list[int]) -> dict:
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "updates": len(latencies),
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "mean": round(float(latencies_ms.mean()), 3),
+        },
+        "queries_per_update": {"mean": round(float(np.mean(queries)), 2), "max": int(np.max(queries))},
+    }
+
+
+def run(bot, telegram: FakeTelegram, backend: str, mix_name: str, args, tmp_dir: str, run_index: int) -> dict:
+    keeper = open_database(backend, tmp_dir, run_index)
+    try:
+        generated = synthetic.generate(synthetic.SCALES[args.scale], args.seed)
+        game_keys = [game.key for game in crud.get_scheduled_games()]
+        traffic = TrafficGenerator(random.Random(args.seed), generated.users, generated.games, game_keys)
+
+        for _, update in traffic.stream(MIXES[mix_name], WARMUP_UPDATES):
+            bot.process_new_updates([update])
+
+        telegram.calls.clear()
+        latencies, queries, errors = [], [], 0
+        by_scenario = defaultdict(lambda: ([], []))
+        started = time.perf_counter()
+        for scenario, update in traffic.stream(MIXES[mix_name], args.updates):
+            stats = instrumentation.start_tracking(scenario)
+            update_started = time.perf_counter()
+            try:
+                bot.process_new_updates([update])
+            except Exception as e:
+                errors += 1
+                logging.getLogger(__name__).debug(f"Update failed in {scenario}: {e}")
+            finally:
+                elapsed = time.perf_counter() - update_started
+                instrumentation.stop_tracking(stats)
+            latencies.append(elapsed)
+            queries.append(stats.count)
+            by_scenario[scenario][0].append(elapsed)
+            by_scenario[scenario][1].append(stats.count)
+        total = time.perf_counter() - started
+
+        return {
+            "backend": backend,
+            "mix": mix_name,
+            "seconds": round(total, 3),
+            "updates_per_second": round(len(latencies) / total, 1),
+            "errors": errors,
+            **summarize(latencies, queries),
+            "api_calls": dict(telegram.calls),
+            "scenarios": {name: summarize(*values) for name, values in sorted(by_scenario.items())},
+        }
+    finally:
+        if keeper is not None:
+            keeper.close()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: list[dict], baseline: dict | None) -> None:
+    previous = {(r["backend"], r["mix"]): r for r in (baseline or {}).get("results", [])}
+    print(f"{'backend':>14} {'mix':>8} {'upd/s':>8} {'p50, ms':>9} {'p99, ms':>9} {'queries':>8} {'errors':>7}")
+    for result in results:
+        line = (
+            f"{result['backend']:>14} {result['mix']:>8} {result['updates_per_second']:>8.1f} "
+            f"{result['latency_ms']['p50']:>9.3f} {result['latency_ms']['p99']:>9.3f} "
+            f"{result['queries_per_update']['mean']:>8.2f} {result['errors']:>7}"
+        )
+        before = previous.get((result["backend"], result["mix"]))
+        if before:
+            line += (
+                f"   vs {baseline.get('commit')}: upd/s x{result['updates_per_second'] / before['updates_per_second']:.2f}, "
+                f"p99 x{result['latency_ms']['p99'] / max(before['latency_ms']['p99'], 1e-9):.2f}, "
+                f"queries {result['queries_per_update']['mean'] - before['queries_per_update']['mean']:+.2f}"
+            )
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--mix", nargs="+", choices=list(MIXES), default=list(MIXES))
+    parser.add_argument("--updates", type=int, default=500, help="measured updates per run")
+    parser.add_argument("--scale", choices=list(synthetic.SCALES), default="1k", help="synthetic dataset size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON results file, by default benchmarks/results/handlers_<commit>_<time>.json")
+    parser.add_argument("--baseline", help="earlier JSON results to compare with")
+    parser.add_argument("--verbose", action="store_true", help="keep the per-update INFO logs of the app")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    telegram = FakeTelegram()
+    apihelper.CUSTOM_REQUEST_SENDER = telegram
+    # Fake calls cost nothing, the rate limits would only measure sleeping
+    outbound.configure(workers=1, global_rate=1e9, chat_rate=1e9, chat_burst=1e9, max_retries=0)
+    bot = create_bot()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for run_index, (backend, mix_name) in enumerate(itertools.product(args.backend, args.mix)):
+            results.append(run(bot, telegram, backend, mix_name, args, tmp_dir, run_index))
+
+    commit = git_commit()
+    report = {
+        "benchmark": "handlers_load",
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "parameters": {
+            "updates": args.updates, "scale": args.scale, "seed": args.seed,
+        },
+        "results": results,
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"handlers_{commit or 'unknown'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark of the read-only row tuples against ORM instances on the hot read paths.
+
+Each path reads the same rows of a synthetic dataset, see db/synthetic.py, once as ORM
+instances and once as the tuples of db/read_models.py, and reports the CPU time and the
+peak memory allocated per call, which is per update for the middleware, board and my games.
+
+Run from the repository root: `python benchmarks/read_models.py --scale 1k`
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tablettop_bot.db import crud, database, synthetic  # noqa: E402
+from tablettop_bot.db.models import Game, GameSeries, ScheduledGame  # noqa: E402
+from tablettop_bot.db.read_models import (  # noqa: E402
+    GameRow,
+    ScheduledGameRow,
+    SeriesRow,
+    read_rows,
+    select_rows,
+)
+
+
+def orm_board():
+    db = database.get_session()
+    try:
+        now = datetime.now(timezone.utc)
+        return db.query(ScheduledGame).filter(ScheduledGame.datetime >= now).all(), db.query(GameSeries).all()
+    finally:
+        db.close()
+
+
+def rows_board():
+    db = database.get_session()
+    try:
+        now = datetime.now(timezone.utc)
+        return (
+            read_rows(db, ScheduledGameRow, select_rows(ScheduledGameRow, ScheduledGame).where(ScheduledGame.datetime >= now)),
+            read_rows(db, SeriesRow, select_rows(SeriesRow, GameSeries)),
+        )
+    finally:
+        db.close()
+
+
+def orm_library():
+    db = database.get_session()
+    try:
+        return db.query(Game).order_by(Game.name, Game.id).all()
+    finally:
+        db.close()
+
+
+def rows_library():
+    db = database.get_session()
+    try:
+        return read_rows(db, GameRow, select_rows(GameRow, Game).order_by(Game.name, Game.id))
+    finally:
+        db.close()
+
+
+def orm_my_games(user_id: int):
+    db = database.get_session()
+    try:
+        return db.query(ScheduledGame).filter(ScheduledGame.initiator_id == user_id).all()
+    finally:
+        db.close()
+
+
+def rows_my_games(user_id: int):
+    db = database.get_session()
+    try:
+        return read_rows(db, ScheduledGameRow, select_rows(ScheduledGameRow, ScheduledGame).where(
+            ScheduledGame.initiator_id == user_id
+        ))
+    finally:
+        db.close()
+
+
+def measure(function, *args, repeat: int) -> tuple[float, float]:
+    """Return the CPU milliseconds and the peak KiB allocated by one call."""
+    function(*args)
+    start = time.process_time()
+    for _ in range(repeat):
+        function(*args)
+    cpu_ms = (time.process_time() - start) / repeat * 1000
+
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu_ms, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(synthetic.SCALES), default="1k", help="synthetic dataset size")
+    parser.add_argument("--repeat", type=int, default=50, help="calls per path for the CPU time")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database.DATABASE_URL = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+        database.create_tables()
+        generated = synthetic.generate(synthetic.SCALES[args.scale], seed=args.seed, engine=database.get_engine())
+        user_id = generated.users[0]
+        username = f"player{user_id}"
+
+        paths = [
+            ("middleware", (crud.upsert_user, user_id, username), (crud.touch_user, user_id, username)),
+            ("board", (orm_board,), (rows_board,)),
+            ("library", (orm_library,), (rows_library,)),
+            ("my games", (orm_my_games, user_id), (rows_my_games, user_id)),
+        ]
+        print(f"{'path':>10} {'ORM, ms':>9} {'rows, ms':>9} {'ORM, KiB':>9} {'rows, KiB':>10}")
+        for name, (orm_function, *orm_args), (rows_function, *rows_args) in paths:
+            orm = measure(orm_function, *orm_args, repeat=args.repeat)
+            rows = measure(rows_function, *rows_args, repeat=args.repeat)
+            print(f"{name:>10} {orm[0]:>9.3f} {rows[0]:>9.3f} {orm[1]:>9.1f} {rows[1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
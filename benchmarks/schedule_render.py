@@ -0,0 +1,47 @@
+"""
+Benchmark of the /start schedule board with and without the render cache.
+
+Run from the repository root: `python benchmarks/schedule_render.py`
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tablettop_bot.api.handlers.apps import join_game  # noqa: E402
+from tablettop_bot.db import crud, database  # noqa: E402
+from tablettop_bot.db.catalog import catalog  # noqa: E402
+
+GAME_COUNTS = [10, 100, 1000]
+REPEAT = 200
+
+
+def populate(n_games: int) -> None:
+    game = crud.add_game("Benchmark game", 1, 6, link="https://boardgamegeek.com")
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    for i in range(n_games):
+        crud.schedule_game(game.id, start + timedelta(days=i % 8, minutes=i), i, f"user{i}", False, None, None)
+
+
+def main():
+    print(f"{'games':>6} {'render, ms':>12} {'cached, ms':>12} {'hit ratio':>10}")
+    for n_games in GAME_COUNTS:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database.DATABASE_URL = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+            database.create_tables()
+            catalog.invalidate()
+            join_game.schedule_cache.invalidate()
+            populate(n_games)
+
+            join_game.schedule_cache.get()
+            render_ms = timeit.timeit(join_game.render_schedule, number=REPEAT // 10) / (REPEAT // 10) * 1000
+            cached_ms = timeit.timeit(join_game.schedule_cache.get, number=REPEAT) / REPEAT * 1000
+            print(f"{n_games:>6} {render_ms:>12.3f} {cached_ms:>12.4f} {join_game.schedule_cache.hit_ratio:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
 import logging
 import logging.config
 import os
-from time import sleep
 
-import requests
+import schedule as sc
 import telebot
 from dotenv import find_dotenv, load_dotenv
 from omegaconf import OmegaConf
@@ -11,7 +10,17 @@ from telebot.states.sync.middleware import StateMiddleware
 
 from tablettop_bot.api.handlers import admin, apps
 from tablettop_bot.api.middlewares.antiflood import AntifloodMiddleware
+from tablettop_bot.api.middlewares.query_budget import QueryBudgetMiddleware
 from tablettop_bot.api.middlewares.user import UserCallbackMiddleware, UserMessageMiddleware
+from tablettop_bot.api.outbound import outbound
+from tablettop_bot.api.polling import PollingSupervisor
+from tablettop_bot.core.archive import ArchiveJob
+from tablettop_bot.core.jobs import jobs
+from tablettop_bot.core.lifecycle import lifecycle
+from tablettop_bot.core.notifications import notifier
+from tablettop_bot.core.reminders import ReminderService
+from tablettop_bot.core.stats import StatsRollupJob
+from tablettop_bot.db import database
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,13 +37,56 @@ if BOT_TOKEN is None:
 def start_bot():
     logger.info(f"Starting {config.name} v{config.version}")
 
-    bot = telebot.TeleBot(BOT_TOKEN, use_class_middlewares=True)
+    # The polling supervisor runs the handlers in its own worker threads
+    bot = telebot.TeleBot(BOT_TOKEN, threaded=False, use_class_middlewares=True)
+    supervisor = PollingSupervisor(bot, **config.polling)
 
-    # handlers
+    # shutdown steps run in this order on SIGTERM, the update intake stops first
+    lifecycle.configure(config.shutdown.timeout_seconds)
+    lifecycle.on_stop("updates", supervisor.stop)
+
+    # outbound API calls
+    outbound.configure(**config.outbound)
+    outbound.start()
+    notifier.start(bot)
+
+    # background jobs of the handlers
+    jobs.configure(dict(config.jobs.queues), config.jobs.process_workers, config.jobs.retry_seconds)
+    jobs.start()
+
+    # reminders, run by the scheduler loop in main.py
+    if config.reminders.enabled:
+        reminders = ReminderService(bot, list(config.reminders.lead_minutes))
+        sc.every(config.reminders.interval_seconds).seconds.do(reminders.run_once)
+        logger.info(f"Reminders enabled {list(config.reminders.lead_minutes)} minutes before games")
+
+    # archival of played games, run by the scheduler loop in main.py
+    if config.archive.enabled:
+        archive = ArchiveJob(config.archive.grace_minutes, config.archive.batch_size)
+        sc.every(config.archive.interval_minutes).minutes.do(archive.run_once)
+        logger.info(f"Archiving games {config.archive.grace_minutes} minutes after they start")
+
+    # rollups read by the /stats admin report
+    if config.stats.enabled:
+        sc.every(config.stats.refresh_minutes).minutes.do(StatsRollupJob().run_once)
+        logger.info(f"Stats rollups refreshed every {config.stats.refresh_minutes} minutes")
+
+    # handlers, they register the steps that flush their own buffers
     apps.register_handlers(bot)
     admin.register_handlers(bot)
+    lifecycle.on_stop("notifications", notifier.stop)
+    lifecycle.on_stop("jobs", jobs.stop)
+    lifecycle.on_stop("scheduled tasks", lambda timeout: sc.clear())
+    # last, the steps before send through it
+    lifecycle.on_stop("outbound", outbound.stop)
+    lifecycle.on_stop("database", lambda timeout: database.dispose_engine())
 
     # middlewares
+    if config.query_budget.enabled:
+        logger.info(f"Query budget middleware enabled with budget: {config.query_budget.max_queries} statements")
+        bot.setup_middleware(
+            QueryBudgetMiddleware(bot, config.query_budget.max_queries, config.query_budget.n_plus_one_threshold)
+        )
     if config.antiflood.enabled:
         logger.info(f"Antiflood middleware enabled with time window: {config.antiflood.time_window_seconds} seconds")
         bot.setup_middleware(AntifloodMiddleware(bot, config.antiflood.time_window_seconds))
@@ -45,14 +97,10 @@ def start_bot():
     # Add custom filters
     bot.add_custom_filter(telebot.custom_filters.StateFilter(bot))
 
-    logger.info(f"Bot {bot.get_me().username} has started")
-    while True:
-        try:
-            bot.polling(none_stop=True, interval=0, timeout=60, long_polling_timeout=60)
-        except requests.exceptions.ReadTimeout:
-            print("Read timeout occurred. Retrying...")
-            sleep(15)
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}. Retrying in 15 seconds...")
-            sleep(15)
+    logger.info("Bot has started")
+    try:
+        supervisor.run()
+    finally:
+        # Polling only returns before the shutdown when the token is rejected or it crashed, then nothing can work
+        lifecycle.stopping.set()
 
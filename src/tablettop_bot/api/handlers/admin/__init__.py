@@ -1,4 +1,4 @@
-from tablettop_bot.api.handlers.admin import about, db, grant_admin, menu, public_message
+from tablettop_bot.api.handlers.admin import about, db, grant_admin, jobs, menu, public_message, stats
 
 
 def register_handlers(bot):
@@ -7,3 +7,5 @@ def register_handlers(bot):
     menu.register_handlers(bot)
     public_message.register_handlers(bot)
     about.register_handlers(bot)
+    stats.register_handlers(bot)
+    jobs.register_handlers(bot)
@@ -5,6 +5,8 @@ import logging.config
 
 from omegaconf import OmegaConf
 
+from tablettop_bot.api.outbound import outbound
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,4 +26,4 @@ def register_handlers(bot):
         config_str = OmegaConf.to_yaml(config)
 
         # Send config
-        bot.send_message(user_id, f"```yaml\n{config_str}\n```", parse_mode="Markdown")
+        outbound.fire(bot, "send_message", user_id, f"```yaml\n{config_str}\n```", parse_mode="Markdown")
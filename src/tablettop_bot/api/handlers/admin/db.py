@@ -5,10 +5,13 @@ from datetime import datetime
 
 from omegaconf import OmegaConf
 
-from tablettop_bot.db.database import export_all_tables
+from tablettop_bot.api.outbound import outbound
+from tablettop_bot.core.jobs import jobs
+from tablettop_bot.core.tasks import export_tables
 
 config = OmegaConf.load("./src/tablettop_bot/conf/config.yaml")
 strings = OmegaConf.load("./src/tablettop_bot/conf/common.yaml")
+job_strings = OmegaConf.load("./src/tablettop_bot/conf/admin/jobs.yaml")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,20 +26,23 @@ def register_handlers(bot):
 
         if user.role != "admin":
             # inform that the user does not have rights
-            bot.send_message(call.from_user.id, strings.no_rights[user.lang])
+            outbound.fire(bot, "send_message", call.from_user.id, strings.no_rights[user.lang])
             return
 
-        # Export data
-        export_dir = f'./data/{datetime.now().strftime("%Y%m%d_%H%M%S")}'
-        os.makedirs(export_dir)
-        try:
-            export_all_tables(export_dir)
-            for table in config.db.tables:
-                # save as excel in temp folder and send to a user
-                filename = f"{export_dir}/{table}.csv"
-                bot.send_document(user.id, open(filename, "rb"))
+        def send_files(paths: list[str]):
+            for filename in paths:
+                with open(filename, "rb") as file:
+                    outbound.call(bot, "send_document", user.id, file)
                 # remove the file
                 os.remove(filename)
-        except Exception as e:
-            bot.send_message(user.id, str(e))
-            logger.error(f"Error exporting data: {e}")
+
+        def report_error(error: Exception):
+            outbound.call(bot, "send_message", user.id, str(error))
+
+        # The export runs in the job runner's process pool, the files are sent when it is done
+        export_dir = f'./data/{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+        job_id = jobs.enqueue(
+            export_tables, export_dir, list(config.db.tables), user_id=user.id, then=send_files, on_error=report_error
+        )
+        if jobs.running:
+            outbound.fire(bot, "send_message", user.id, job_strings[user.lang].queued.format(job_id=job_id))
@@ -4,6 +4,7 @@ import logging.config
 from omegaconf import OmegaConf
 from telebot import types
 from tablettop_bot.api.handlers.common import create_cancel_button
+from tablettop_bot.api.outbound import outbound
 from tablettop_bot.db import crud
 
 # Load configuration
@@ -13,6 +14,9 @@ strings = OmegaConf.load("./src/tablettop_bot/conf/admin/grant_admin.yaml")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Usernames offered when the entered one is not found
+MAX_CANDIDATES = 8
+
 
 # React to any text if not command
 def register_handlers(bot):
@@ -24,8 +28,8 @@ def register_handlers(bot):
         user = data["user"]
 
         # Ask for the username
-        sent_message = bot.send_message(
-            user.id, strings[user.lang].enter_username, reply_markup=create_cancel_button(user.lang)
+        sent_message = outbound.call(
+            bot, "send_message", user.id, strings[user.lang].enter_username, reply_markup=create_cancel_button(user.lang)
         )
 
         # Move to the next step: receiving the custom message
@@ -36,20 +40,52 @@ def register_handlers(bot):
 
         # Look for the user in the database
         retrieved_user = crud.read_user_by_username(username=admin_username)
-        # if user does not exists
+        # if user does not exists, offer the usernames that start with the text
         if not retrieved_user:
-            bot.send_message(
-                user.id, strings[user.lang].user_not_found.format(username=admin_username), parse_mode="MarkdownV2"
+            candidates = crud.search_users_by_username(admin_username, limit=MAX_CANDIDATES)
+            keyboard = types.InlineKeyboardMarkup()
+            for candidate in candidates:
+                keyboard.add(
+                    types.InlineKeyboardButton(f"@{candidate.username}", callback_data=f"add_admin:{candidate.id}")
+                )
+            outbound.fire(
+                bot,
+                "send_message",
+                user.id,
+                strings[user.lang].user_not_found.format(username=admin_username)
+                + (strings[user.lang].choose_user if candidates else ""),
+                parse_mode="MarkdownV2",
+                reply_markup=keyboard if candidates else None,
             )
+        else:
+            grant_admin(user, retrieved_user)
+
+    @bot.callback_query_handler(func=lambda call: call.data.startswith("add_admin:"))
+    def add_admin_candidate_handler(call: types.CallbackQuery, data: dict):
+        user = data["user"]
+        # The button only reaches admins, but callback data can be sent by anyone
+        if user.role != "admin":
+            return
+        retrieved_user = crud.read_user(int(call.data.split(":")[1]))
+        if retrieved_user:
+            grant_admin(user, retrieved_user)
+
+    def grant_admin(user, retrieved_user):
         # if user is already admin
-        elif retrieved_user.role == "admin":
-            bot.send_message(
-                user.id, strings[user.lang].user_already_admin.format(username=admin_username), parse_mode="MarkdownV2"
+        if retrieved_user.role == "admin":
+            outbound.fire(
+                bot,
+                "send_message",
+                user.id,
+                strings[user.lang].user_already_admin.format(username=retrieved_user.username),
+                parse_mode="MarkdownV2",
             )
         else:
             crud.upsert_user(id=retrieved_user.id, username=retrieved_user.username, role="admin")
 
-            bot.send_message(
+            outbound.fire(
+                bot,
+                "send_message",
                 user.id,
                 strings[user.lang].add_admin_confirm.format(
                     user_id=int(retrieved_user.id), username=retrieved_user.username
@@ -0,0 +1,62 @@
+"""Handler to show the background jobs to admins."""
+
+import logging
+import logging.config
+from html import escape
+
+from omegaconf import OmegaConf
+from telebot import types
+
+from tablettop_bot.api.outbound import outbound
+from tablettop_bot.db import crud
+from tablettop_bot.db.read_models import JobRow
+
+# Load configuration
+config = OmegaConf.load("./src/tablettop_bot/conf/config.yaml")
+strings = OmegaConf.load("./src/tablettop_bot/conf/admin/jobs.yaml")
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def format_jobs(rows: list[JobRow], lang: str) -> str:
+    """Render the recent jobs with their status, progress and last error."""
+    lang_strings = strings[lang]
+    if not rows:
+        return lang_strings.no_jobs
+    lines = [lang_strings.title]
+    for row in rows:
+        lines.append(lang_strings.job.format(
+            id=row.id,
+            task=escape(row.task),
+            queue=escape(row.queue),
+            status=lang_strings.statuses.get(row.status, row.status),
+            progress=lang_strings.progress.format(done=row.progress_done, total=row.progress_total)
+            if row.progress_total else "",
+            attempts=row.attempts,
+            max_attempts=row.max_attempts,
+            created_at=row.created_at.strftime("%d.%m %H:%M"),
+            error=lang_strings.error.format(error=escape(row.error)) if row.error else "",
+        ))
+    return "\n".join(lines)
+
+
+def register_handlers(bot):
+    """Register jobs handlers"""
+    logger.info("Registering `jobs` handlers")
+
+    def send_jobs(user):
+        if user.role != "admin":
+            outbound.fire(bot, "send_message", user.id, strings[user.lang].no_rights)
+            return
+        rows = crud.read_recent_jobs(config.jobs.recent)
+        outbound.fire(bot, "send_message", user.id, format_jobs(rows, user.lang), parse_mode="HTML")
+
+    @bot.message_handler(commands=["jobs"])
+    def jobs_command(message: types.Message, data: dict):
+        send_jobs(data["user"])
+
+    @bot.callback_query_handler(func=lambda call: call.data == "jobs")
+    def jobs_callback(call: types.CallbackQuery, data: dict):
+        send_jobs(data["user"])
@@ -4,6 +4,8 @@ import logging.config
 from omegaconf import OmegaConf
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 
+from tablettop_bot.api.outbound import outbound
+
 config = OmegaConf.load("./src/tablettop_bot/conf/admin/menu.yaml")
 
 
@@ -28,10 +30,11 @@ def register_handlers(bot):
         user = data["user"]
         if user.role != "admin":
             # Inform the user that they do not have admin rights
-            bot.send_message(message.from_user.id, config[user.lang].no_rights)
+            outbound.fire(bot, "send_message", message.from_user.id, config[user.lang].no_rights)
             return
 
         # Send the admin menu
-        bot.send_message(
-            message.from_user.id, config[user.lang].admin_menu.title, reply_markup=create_admin_menu_markup(user.lang)
+        outbound.fire(
+            bot, "send_message", message.from_user.id, config[user.lang].admin_menu.title,
+            reply_markup=create_admin_menu_markup(user.lang),
         )
@@ -3,12 +3,14 @@ import random
 from datetime import datetime, timedelta
 from typing import Any, Optional
 
-import pytz  # type: ignore
 from apscheduler.schedulers.background import BackgroundScheduler
 from omegaconf import OmegaConf
 from telebot import TeleBot
 from telebot.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
 from tablettop_bot.api.handlers.common import create_cancel_button
+from tablettop_bot.api.outbound import outbound
+from tablettop_bot.core.lifecycle import lifecycle
+from tablettop_bot.core.timezones import get_zone
 from tablettop_bot.db import crud
 from tablettop_bot.db.models import User
 
@@ -16,7 +18,7 @@ config = OmegaConf.load("./src/tablettop_bot/conf/config.yaml")
 strings = OmegaConf.load("./src/tablettop_bot/conf/admin/public_message.yaml")
 
 # Define timezone
-timezone = pytz.timezone(config.timezone)
+timezone = get_zone(config.timezone)
 
 # Initialize scheduler
 scheduler = BackgroundScheduler()
@@ -50,9 +52,11 @@ def send_scheduled_message(
     """Send a scheduled message to a user"""
     try:
         if media_type == "text":
-            bot.send_message(chat_id=user_id, text=message_text)
+            outbound.call(bot, "send_message", chat_id=user_id, text=message_text)
         elif media_type == "photo":
-            bot.send_photo(chat_id=user_id, caption=message_text or "", photo=message_photo, disable_notification=False)
+            outbound.call(
+                bot, "send_photo", chat_id=user_id, caption=message_text or "", photo=message_photo, disable_notification=False
+            )
 
         # Remove message from scheduled_messages
         if message_id in scheduled_messages:
@@ -65,20 +69,20 @@ def send_scheduled_message(
 def list_scheduled_messages(bot: TeleBot, user: User):
     """List all scheduled messages"""
     if not scheduled_messages:
-        bot.send_message(user.id, strings[user.lang].no_scheduled_messages)
+        outbound.fire(bot, "send_message", user.id, strings[user.lang].no_scheduled_messages)
         return
 
     response = strings[user.lang].list_public_messages + "\n"
     for message_id, message_data in scheduled_messages.items():
         scheduled_time = message_data["datetime"].strftime("%Y-%m-%d %H:%M")
         response += f"- {message_id}: {scheduled_time} ({config.timezone})\n"
-    bot.send_message(user.id, response)
+    outbound.fire(bot, "send_message", user.id, response)
 
 
 def cancel_scheduled_message(bot: TeleBot, user: User):
     """Cancel a scheduled message"""
     if not scheduled_messages:
-        bot.send_message(user.id, strings[user.lang].no_scheduled_messages)
+        outbound.fire(bot, "send_message", user.id, strings[user.lang].no_scheduled_messages)
         return
 
     # Create keyboard for cancel options
@@ -87,7 +91,7 @@ def cancel_scheduled_message(bot: TeleBot, user: User):
         job_label = f"{message_id}: {message['datetime'].strftime('%Y-%m-%d %H:%M')}"
         keyboard.add(InlineKeyboardButton(job_label, callback_data=f"cancel_{message_id}"))
 
-    bot.send_message(user.id, strings[user.lang].cancel_message_prompt, reply_markup=keyboard)
+    outbound.fire(bot, "send_message", user.id, strings[user.lang].cancel_message_prompt, reply_markup=keyboard)
 
 
 def get_message_content(message, bot: TeleBot, user: User):
@@ -108,8 +112,9 @@ def get_message_content(message, bot: TeleBot, user: User):
             "photo": photo,
             "jobs": [],
         }
-        target_users = crud.read_users()
-        for target_user in target_users:
+        # Stream the ids only, the broadcast never needs the whole users table in memory
+        n_users = 0
+        for (target_user_id,) in crud.iter_users(User.id):
             # add random delay to avoid spamming
             scheduled_datetime += timedelta(seconds=random.randint(5, 30))
 
@@ -117,15 +122,18 @@ def get_message_content(message, bot: TeleBot, user: User):
                 send_scheduled_message,
                 "date",
                 run_date=scheduled_datetime,
-                args=[bot, target_user.id, media_type, message_id, content, photo],
+                args=[bot, target_user_id, media_type, message_id, content, photo],
             )
             scheduled_messages[message_id]["jobs"].append(job.id)
+            n_users += 1
 
-        bot.send_message(
+        outbound.fire(
+            bot,
+            "send_message",
             user.id,
             strings[user.lang].message_scheduled_confirmation.format(
                 message_id=message_id,
-                n_users=len(target_users),
+                n_users=n_users,
                 send_datetime=scheduled_datetime.strftime("%Y-%m-%d %H:%M"),
                 timezone=config.timezone,
             ),
@@ -134,16 +142,32 @@ def get_message_content(message, bot: TeleBot, user: User):
         user_data.pop(user.id, None)
 
 
+def stop_scheduler(timeout: float) -> int:
+    """Stop the scheduler. Return the number of messages that were still to be sent, they are dropped."""
+    if not scheduler.running:
+        return 0
+    dropped = len(scheduler.get_jobs())
+    # Messages being sent finish in the scheduler's executor threads
+    scheduler.shutdown(wait=False)
+    scheduled_messages.clear()
+    return dropped
+
+
 def register_handlers(bot: TeleBot):
     """Register public message handlers"""
     logger.info("Registering `public message` handlers")
 
+    scheduler.start()
+    lifecycle.on_stop("public messages", stop_scheduler)
+
     @bot.callback_query_handler(func=lambda call: call.data == "public_message")
     def query_handler(call: CallbackQuery, data: dict):
         user = data["user"]
 
         # Replace the message with the menu
-        bot.edit_message_text(
+        outbound.fire(
+            bot,
+            "edit_message_text",
             strings[user.lang].menu.title,
             call.message.chat.id,
             call.message.message_id,
@@ -155,7 +179,9 @@ def register_handlers(bot: TeleBot):
         user = data["user"]
 
         # Replace the message with the menu
-        sent_message = bot.edit_message_text(
+        sent_message = outbound.call(
+            bot,
+            "edit_message_text",
             strings[user.lang].enter_datetime_prompt.format(
                 timezone=config.timezone, datetime_example=datetime.now(timezone).strftime("%Y-%m-%d %H:%M")
             ),
@@ -179,11 +205,13 @@ def register_handlers(bot: TeleBot):
     def get_datetime_input(message: Message, bot: TeleBot, user: User):
         try:
             user_datetime = datetime.strptime(message.text, "%Y-%m-%d %H:%M")
-            user_datetime_localized = timezone.localize(user_datetime)
+            user_datetime_localized = user_datetime.replace(tzinfo=timezone)
 
             if user_datetime_localized < datetime.now(timezone):
-                sent_message = bot.send_message(user.id, strings[user.lang].past_datetime_error)
-                sent_message = bot.send_message(
+                outbound.call(bot, "send_message", user.id, strings[user.lang].past_datetime_error)
+                sent_message = outbound.call(
+                    bot,
+                    "send_message",
                     message.chat.id,
                     strings[user.lang].enter_datetime_prompt.format(timezone=config.timezone),
                     reply_markup=create_cancel_button(user.lang),
@@ -192,12 +220,14 @@ def register_handlers(bot: TeleBot):
                 return
 
             user_data[user.id] = {"datetime": user_datetime_localized}
-            sent_message = bot.send_message(user.id, strings[user.lang].record_message_prompt)
+            sent_message = outbound.call(bot, "send_message", user.id, strings[user.lang].record_message_prompt)
             bot.register_next_step_handler(sent_message, get_message_content, bot, user)
 
         except ValueError:
-            sent_message = bot.send_message(user.id, strings[user.lang].invalid_datetime_format)
-            sent_message = bot.send_message(
+            outbound.call(bot, "send_message", user.id, strings[user.lang].invalid_datetime_format)
+            sent_message = outbound.call(
+                bot,
+                "send_message",
                 message.chat.id,
                 strings[user.lang].enter_datetime_prompt.format(timezone=config.timezone),
                 reply_markup=create_cancel_button(user.lang),
@@ -219,11 +249,12 @@ def register_handlers(bot: TeleBot):
                 except Exception as e:
                     logger.error(f"Error removing job {job_id}: {e}")
             del scheduled_messages[message_id]
-            bot.send_message(
-                call.message.chat.id, strings[user.lang].cancel_message_confirmation.format(message_id=message_id)
+            outbound.fire(
+                bot,
+                "send_message",
+                call.message.chat.id,
+                strings[user.lang].cancel_message_confirmation.format(message_id=message_id),
             )
         else:
-            bot.send_message(call.message.chat.id, strings[user.lang].message_not_found)
-
+            outbound.fire(bot, "send_message", call.message.chat.id, strings[user.lang].message_not_found)
 
-scheduler.start()
@@ -0,0 +1,100 @@
+"""Handler to show player and host analytics to admins."""
+
+import logging
+import logging.config
+from html import escape
+
+from omegaconf import OmegaConf
+from telebot import types
+
+from tablettop_bot.api.outbound import outbound
+from tablettop_bot.core.jobs import jobs
+from tablettop_bot.core.stats import StatsReport
+from tablettop_bot.core.tasks import stats_report
+from tablettop_bot.core.timezones import utcnow
+from tablettop_bot.db import crud
+
+# Load configuration
+config = OmegaConf.load("./src/tablettop_bot/conf/config.yaml")
+strings = OmegaConf.load("./src/tablettop_bot/conf/admin/stats.yaml")
+job_strings = OmegaConf.load("./src/tablettop_bot/conf/admin/jobs.yaml")
+
+# Initialize logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_days(text: str) -> int:
+    """Window length from `/stats [days]`, the configured default when it is missing or invalid."""
+    parts = (text or "").split()
+    if len(parts) > 1 and parts[1].isdigit():
+        return min(max(int(parts[1]), 1), config.stats.max_days)
+    return config.stats.default_days
+
+
+def format_report(report: StatsReport, updated_at, lang: str) -> str:
+    """Render a stats report with the strings of a language."""
+    lang_strings = strings[lang]
+
+    def lines(template: str, items: list[dict]) -> str:
+        return "\n".join(template.format(**item) for item in items) or lang_strings.empty
+
+    return lang_strings.report.format(
+        start=report.start.strftime("%d.%m.%Y"),
+        end=report.end.strftime("%d.%m.%Y"),
+        updated_at=updated_at.strftime("%d.%m.%Y %H:%M"),
+        dau=report.dau,
+        average_dau=report.average_dau,
+        wau=report.wau,
+        active_users=report.active_users,
+        games_played=report.games_played,
+        top_games=lines(lang_strings.top_game, [
+            {"name": escape(name), "games": games, "players": players} for name, games, players in report.top_games
+        ]),
+        fill_rates=lines(lang_strings.fill_rate, [{"name": escape(name), "fill": fill} for name, fill in report.fill_rates]),
+        underfilled=report.underfilled,
+        host_only=report.host_only,
+        waitlisted=report.waitlisted,
+        active_hosts=report.active_hosts,
+        top_hosts=lines(lang_strings.top_host, [
+            {"name": escape(name), "games": games, "fill": fill} for name, games, fill in report.top_hosts
+        ]),
+    )
+
+
+def register_handlers(bot):
+    """Register stats handlers"""
+    logger.info("Registering `stats` handlers")
+
+    def send_stats(user, days: int):
+        if user.role != "admin":
+            outbound.fire(bot, "send_message", user.id, strings[user.lang].no_rights)
+            return
+
+        # The report reads the rollup tables only, refreshed by StatsRollupJob
+        updated_at = crud.read_rollups_updated_at()
+        if updated_at is None:
+            outbound.fire(bot, "send_message", user.id, strings[user.lang].no_data)
+            return
+
+        def send_report(report: StatsReport):
+            outbound.call(bot, "send_message", user.id, format_report(report, updated_at, user.lang), parse_mode="HTML")
+
+        def report_error(error: Exception):
+            outbound.call(bot, "send_message", user.id, str(error))
+
+        # The pandas aggregation runs in the job runner's process pool, away from update dispatch.
+        # The rollups are grouped by UTC date, so the window ends on the UTC date too
+        job_id = jobs.enqueue(
+            stats_report, utcnow().date(), days, config.stats.top, user_id=user.id, then=send_report, on_error=report_error
+        )
+        if jobs.running:
+            outbound.fire(bot, "send_message", user.id, job_strings[user.lang].queued.format(job_id=job_id))
+
+    @bot.message_handler(commands=["stats"])
+    def stats_command(message: types.Message, data: dict):
+        send_stats(data["user"], parse_days(message.text))
+
+    @bot.callback_query_handler(func=lambda call: call.data == "stats")
+    def stats_callback(call: types.CallbackQuery, data: dict):
+        send_stats(data["user"], config.stats.default_days)
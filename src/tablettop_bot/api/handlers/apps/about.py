@@ -3,6 +3,8 @@ import logging
 from omegaconf import OmegaConf
 from telebot import TeleBot
 
+from ...outbound import outbound
+
 
 # Load logging configuration with OmegaConf
 logging.basicConfig(level=logging.INFO)
@@ -18,4 +20,4 @@ def register_handlers(bot: TeleBot):
     @bot.message_handler(commands=['about'])
     def send_about_info(message):
         print("def send_about_info(message):")
-        bot.send_message(message.chat.id, app_strings.about, parse_mode='Markdown')
\ No newline at end of file
+        outbound.fire(bot, "send_message", message.chat.id, app_strings.about, parse_mode='Markdown')
\ No newline at end of file
@@ -6,7 +6,10 @@ from telebot import TeleBot
 from telebot.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 
 from ....core.games import generate_summary
+from ....core.nicknames import nicknames
+from ....core.timezones import get_zone, user_timezones, utcnow
 from ....db import crud
+from ...outbound import outbound
 
 # Load logging configuration with OmegaConf
 logging.basicConfig(level=logging.INFO)
@@ -63,7 +66,7 @@ def format_date_with_day_of_week(date):
 def generate_date_matrix():
     
     dates = []
-    today = datetime.now().date()  # Corrected usage
+    today = utcnow().astimezone(get_zone()).date()
     for i in range(21):
         date = today + timedelta(days=i)  # Corrected usage
         dates.append(date)
@@ -88,6 +91,11 @@ def register_handlers(bot: TeleBot):
 
     game_state = GameState()
 
+    def get_selected_datetime(user_id):
+        """Aware start of the game being hosted, its date and time are picked in the host's time zone."""
+        selected_date_str = game_state.selected_date + " " + game_state.selected_time
+        return datetime.strptime(selected_date_str, '%Y-%m-%d %H:%M').replace(tzinfo=user_timezones.zone(user_id))
+
     logger.info("Registering `host_hame` handlers")
     @bot.message_handler(commands=['host_game'])
     def host_game(message):
@@ -98,47 +106,49 @@ def register_handlers(bot: TeleBot):
         
         send_game_library(chat_id)
 
-    def send_game_library(chat_id, page=0, message_id=None):
-        games = crud.get_all_games()
+    def send_game_library(chat_id, after_id=None, before_id=None, message_id=None):
+        page = crud.get_games_page(after_id=after_id, before_id=before_id, limit=11)
 
-        if not games:
-            bot.send_message(chat_id, app_strings.library_empty)
+        if not page.items:
+            outbound.fire(bot, "send_message", chat_id, app_strings.library_empty)
             return
 
-        items_per_page = 11
-        total_pages = (len(games) + items_per_page - 1) // items_per_page
-        page_games = games[page * items_per_page:(page + 1) * items_per_page]
-
         message = 'Библиотека игр:\n'
 
         keyboard = InlineKeyboardMarkup()
-        for game in page_games:
+        for game in page.items:
             keyboard.row(InlineKeyboardButton(
                 f'{game.name}', callback_data=f'select_game_{game.id}'))
 
+        # Callback data carries the id of the first or last game on the page as the cursor
         navigation_buttons = []
-        if page > 0:
-            navigation_buttons.append(InlineKeyboardButton(app_strings.prev_page, callback_data=f'prev_page_{page - 1}'))
-        if page < total_pages - 1:
-            navigation_buttons.append(InlineKeyboardButton(app_strings.next_page, callback_data=f'next_page_{page + 1}'))
+        if page.has_prev:
+            navigation_buttons.append(
+                InlineKeyboardButton(app_strings.prev_page, callback_data=f'host_prev_page_{page.first_id}'))
+        if page.has_next:
+            navigation_buttons.append(
+                InlineKeyboardButton(app_strings.next_page, callback_data=f'host_next_page_{page.last_id}'))
         if navigation_buttons:
             keyboard.row(*navigation_buttons)
 
         if message_id:
-            bot.edit_message_text(message, chat_id=chat_id, message_id=message_id, reply_markup=keyboard)
+            outbound.fire(bot, "edit_message_text", message, chat_id=chat_id, message_id=message_id, reply_markup=keyboard)
         else:
-            bot.send_message(chat_id, message, reply_markup=keyboard)
+            outbound.fire(bot, "send_message", chat_id, message, reply_markup=keyboard)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('prev_page_') or call.data.startswith('next_page_'))
+    @bot.callback_query_handler(func=lambda call: call.data.startswith('host_prev_page_') or call.data.startswith('host_next_page_'))
     def handle_page_navigation(call):
         
-        page = int(call.data.split('_')[-1])
-        send_game_library(call.message.chat.id, page=page, message_id=call.message.message_id)
+        cursor = int(call.data.split('_')[-1])
+        if call.data.startswith('host_prev_page_'):
+            send_game_library(call.message.chat.id, before_id=cursor, message_id=call.message.message_id)
+        else:
+            send_game_library(call.message.chat.id, after_id=cursor, message_id=call.message.message_id)
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith('select_game_'))
     def handle_game_selection(call):
         
-        bot.delete_message(chat_id=call.message.chat.id, message_id=call.message.message_id, timeout=2)
+        outbound.fire(bot, "delete_message", chat_id=call.message.chat.id, message_id=call.message.message_id, timeout=2)
         global selected_game_id
         game_number = int(call.data.split('_')[2])
 
@@ -147,22 +157,24 @@ def register_handlers(bot: TeleBot):
 
         if game:
             selected_game_id = game_number
-            bot.send_message(call.message.chat.id, app_strings.choose_game, reply_markup=create_date_buttons())
+            outbound.fire(bot, "send_message", call.message.chat.id, app_strings.choose_game, reply_markup=create_date_buttons())
         else:
-            bot.send_message(call.message.chat.id, app_strings.game_not_found)
+            outbound.fire(bot, "send_message", call.message.chat.id, app_strings.game_not_found)
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith('date_'))
     def handle_date_selection(call):
         
         game_state.selected_date = call.data.split('_')[1]
         formatted_date = format_date_with_day_of_week(datetime.strptime(game_state.selected_date, '%Y-%m-%d'))
-        msg = bot.edit_message_text(
+        msg = outbound.call(
+            bot,
+            "edit_message_text",
             chat_id=call.message.chat.id, message_id=call.message.message_id,
             text=f"Выберите время игры на {formatted_date}:"
         )
-        bot.delete_message(chat_id=call.message.chat.id, message_id=call.message.message_id)
+        outbound.fire(bot, "delete_message", chat_id=call.message.chat.id, message_id=call.message.message_id)
         time_keyboard = create_time_buttons()
-        bot.send_message(call.message.chat.id, app_strings.choose_game_time, reply_markup=time_keyboard)
+        outbound.fire(bot, "send_message", call.message.chat.id, app_strings.choose_game_time, reply_markup=time_keyboard)
 
     def create_time_buttons():
         
@@ -180,15 +192,16 @@ def register_handlers(bot: TeleBot):
     @bot.callback_query_handler(func=lambda call: call.data.startswith('time_'))
     def handle_time_selection(call):
         game_state.selected_time = call.data.split('_')[1]
-        selected_date_str = game_state.selected_date + " " + game_state.selected_time
-        selected_datetime = datetime.strptime(selected_date_str, '%Y-%m-%d %H:%M')
+        selected_datetime = get_selected_datetime(call.from_user.id)
 
-        now = datetime.now()
+        now = utcnow()
         if selected_datetime < now - timedelta(minutes=30):
-            bot.send_message(call.message.chat.id, app_strings.time_not_valid)
-            bot.send_message(call.message.chat.id, app_strings.choose_game_time, reply_markup=create_time_buttons())
+            outbound.fire(bot, "send_message", call.message.chat.id, app_strings.time_not_valid)
+            outbound.fire(bot, "send_message", call.message.chat.id, app_strings.choose_game_time, reply_markup=create_time_buttons())
         else:
-            bot.edit_message_text(
+            outbound.fire(
+                bot,
+                "edit_message_text",
                 chat_id=call.message.chat.id, message_id=call.message.message_id,
                 text=app_strings.steam, reply_markup=create_steam_keyboard()
             )
@@ -197,17 +210,16 @@ def register_handlers(bot: TeleBot):
     @bot.callback_query_handler(func=lambda call: call.data.startswith('steam_'))
     def handle_steam_selection(call):
         
-        bot.delete_message(chat_id=call.message.chat.id, message_id=call.message.message_id,timeout=1)
+        outbound.fire(bot, "delete_message", chat_id=call.message.chat.id, message_id=call.message.message_id,timeout=1)
         if isinstance(call, CallbackQuery):
-            selected_date_str = game_state.selected_date + " " + game_state.selected_time
-            selected_datetime = datetime.strptime(selected_date_str, '%Y-%m-%d %H:%M')
+            selected_datetime = get_selected_datetime(call.from_user.id)
 
-            now = datetime.now()
+            now = utcnow()
             
             if selected_datetime < now - timedelta(minutes=30):
-                bot.send_message(call.message.chat.id, app_strings.time_not_valid)
-                bot.send_message(call.message.chat.id, app_strings.choose_game_time,
-                reply_markup=create_time_buttons())
+                outbound.fire(bot, "send_message", call.message.chat.id, app_strings.time_not_valid)
+                outbound.fire(bot, "send_message", call.message.chat.id, app_strings.choose_game_time,
+                              reply_markup=create_time_buttons())
                 return
 
             room = crud.get_available_room(selected_datetime)
@@ -216,20 +228,20 @@ def register_handlers(bot: TeleBot):
                 config.app.room_to_link.get(str(room))
 
                 if call.data == 'steam_yes':
-                    bot.send_message(call.message.chat.id, "Введите сервер в tabletop simulator:")
+                    outbound.fire(bot, "send_message", call.message.chat.id, "Введите сервер в tabletop simulator:")
                     bot.register_next_step_handler(call.message, ask_for_server)
                 elif call.data == 'steam_no':
                     ask_for_link(call.message)
             else:
-                bot.send_message(call.message.chat.id, app_strings.no_room_discord)
+                outbound.fire(bot, "send_message", call.message.chat.id, app_strings.no_room_discord)
         else:
-            bot.send_message(call.message.chat.id, app_strings.steam_error)
+            outbound.fire(bot, "send_message", call.message.chat.id, app_strings.steam_error)
 
 
     def ask_for_server(message):
         game_state.selected_server = message.text  # Store the entered server information
 
-        bot.send_message(message.chat.id, app_strings.enter_password)
+        outbound.fire(bot, "send_message", message.chat.id, app_strings.enter_password)
         bot.register_next_step_handler(message, handle_password_input)
 
 
@@ -247,7 +259,7 @@ def register_handlers(bot: TeleBot):
         no_button = InlineKeyboardButton(text="Нет", callback_data='repeat_no')
         markup.add(yes_button, no_button)
 
-        bot.send_message(message.chat.id, app_strings.repeat_game, reply_markup=markup)
+        outbound.fire(bot, "send_message", message.chat.id, app_strings.repeat_game, reply_markup=markup)
 
         
     @bot.callback_query_handler(func=lambda call: call.data in ['repeat_yes', 'repeat_no'])
@@ -256,19 +268,18 @@ def register_handlers(bot: TeleBot):
         """
         Handle the user's response to whether the game should repeat weekly.
         """
-        bot.delete_message(chat_id=call.message.chat.id, message_id=call.message.message_id, timeout=1)
+        outbound.fire(bot, "delete_message", chat_id=call.message.chat.id, message_id=call.message.message_id, timeout=1)
         message = call.message
         game_state.repeat_game = (call.data == 'repeat_yes')
 
-        selected_date_str = game_state.selected_date + " " + game_state.selected_time
-        selected_datetime = datetime.strptime(selected_date_str, '%Y-%m-%d %H:%M')
+        selected_datetime = get_selected_datetime(call.from_user.id)
 
-        now = datetime.now()
+        now = utcnow()
         
         
         if selected_datetime < now:
-            bot.send_message(message.chat.id, app_strings.invalid_time)
-            bot.send_message(message.chat.id, app_strings.choose_game_time, reply_markup=create_time_buttons())
+            outbound.fire(bot, "send_message", message.chat.id, app_strings.invalid_time)
+            outbound.fire(bot, "send_message", message.chat.id, app_strings.choose_game_time, reply_markup=create_time_buttons())
             return
 
         try:
@@ -288,18 +299,19 @@ def register_handlers(bot: TeleBot):
         room = game_state.room
         link = config.app.room_to_link.get(str(room))
 
-        print(f"room={room}")
+        logger.debug(f"room={room}")
         
         crud.schedule_game(selected_game_id, selected_datetime, initiator_id=message.chat.id, nickname=username,
                     use_steam=bool(game_state.server_password), server_password=game_state.server_password,
-                    serverdata=game_state.selected_server, discord_telegram_link=link, room=room,repeat_weekly=game_state.repeat_game)
+                    serverdata=game_state.selected_server, discord_telegram_link=link, room=room,repeat_weekly=game_state.repeat_game,
+                    timezone=user_timezones.name(call.from_user.id))
         
         summary = generate_summary(selected_game_id, selected_datetime, serverdata=game_state.selected_server,
                                 server_password=game_state.server_password, use_steam=bool(game_state.server_password),
                                 ini_id=username, discord_telegram_link=link, room=room, flag=flagusername,repeat = game_state.repeat_game)
 
-        bot.send_message(message.chat.id, f"{summary}\n {get_game_info_message(selected_game_id)}", parse_mode='HTML',
-                        disable_web_page_preview=True)
+        outbound.fire(bot, "send_message", message.chat.id, f"{summary}\n {get_game_info_message(selected_game_id)}", parse_mode='HTML',
+                      disable_web_page_preview=True)
 
     def ask_for_link(message):
         
@@ -308,34 +320,25 @@ def register_handlers(bot: TeleBot):
     def ask_for_password(message):
         
         global game_state
-        selected_date_str = game_state.selected_date + " " + game_state.selected_time  # Concatenate date and time strings
-        selected_datetime = datetime.strptime(selected_date_str, '%Y-%m-%d %H:%M')
-        now = datetime.now()
+        selected_datetime = get_selected_datetime(message.from_user.id)
+        now = utcnow()
         
         if selected_datetime < now - timedelta(minutes=30):
-            bot.send_message(message.chat.id, app_strings.time_not_valid)
-            bot.send_message(message.chat.id, app_strings.choose_game_time, reply_markup=create_time_buttons())
+            outbound.fire(bot, "send_message", message.chat.id, app_strings.time_not_valid)
+            outbound.fire(bot, "send_message", message.chat.id, app_strings.choose_game_time, reply_markup=create_time_buttons())
             return
 
         password = message.text
 
-        try:
-            user = bot.get_chat_member(message.chat.id, message.from_user.id)
-            username = user.user.username if user and user.user.username else 'Unknown User'
-        except Exception as e:
-            logger.info(f"Error getting username: {e}")
-            username = 'Unknown User'
-        flagusername= True
-        if username is None:
-            username = message.chat.first_name + " " + message.chat.last_name
-            flagusername =False
+        username = nicknames.resolve(message.from_user.id, user=message.from_user, bot=bot, chat_id=message.chat.id)
+        flagusername = bool(message.from_user.username)
         room = game_state.room
-        print(f"room={room}")
+        logger.debug(f"room={room}")
         link = config.app.room_to_link.get(str(room))
-        crud.schedule_game(selected_game_id, selected_datetime, initiator_id=message.from_user.id, nickname=username, use_steam=True, server_password=password, serverdata=game_state.selected_server, room=game_state.room,repeat_weekly=game_state.repeat_game)
+        crud.schedule_game(selected_game_id, selected_datetime, initiator_id=message.from_user.id, nickname=username, use_steam=True, server_password=password, serverdata=game_state.selected_server, room=game_state.room,repeat_weekly=game_state.repeat_game, timezone=user_timezones.name(message.from_user.id))
         summary = generate_summary(selected_game_id, selected_datetime, serverdata=game_state.selected_server, ini_id=username,server_password=password, use_steam=True,discord_telegram_link=link,room=room,flag = flagusername,repeat = game_state.repeat_game)
-        bot.send_message(message.chat.id, f"{summary}\n {get_game_info_message(selected_game_id)} ", parse_mode='HTML',
-                        disable_web_page_preview=True)
+        outbound.fire(bot, "send_message", message.chat.id, f"{summary}\n {get_game_info_message(selected_game_id)} ", parse_mode='HTML',
+                      disable_web_page_preview=True)
         ask_if_repeat_game(message)
 
 
@@ -1,10 +1,18 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 
+import schedule as sc
 from omegaconf import OmegaConf
 from telebot import TeleBot
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from tablettop_bot.api.outbound import outbound
+from tablettop_bot.core.lifecycle import lifecycle
+from tablettop_bot.core.live_board import LiveBoard
+from tablettop_bot.core.nicknames import nicknames
+from tablettop_bot.core.notifications import notifier
+from tablettop_bot.core.render_cache import VersionedRenderCache
+from tablettop_bot.core.timezones import get_zone, localize, start_of_day, user_timezones, zone_label
 from tablettop_bot.db import crud
 
 # Load logging configuration with OmegaConf
@@ -14,30 +22,27 @@ logger = logging.getLogger(__name__)
 config = OmegaConf.load("./src/tablettop_bot/conf/apps/join_game.yaml")
 app_strings = config.strings
 
-def cleanup_past_games():
-    cutoff_time = datetime.now() - timedelta(minutes=30)
-    crud.delete_past_games(cutoff_time)
+def get_initiator_username(bot, chat_id, user_id, user=None):
+    return nicknames.resolve(user_id, user=user, bot=bot, chat_id=chat_id)
 
-def get_initiator_username(bot, chat_id, user_id):
-    try:
-        user = bot.get_chat_member(chat_id, user_id)
-        username = user.user.username if user and user.user.username else user.user.first_name + " " + user.user.last_name
-    except Exception as e:
-        print(f"Error getting username: {e}")
-        username = 'Unknown User'
-    return username
+def get_initiator_and_series(key):
+    game = crud.get_occurrence(key)
+    if game is None:
+        return None, None
+    return game.initiator_id, game.series_id
 
 def format_enrolled_games(enrolled_games, chat_id, user_id):
     # Sort games by date and time
     sorted_games = sorted(enrolled_games, key=lambda game: game.datetime)
+    zone = user_timezones.zone(user_id)
     formatted_message = '<b>Список ваших игр:</b>\n'
     current_date = None
 
     for game in sorted_games:
-        game_date = game.date
-        game_day_russian = app_strings.day_name_mapping[game_date.strftime('%A')]
-        game_date_formatted = f"{game_day_russian} - {game_date.strftime('%d.%m.%Y')}"
-        game_time = game.time
+        start = localize(game.datetime, zone)
+        game_day_russian = app_strings.day_name_mapping[start.strftime('%A')]
+        game_date_formatted = f"{game_day_russian} - {start.strftime('%d.%m.%Y')}"
+        game_time = start.strftime('%H:%M')
         game_details = crud.get_game_details(game.game_id)
         game_name = game_details.name
         max_players = game_details.max_players
@@ -46,9 +51,7 @@ def format_enrolled_games(enrolled_games, chat_id, user_id):
             formatted_message += f'\n<b>{game_date_formatted}</b>\n'
             current_date = game_date_formatted
 
-        player_ids = game.player_ids.split(',')
-        player_nicknames = game.player_nicknames.split(',')
-        enrolled_users = [player_nicknames[i] if player_nicknames[i] else 'Гость' for i in range(len(player_ids))]
+        enrolled_users = [nickname or 'Гость' for _, nickname in game.players]
 
         num_players = len(enrolled_users)
         initiator = game.initiator_name
@@ -64,7 +67,7 @@ def format_enrolled_games(enrolled_games, chat_id, user_id):
         if enrolled_users_message:
             formatted_message += f'{enrolled_users_message}\n'
 
-        print(f"room = {game.room}")
+        logger.debug(f"room = {game.room}")
 
         # Add server or room information
         if game.use_steam:
@@ -105,16 +108,17 @@ class GameState:
 game_state = GameState()
 
 # Dictionary to map English day names to Russian day names
-def get_nearest_days_with_games(scheduled_games, max_days=8):
+def get_nearest_days_with_games(scheduled_games, zone, max_days=8):
     nearest_days = []
     current_date = None
     days_with_games = 0
     displayed_dates = set()
 
     for game in scheduled_games:
-        if game.date not in displayed_dates:
-            displayed_dates.add(game.date)
-            nearest_days.append(game.date)
+        game_date = localize(game.datetime, zone).date()
+        if game_date not in displayed_dates:
+            displayed_dates.add(game_date)
+            nearest_days.append(game_date)
             days_with_games += 1
 
         if days_with_games >= max_days:
@@ -141,70 +145,136 @@ def format_date_with_day_of_week(date):
     return f"{formatted_date} {day_of_week}"
 
 
+def format_scheduled_games(scheduled_games, zone=None):
+    # The board is shared by everyone, so it is shown in the default time zone
+    zone = zone or get_zone()
+    nearest_days = get_nearest_days_with_games(scheduled_games, zone)
+    formatted_message = ''
+    current_date = None
+
+    for game in scheduled_games:
+        start = localize(game.datetime, zone)
+        if start.date() in nearest_days:
+            if start.date() != current_date:
+                day_name = start.strftime("%A")
+                russian_day_name = app_strings.day_name_mapping[day_name]
+                formatted_message += f'\n<b>{russian_day_name} - {start.strftime("%d.%m.%Y")}</b>\n'
+                current_date = start.date()
+
+            game_details = crud.get_game_details(game.game_id)
+            game_name = game_details.name
+            max_players = game.max_players or game_details.max_players
+
+            num_players = len(game.players)
+
+            formatted_message += f'<b>{start.strftime("%H:%M")}</b>  <a href="{game_details.link}">{game_name}</a> ({num_players}/{max_players} игроков)\n'
+
+    return formatted_message
+
+
+def create_schedule_keyboard():
+    keyboard = InlineKeyboardMarkup()
+    keyboard.row(InlineKeyboardButton("Записаться", callback_data='enroll'))
+    keyboard.row(InlineKeyboardButton("Обновить расписание", callback_data='update_schedule'))
+    keyboard.row(InlineKeyboardButton("Мои игры", callback_data='my_games'))
+    return keyboard
+
+
+def render_schedule():
+    """Render the schedule board as (text, keyboard), the keyboard is None when there are no games."""
+    # Games that already started today stay on the board until the day is over
+    scheduled_games = crud.get_scheduled_games(since=start_of_day(get_zone()))
+    if not scheduled_games:
+        return app_strings.no_scheduled_games, None
+    return format_scheduled_games(scheduled_games), create_schedule_keyboard()
+
+
+def notify_promoted(bot, scheduled_game_id, promoted):
+    """Tell players promoted from the waitlist that they got a seat."""
+    if not promoted:
+        return
+    scheduled_game = crud.get_scheduled_game_by_id(scheduled_game_id)
+    if scheduled_game is None:
+        return
+    game_name = crud.get_game_name_by_id(scheduled_game.game_id)
+    zones = crud.read_user_timezones([player.user_id for player in promoted])
+    for player in promoted:
+        start = localize(scheduled_game.datetime, get_zone(zones.get(player.user_id)))
+        message = app_strings.promoted_from_waitlist.format(
+            game_name=game_name,
+            game_date=start.strftime('%d.%m.%Y'),
+            game_time=start.strftime('%H:%M'),
+        )
+        notifier.notify(player.user_id, message, bot=bot)
+
+
+# The board only changes on schedule writes, see crud.bump_schedule_version, and at midnight
+schedule_cache = VersionedRenderCache(render_schedule, crud.get_schedule_version)
+
+
 def register_handlers(bot: TeleBot):
     """ Register handlers for join game app """
 
     logger.info("Registering `join_game` handlers")
 
+    live_board = None
+    if config.app.live_board.enabled:
+        logger.info(f"Live schedule board enabled with debounce: {config.app.live_board.debounce_seconds} seconds")
+        live_board = LiveBoard(bot, schedule_cache.get, config.app.live_board.debounce_seconds)
+        crud.add_schedule_listener(live_board.request_refresh)
+        # Past days drop off the board at midnight, also when nothing was written
+        sc.every().day.at("00:00", get_zone().key).do(live_board.refresh_all)
+        # A change within the debounce delay is published before the outbound queue stops
+        lifecycle.on_stop("live board", lambda timeout: live_board.flush())
+
     @bot.message_handler(commands=['join_game', 'start'])
     def handle_start(message):
-        cleanup_past_games()
-        crud.prolong()
+        if live_board:
+            live_board.publish(message.chat.id)
+            return
 
-        scheduled_games = crud.get_scheduled_games()
-        print(f"scheduled_games = {len(scheduled_games)}")
-        if scheduled_games:
-            formatted_message = format_scheduled_games(bot, scheduled_games, message.chat.id)
-            keyboard = InlineKeyboardMarkup()
-            keyboard.row(InlineKeyboardButton("Записаться", callback_data='enroll'))
-            keyboard.row(InlineKeyboardButton("Обновить расписание", callback_data='update_schedule'))
-            keyboard.row(InlineKeyboardButton("Мои игры", callback_data='my_games'))
-            bot.send_message(message.chat.id, formatted_message, reply_markup=keyboard, parse_mode='HTML', disable_web_page_preview=True)
+        formatted_message, keyboard = schedule_cache.get()
+        logger.debug(f"Schedule render cache: {schedule_cache.stats()}")
+        if keyboard:
+            outbound.fire(bot, "send_message", message.chat.id, formatted_message, reply_markup=keyboard, parse_mode='HTML', disable_web_page_preview=True)
         else:
-            bot.send_message(message.chat.id, app_strings.no_scheduled_games)
+            outbound.fire(bot, "send_message", message.chat.id, formatted_message)
 
     GAMES_PER_PAGE = 10
 
-    def handle_enroll_page(chat_id, available_games, page=1, message_id=None):
-        total_pages = (len(available_games) + GAMES_PER_PAGE - 1) // GAMES_PER_PAGE
-        start_idx = (page - 1) * GAMES_PER_PAGE
-        end_idx = start_idx + GAMES_PER_PAGE
-        page_games = available_games[start_idx:end_idx]
-
-        nearest_days = get_nearest_days_with_games(available_games)  # Get nearest 8 days with games
-        sorted_games = [
-            game for game in page_games 
-            if game.date in nearest_days
-        ]
-
+    def handle_enroll_page(chat_id, page, zone, message_id=None):
         keyboard = InlineKeyboardMarkup(row_width=1)
-        for game in sorted_games:
+        for game in page.items:
             game_details = crud.get_game_details(game.game_id)
             if game_details:
                 game_name = game_details.name
             else:
                 game_name = "Unknown Game"
-            game_date = game.date
-            game_time = game.time.strftime('%H:%M')
-            button_text = f'{game_name} - {game_date} {game_time}'
-            keyboard.add(InlineKeyboardButton(button_text, callback_data=f'enroll_game_{game.id}'))
-
-        # Add navigation buttons
-        if page > 1:
-            keyboard.add(InlineKeyboardButton("Назад", callback_data=f'enroll_page_{page - 1}'))
-        if page < total_pages:
-            keyboard.add(InlineKeyboardButton("Вперед", callback_data=f'enroll_page_{page + 1}'))
+            start = localize(game.datetime, zone)
+            button_text = f'{game_name} - {start.strftime("%Y-%m-%d %H:%M")}'
+            keyboard.add(InlineKeyboardButton(button_text, callback_data=f'enroll_game_{game.key}'))
+
+        # Add navigation buttons, the cursor is the key of the first or last game on the page
+        if page.has_prev:
+            keyboard.add(InlineKeyboardButton("Назад", callback_data=f'enroll_page_prev_{page.first_key}'))
+        if page.has_next:
+            keyboard.add(InlineKeyboardButton("Вперед", callback_data=f'enroll_page_next_{page.last_key}'))
         keyboard.add(InlineKeyboardButton("Назад", callback_data='back_to_main'))
 
         if message_id:
-            bot.edit_message_text(
+            # Fast paging only sends the last page, earlier edits of the message are coalesced
+            outbound.fire(
+                bot,
+                "edit_message_text",
                 chat_id=chat_id,
                 message_id=message_id,
                 text=app_strings.choose_game_to_join,
                 reply_markup=keyboard
             )
         else:
-            bot.send_message(
+            outbound.fire(
+                bot,
+                "send_message",
                 chat_id=chat_id,
                 text=app_strings.choose_game_to_join,
                 reply_markup=keyboard
@@ -212,48 +282,22 @@ def register_handlers(bot: TeleBot):
 
     @bot.message_handler(commands=['create_game'])
     def create_game_command(message):
-        msg = bot.send_message(message.chat.id, app_strings.enter_game_name)
+        msg = outbound.call(bot, "send_message", message.chat.id, app_strings.enter_game_name)
         bot.register_next_step_handler(msg, process_game_name)
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith('date_'))
     def handle_date_selection(call):
         game_state.selected_date = call.data.split('_')[1]
         formatted_date = format_date_with_day_of_week(datetime.strptime(game_state.selected_date, '%Y-%m-%d'))
-        msg = bot.edit_message_text(chat_id=call.message.chat.id, message_id=call.message.message_id, text=f"Выберите время игры на {formatted_date}:")
-        bot.delete_message(chat_id=call.message.chat.id, message_id=call.message.message_id)
+        msg = outbound.call(bot, "edit_message_text", chat_id=call.message.chat.id, message_id=call.message.message_id, text=f"Выберите время игры на {formatted_date}:")
+        outbound.fire(bot, "delete_message", chat_id=call.message.chat.id, message_id=call.message.message_id)
         time_keyboard = create_time_buttons()
 
-        bot.send_message(call.message.chat.id, "Выберите время игры:", reply_markup=time_keyboard)
-
-    def format_scheduled_games(bot, scheduled_games, chat_id):
-        nearest_days = get_nearest_days_with_games(scheduled_games)
-        formatted_message = ''
-        current_date = None
-
-        for game in scheduled_games:
-            if game.date in nearest_days:
-                if game.date != current_date:
-                    day_name = game.date.strftime("%A")
-                    russian_day_name = app_strings.day_name_mapping[day_name]
-                    formatted_message += f'\n<b>{russian_day_name} - {game.date.strftime("%d.%m.%Y")}</b>\n'
-                    current_date = game.date
-
-                game_details = crud.get_game_details(game.game_id)
-                game_name = game_details.name
-                max_players = game_details.max_players
-
-                # Fetch enrolled users
-                enrolled_users_ids = crud.get_enrolled_players(game.id)[0]
-
-                num_players = len(enrolled_users_ids)
-
-                formatted_message += f'<b>{game.time.strftime("%H:%M")}</b>  <a href="{game_details.link}">{game_name}</a> ({num_players}/{max_players} игроков)\n'
-
-        return formatted_message
+        outbound.fire(bot, "send_message", call.message.chat.id, "Выберите время игры:", reply_markup=time_keyboard)
 
     def process_game_name(message):
         game_state.name = message.text
-        msg = bot.send_message(message.chat.id, "Введите минимальное количество игроков:")
+        msg = outbound.call(bot, "send_message", message.chat.id, "Введите минимальное количество игроков:")
         bot.register_next_step_handler(msg, process_min_players)
 
     def process_min_players(message):
@@ -261,12 +305,12 @@ def register_handlers(bot: TeleBot):
             min_players = int(message.text)
             if min_players > 0:
                 game_state.min_players = min_players
-                msg = bot.send_message(message.chat.id, "Введите максимальное количество игроков:")
+                msg = outbound.call(bot, "send_message", message.chat.id, "Введите максимальное количество игроков:")
                 bot.register_next_step_handler(msg, process_max_players)
             else:
                 raise ValueError
         except ValueError:
-            msg = bot.send_message(message.chat.id, "Пожалуйста, введите положительное числовое значение для минимального количества игроков.")
+            msg = outbound.call(bot, "send_message", message.chat.id, "Пожалуйста, введите положительное числовое значение для минимального количества игроков.")
             bot.register_next_step_handler(msg, process_min_players)
 
     def process_max_players(message):
@@ -275,21 +319,21 @@ def register_handlers(bot: TeleBot):
             if max_players > 0:
                 if max_players >= game_state.min_players:
                     game_state.max_players = max_players
-                    msg = bot.send_message(message.chat.id, "Введите описание игры:")
+                    msg = outbound.call(bot, "send_message", message.chat.id, "Введите описание игры:")
                     bot.register_next_step_handler(msg, process_description)
                 else:
-                    msg = bot.send_message(message.chat.id, f"Максимальное количество игроков должно быть больше минимального ({game_state.min_players}). Пожалуйста, введите допустимое значение.")
+                    msg = outbound.call(bot, "send_message", message.chat.id, f"Максимальное количество игроков должно быть больше минимального ({game_state.min_players}). Пожалуйста, введите допустимое значение.")
                     bot.register_next_step_handler(msg, process_max_players)
             else:
                 raise ValueError
         except ValueError:
-            msg = bot.send_message(message.chat.id, "Пожалуйста, введите положительное числовое значение для максимального количества игроков.")
+            msg = outbound.call(bot, "send_message", message.chat.id, "Пожалуйста, введите положительное числовое значение для максимального количества игроков.")
             bot.register_next_step_handler(msg, process_max_players)
 
 
     def process_description(message):
         game_state.description = message.text
-        msg = bot.send_message(message.chat.id, "Введите ссылку на страницу с информацией об игре:")
+        msg = outbound.call(bot, "send_message", message.chat.id, "Введите ссылку на страницу с информацией об игре:")
         bot.register_next_step_handler(msg, process_link)
 
 
@@ -312,7 +356,7 @@ def register_handlers(bot: TeleBot):
 
         if is_valid_source:
             game_state.link = game_link
-            msg = bot.send_message(message.chat.id, "Игра через Tabletop Simulator? Да/Нет")
+            msg = outbound.call(bot, "send_message", message.chat.id, "Игра через Tabletop Simulator? Да/Нет")
             bot.register_next_step_handler(msg, process_online)
         else:
             # Update the error message with the embedded link
@@ -321,7 +365,7 @@ def register_handlers(bot: TeleBot):
                 "tesera.ru,boardgamegeek.com, или из "
                 "<a href='https://t.me/+HCf2_QuXVy5hMWRi'>Нашей группы</a>."
             )
-            msg = bot.send_message(message.chat.id, error_message, parse_mode='HTML',disable_web_page_preview=True)
+            msg = outbound.call(bot, "send_message", message.chat.id, error_message, parse_mode='HTML',disable_web_page_preview=True)
             bot.register_next_step_handler(msg, process_link)
 
 
@@ -331,7 +375,7 @@ def register_handlers(bot: TeleBot):
         elif message.text.lower() in ['нет', 'no']:
             game_state.online = 0
         else:
-            msg = bot.send_message(message.chat.id, "Пожалуйста, ответьте 'Да' или 'Нет':")
+            msg = outbound.call(bot, "send_message", message.chat.id, "Пожалуйста, ответьте 'Да' или 'Нет':")
             bot.register_next_step_handler(msg, process_online)
             return
 
@@ -339,7 +383,7 @@ def register_handlers(bot: TeleBot):
         summary =  (f"<b><a href='{game_state.link}'>{game_state.name}</a></b>\n"
                             f"<code>Число игроков: {game_state.min_players}-{game_state.max_players}</code>\n \n"
                             f"<code>{game_state.description} </code>\n")
-        bot.send_message(message.chat.id, "\n\n" + summary,parse_mode='HTML',disable_web_page_preview=True)
+        outbound.fire(bot, "send_message", message.chat.id, "\n\n" + summary,parse_mode='HTML',disable_web_page_preview=True)
 
         # save_game_to_database
         crud.add_game(
@@ -355,7 +399,8 @@ def register_handlers(bot: TeleBot):
 
         if hosted_games:
             keyboard = InlineKeyboardMarkup()
-            sorted_games = sorted(hosted_games, key=lambda game: (game.date, game.time))
+            zone = user_timezones.zone(user_id)
+            sorted_games = sorted(hosted_games, key=lambda game: game.datetime)
             for game in sorted_games:
                 # Get game details
                 game_details = crud.get_game_details(game.game_id)
@@ -363,152 +408,164 @@ def register_handlers(bot: TeleBot):
                     continue  # Skip if game details are not found
                 try:
                     # Parse game date and time
-                    game_date = game.datetime
+                    game_date = localize(game.datetime, zone)
                     game_info = f'{game_details.name} - {game_date.strftime("%d.%m.%Y %H:%M")}'
                     # Add a button for each game
-                    keyboard.add(InlineKeyboardButton(game_info, callback_data=f'delete_game_{game.id}'))
+                    keyboard.add(InlineKeyboardButton(game_info, callback_data=f'delete_game_{game.key}'))
                 except ValueError as e:
-                    print(f"Error parsing date for game {game.id}: {e}")
+                    logger.warning(f"Error parsing date for game {game.key}: {e}")
                     continue  # Skip this game if date parsing fails
 
             # Acknowledge the callback query
-            bot.answer_callback_query(call.id)
+            outbound.fire(bot, "answer_callback_query", call.id)
 
             # Send a message to display the inline keyboard
-            bot.send_message(call.message.chat.id,
-                            "Пожалуйста, выберите анонс, который хотите удалить",
-                            reply_markup=keyboard)
+            outbound.fire(bot, "send_message", call.message.chat.id,
+                          "Пожалуйста, выберите анонс, который хотите удалить",
+                          reply_markup=keyboard)
         else:
-            bot.answer_callback_query(call.id)
+            outbound.fire(bot, "answer_callback_query", call.id)
 
             # Inform the user that they are not an organizer of any games
-            bot.send_message(call.message.chat.id,
-                            "Вы не являетесь организатором ни одной игры.")
+            outbound.fire(bot, "send_message", call.message.chat.id,
+                          "Вы не являетесь организатором ни одной игры.")
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith('select_unsubscribe_game'))
     def handle_select_unsubscribe_game(call):
-        bot.answer_callback_query(call.id)  # Acknowledge the callback query
+        outbound.fire(bot, "answer_callback_query", call.id)  # Acknowledge the callback query
         user_id = call.from_user.id
         enrolled_games = crud.get_enrolled_games_by_user(user_id)
 
         if enrolled_games:
             keyboard = InlineKeyboardMarkup()
-            sorted_games = sorted(enrolled_games, key=lambda game: (game.date, game.time))
+            zone = user_timezones.zone(user_id)
+            sorted_games = sorted(enrolled_games, key=lambda game: game.datetime)
             for game in sorted_games:
                 game_details = crud.get_game_details(game.game_id)
-                game_datetime = game.datetime
+                game_datetime = localize(game.datetime, zone)
                 game_info = f'{game_details.name} - {game_datetime.strftime("%d.%m.%Y %H:%M")}'
-                keyboard.add(InlineKeyboardButton(game_info, callback_data=f'unsubscribe_game_{game.id}'))
-            bot.edit_message_text("Пожалуйста, выберите анонс, который хотите покинуть", call.message.chat.id,
-                                call.message.message_id, reply_markup=keyboard)
+                keyboard.add(InlineKeyboardButton(game_info, callback_data=f'unsubscribe_game_{game.key}'))
+            outbound.fire(bot, "edit_message_text", "Пожалуйста, выберите анонс, который хотите покинуть", call.message.chat.id,
+                          call.message.message_id, reply_markup=keyboard)
         else:
-            bot.answer_callback_query(call.id, "Вы не записаны ни на одну игру.", show_alert=True)
+            outbound.fire(bot, "answer_callback_query", call.id, "Вы не записаны ни на одну игру.", show_alert=True)
 
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith('unsubscribe_game_'))
     def handle_unsubscribe_game(call):
-        game_id = int(call.data.split('_')[-1])
+        key = call.data.split('_')[-1]
         user_id = call.from_user.id
 
-        result = crud.get_scheduled_game_by_id(game_id)
+        result = crud.get_occurrence(key)
 
         if result:
             initiator_id = result.initiator_id
             if str(user_id) == str(initiator_id):
-                bot.answer_callback_query(call.id, "Вы создали данную игру. Поэтому её можно только удалить.", show_alert=True)
+                outbound.fire(bot, "answer_callback_query", call.id, "Вы создали данную игру. Поэтому её можно только удалить.", show_alert=True)
                 return
 
-            enrolled_user_ids = result.player_ids.split(',') if result.player_ids else []
-            player_nicknames = result.player_nicknames.split(',') if result.player_nicknames else []
-
-            if str(user_id) in enrolled_user_ids:
-                index = enrolled_user_ids.index(str(user_id))
-                enrolled_user_ids.pop(index)
-                player_nicknames.pop(index)
-
-                updated_user_ids = ','.join(enrolled_user_ids)
-                updated_nicknames = ','.join(player_nicknames)
+            # The freed seat goes to the first waitlisted player in the same transaction
+            game_id = crud.materialize_occurrence(key)
+            left, promoted = crud.leave_game(game_id, user_id)
 
-                crud.update_scheduled_game_players(game_id, updated_user_ids, updated_nicknames)
+            if left:
+                notify_promoted(bot, game_id, promoted)
 
                 game_name = crud.get_game_name_by_id(result.game_id)
-                game_date = result.date.strftime('%d.%m.%Y')
-                game_time = result.time.strftime('%H:%M')
+                start = localize(result.datetime, user_timezones.zone(user_id))
+                game_date = start.strftime('%d.%m.%Y')
+                game_time = start.strftime('%H:%M')
 
                 unsubscribe_message = (f"Вы успешно отписались от игры <b>{game_name}</b> на "
                                     f" <b>{game_date}</b> в <b>{game_time}</b>.")
-                bot.answer_callback_query(call.id, "Вы успешно отписались от игры.")
-                bot.send_message(call.message.chat.id, unsubscribe_message, parse_mode='HTML')
+                outbound.fire(bot, "answer_callback_query", call.id, "Вы успешно отписались от игры.")
+                outbound.fire(bot, "send_message", call.message.chat.id, unsubscribe_message, parse_mode='HTML')
             else:
-                bot.answer_callback_query(call.id, "Вы не записаны на эту игру.", show_alert=True)
+                outbound.fire(bot, "answer_callback_query", call.id, "Вы не записаны на эту игру.", show_alert=True)
         else:
-            bot.answer_callback_query(call.id, "Игра не найдена.", show_alert=True)
+            outbound.fire(bot, "answer_callback_query", call.id, "Игра не найдена.", show_alert=True)
 
     
     @bot.callback_query_handler(func=lambda call: call.data.startswith('delete_game_'))
     def handle_delete_game(call):
-        game_id = int(call.data.split('_')[-1])
+        key = call.data.split('_')[-1]
         user_id = call.from_user.id
 
-        initiator_id, game_tree = crud.get_game_initiator_and_tree(game_id)
+        initiator_id, series_id = get_initiator_and_series(key)
 
         if initiator_id and str(user_id) == str(initiator_id):
             # Ask the user if they want to delete a single game or the entire series
             markup = InlineKeyboardMarkup()
             single_game_btn = InlineKeyboardButton("Удалить только эту игру",
-                                                        callback_data=f'delete_single_{game_id}')
+                                                        callback_data=f'delete_single_{key}')
             entire_series_btn = InlineKeyboardButton("Удалить всю серию игр",
-                                                        callback_data=f'delete_series_{game_id}')
+                                                        callback_data=f'delete_series_{key}')
             markup.add(single_game_btn, entire_series_btn)
+            markup.add(InlineKeyboardButton("Добавить место", callback_data=f'add_seat_{key}'))
 
-            bot.send_message(call.message.chat.id, "Вы хотите удалить только эту игру или всю серию?", reply_markup=markup)
+            outbound.fire(bot, "send_message", call.message.chat.id, "Вы хотите удалить только эту игру или всю серию?", reply_markup=markup)
         else:
-            bot.answer_callback_query(call.id, "Вы не являетесь организатором этой игры.", show_alert=True)
+            outbound.fire(bot, "answer_callback_query", call.id, "Вы не являетесь организатором этой игры.", show_alert=True)
+
+    @bot.callback_query_handler(func=lambda call: call.data.startswith('add_seat_'))
+    def handle_add_seat(call):
+        key = call.data.split('_')[-1]
+        initiator_id, _ = get_initiator_and_series(key)
+
+        if not initiator_id or str(call.from_user.id) != str(initiator_id):
+            outbound.fire(bot, "answer_callback_query", call.id, app_strings.not_initiator, show_alert=True)
+            return
+
+        game_id = crud.materialize_occurrence(key)
+        capacity = crud.get_game_capacity(game_id) if game_id else None
+        if capacity is None:
+            outbound.fire(bot, "answer_callback_query", call.id, "Игра не найдена.", show_alert=True)
+            return
+
+        promoted = crud.set_game_capacity(game_id, capacity + 1)
+        notify_promoted(bot, game_id, promoted)
+        outbound.fire(bot, "answer_callback_query", call.id, app_strings.seat_added.format(max_players=capacity + 1))
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith('delete_series_'))
     def handle_delete_series(call):
-        game_id = int(call.data.split('_')[-1])
+        key = call.data.split('_')[-1]
         user_id = call.from_user.id
 
-        # Fetch the GameTree
-        game_tree = crud.get_game_tree_by_id(game_id)
-
-        if game_tree:  # Check if GameTree exists
-            game_tree_ids = game_tree.split(',')
-
-            # Include the parent game ID if it's not already in the GameTree
-            if str(game_id) not in game_tree_ids:
-                game_tree_ids.append(str(game_id))
+        initiator_id, series_id = get_initiator_and_series(key)
+        if not initiator_id or str(user_id) != str(initiator_id):
+            outbound.fire(bot, "answer_callback_query", call.id, app_strings.not_initiator, show_alert=True)
+            return
 
+        if series_id:
             # Delete all games in the series
-            crud.delete_games_by_ids(game_tree_ids)
-            bot.answer_callback_query(call.id, "Серия игр успешно удалена.")
-            bot.send_message(call.message.chat.id, "Вы успешно удалили всю серию игр.")
+            crud.delete_series(series_id)
+            outbound.fire(bot, "answer_callback_query", call.id, "Серия игр успешно удалена.")
+            outbound.fire(bot, "send_message", call.message.chat.id, "Вы успешно удалили всю серию игр.")
         else:
-            bot.answer_callback_query(call.id, "Игра не является регулярной.", show_alert=True)
+            outbound.fire(bot, "answer_callback_query", call.id, "Игра не является регулярной.", show_alert=True)
 
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith('delete_single_'))
     def handle_delete_confirmation(call):
-        game_id = int(call.data.split('_')[-1])
+        key = call.data.split('_')[-1]
         user_id = call.from_user.id
 
-        initiator_id, game_tree = crud.get_game_initiator_and_tree(game_id)
+        initiator_id, series_id = get_initiator_and_series(key)
 
         if initiator_id and str(user_id) == str(initiator_id):
             if call.data.startswith('delete_single_'):
-                # Delete only the selected game
-                crud.update_game_skipped_status(game_id, True)
-                bot.answer_callback_query(call.id, "Игра успешно удалена.")
-                bot.send_message(call.message.chat.id, "Вы успешно удалили игру.")
+                # Delete only the selected game, an occurrence of a series becomes an exception of its rule
+                crud.cancel_occurrence(key)
+                outbound.fire(bot, "answer_callback_query", call.id, "Игра успешно удалена.")
+                outbound.fire(bot, "send_message", call.message.chat.id, "Вы успешно удалили игру.")
         else:
-            bot.answer_callback_query(call.id, app_strings.not_initiator, show_alert=True)
+            outbound.fire(bot, "answer_callback_query", call.id, app_strings.not_initiator, show_alert=True)
 
 
     @bot.callback_query_handler(
         func=lambda call: call.data.startswith('enroll') or call.data.startswith('back_to_main') or call.data.startswith('update_schedule') or call.data.startswith('my_games'))
     def handle_callback(call):
-        bot.answer_callback_query(call.id)
+        outbound.fire(bot, "answer_callback_query", call.id)
 
         data = call.data
         chat_id = call.message.chat.id
@@ -516,42 +573,46 @@ def register_handlers(bot: TeleBot):
 
         try:
             # Initial call when data is 'enroll'
+            zone = user_timezones.zone(call.from_user.id)
             if data == 'enroll':
-                available_games = crud.get_scheduled_games()
+                page = crud.get_scheduled_games_page(limit=GAMES_PER_PAGE, zone=zone)
 
-                if available_games:
-                    handle_enroll_page(chat_id, available_games, page=1, message_id=message_id)
+                if page.items:
+                    handle_enroll_page(chat_id, page, zone, message_id=message_id)
                 else:
-                    bot.edit_message_text(chat_id=chat_id, message_id=message_id, text='На данный момент нет доступных игр для записи.')
+                    outbound.fire(bot, "edit_message_text", chat_id=chat_id, message_id=message_id, text='На данный момент нет доступных игр для записи.')
 
             # Handling page navigation
             elif data.startswith('enroll_page_'):
-                page = int(data.split('_')[-1])
-                available_games = crud.get_scheduled_games()
-                handle_enroll_page(chat_id, available_games, page=page, message_id=message_id)
+                direction, cursor = data.split('_')[-2:]
+                if direction == 'prev':
+                    page = crud.get_scheduled_games_page(before_key=cursor, limit=GAMES_PER_PAGE, zone=zone)
+                else:
+                    page = crud.get_scheduled_games_page(after_key=cursor, limit=GAMES_PER_PAGE, zone=zone)
+                handle_enroll_page(chat_id, page, zone, message_id=message_id)
 
             # Handling game enrollment
             elif data.startswith('enroll_game_'):
-                game_id = int(data.split('_')[2])
+                # An occurrence of a series gets its row on the first enrollment
+                game_id = crud.materialize_occurrence(data.split('_')[2])
                 user_id = call.from_user.id
-                scheduled_game = crud.get_scheduled_game_by_id(game_id)
+                nickname = get_initiator_username(bot, call.message.chat.id, user_id, call.from_user)
+                status = crud.enroll_player(game_id, user_id, nickname) if game_id else crud.EnrollmentStatus.NOT_FOUND
 
-                player_ids = scheduled_game.player_ids.split(',') if scheduled_game.player_ids else []
-                if str(user_id) in player_ids:
-                    message = "Вы уже записались на эту игру"
-                    bot.send_message(user_id, text=message, parse_mode="HTML", disable_web_page_preview=True)
+                if status != crud.EnrollmentStatus.JOINED:
+                    message = app_strings.enrollment_status[status.value]
+                    outbound.fire(bot, "send_message", user_id, text=message, parse_mode="HTML", disable_web_page_preview=True)
                 else:
-                    lib_id = scheduled_game.game_id if scheduled_game else None
-                    nickname = get_initiator_username(bot, call.message.chat.id, user_id)  # Fetch the user nickname
-                    
+                    scheduled_game = crud.get_scheduled_game_by_id(game_id)
                     game = crud.get_game_details(scheduled_game.game_id)
-                    scheduled_game = crud.add_player_to_game(user_id, game_id, lib_id, nickname)  # Pass the nickname
+                    start = localize(scheduled_game.datetime, zone)
                     if scheduled_game.server_data:
                         message = app_strings.game_info_steam_template.format(
                             game_name=game.name,
-                            formatted_date_ru=scheduled_game.date.strftime('%d.%m.%Y'),
-                            day_of_week=scheduled_game.date.strftime('%A'),
-                            formatted_time=scheduled_game.time.strftime('%H:%M'),
+                            formatted_date_ru=start.strftime('%d.%m.%Y'),
+                            day_of_week=start.strftime('%A'),
+                            formatted_time=start.strftime('%H:%M'),
+                            timezone=zone_label(start),
                             room_link=config.app.room_to_link.get(str(scheduled_game.room)),
                             room=scheduled_game.room,
                             server_data=scheduled_game.server_data,
@@ -561,15 +622,16 @@ def register_handlers(bot: TeleBot):
                     else:
                         message = app_strings.game_info_template.format(
                             game_name=game.name,
-                            formatted_date_ru=scheduled_game.date.strftime('%d.%m.%Y'),
+                            formatted_date_ru=start.strftime('%d.%m.%Y'),
                             room_link=config.app.room_to_link.get(str(scheduled_game.room)),
-                            day_of_week=scheduled_game.date.strftime('%A'),
-                            formatted_time=scheduled_game.time.strftime('%H:%M'),
+                            day_of_week=start.strftime('%A'),
+                            formatted_time=start.strftime('%H:%M'),
+                            timezone=zone_label(start),
                             room=scheduled_game.room,
                             initiator_nickname=scheduled_game.initiator_name
                         )
 
-                    bot.send_message(user_id, text=message, parse_mode="HTML", disable_web_page_preview=True)
+                    outbound.fire(bot, "send_message", user_id, text=message, parse_mode="HTML", disable_web_page_preview=True)
 
             # Handling callback data for main menu
             elif data == 'back_to_main':
@@ -578,7 +640,7 @@ def register_handlers(bot: TeleBot):
                 keyboard.row(InlineKeyboardButton("Обновить расписание", callback_data='update_schedule'))
                 keyboard.row(InlineKeyboardButton("Мои игры", callback_data='my_games'))
                 new_text = 'Выберите действие:'
-                bot.send_message(chat_id=chat_id, text=new_text, reply_markup=keyboard)
+                outbound.fire(bot, "send_message", chat_id=chat_id, text=new_text, reply_markup=keyboard)
 
             # Handling callback data for 'my_games' and 'my_gamescommand'
             elif data == 'my_games' or data == 'my_gamescommand':
@@ -586,25 +648,23 @@ def register_handlers(bot: TeleBot):
                 enrolled_games = crud.get_enrolled_games_by_user(user_id)
                 if enrolled_games:
                     formatted_message, keyboard = format_enrolled_games(enrolled_games, chat_id, user_id)
-                    bot.send_message(chat_id=chat_id, text=formatted_message, reply_markup=keyboard, parse_mode='HTML',
-                                    disable_web_page_preview=True)
+                    outbound.fire(bot, "send_message", chat_id=chat_id, text=formatted_message, reply_markup=keyboard, parse_mode='HTML',
+                                  disable_web_page_preview=True)
                 else:
-                    bot.send_message(chat_id, 'Вы не записаны на ни одну игру.')
+                    outbound.fire(bot, "send_message", chat_id, 'Вы не записаны на ни одну игру.')
 
             # Handling callback data for 'update_schedule'
+            elif data == 'update_schedule' and live_board:
+                live_board.publish(chat_id)
+
             elif data == 'update_schedule':
-                new_games = crud.get_scheduled_games()
-                if new_games:
-                    formatted_message = format_scheduled_games(bot, new_games, call.message.chat.id)
-                    keyboard = InlineKeyboardMarkup()
-                    keyboard.row(InlineKeyboardButton("Записаться", callback_data='enroll'))
-                    keyboard.row(InlineKeyboardButton("Обновить расписание", callback_data='update_schedule'))
-                    keyboard.row(InlineKeyboardButton("Мои игры", callback_data='my_games'))
-                    bot.send_message(call.message.chat.id, text=formatted_message, reply_markup=keyboard, parse_mode='HTML',
-                                    disable_web_page_preview=True)
+                formatted_message, keyboard = schedule_cache.get()
+                if keyboard:
+                    outbound.fire(bot, "send_message", call.message.chat.id, text=formatted_message, reply_markup=keyboard, parse_mode='HTML',
+                                  disable_web_page_preview=True)
                 else:
-                    bot.send_message(call.message.chat.id, 'На данный момент нет доступных игр для записи.')
+                    outbound.fire(bot, "send_message", call.message.chat.id, 'На данный момент нет доступных игр для записи.')
 
         except Exception as e:
-            print(f"Error in handle_callback: {e}")
-            bot.send_message(chat_id, app_strings.error)
+            logger.exception(f"Error in handle_callback: {e}")
+            outbound.fire(bot, "send_message", chat_id, app_strings.error)
@@ -3,6 +3,8 @@ import logging
 from omegaconf import OmegaConf
 from telebot import TeleBot
 
+from ...outbound import outbound
+
 
 # Load logging configuration with OmegaConf
 logging.basicConfig(level=logging.INFO)
@@ -13,17 +15,17 @@ app_config = config.app
 app_strings = config.strings
 
 
+def is_known_command(text: str) -> bool:
+    """Check a message against the known commands, ignoring their arguments."""
+    parts = (text or "").split()
+    return bool(parts) and parts[0][1:] in app_config.commands
+
+
 def register_handlers(bot: TeleBot):
     """ Register handlers host game app """
 
     logger.info("Registering `known_commands` handlers")
-    @bot.message_handler(func=lambda message: True)
+    # Known commands are not matched, so that the handlers registered after this one, e.g. admin, catch them
+    @bot.message_handler(func=lambda message: not is_known_command(message.text))
     def handle_known_commands(message):
-
-        command_stem = message.text[1:]
-
-        if command_stem in app_config.commands:
-            # If the message is a known command, do nothing and let the appropriate handler catch it
-            return
-        else:
-            bot.send_message(message.chat.id, app_strings.message)
\ No newline at end of file
+        outbound.fire(bot, "send_message", message.chat.id, app_strings.message)
\ No newline at end of file
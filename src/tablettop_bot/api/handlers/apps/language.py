@@ -5,6 +5,7 @@ from telebot import TeleBot
 from telebot.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 
 from ....db import crud
+from ...outbound import outbound
 
 # Load logging configuration with OmegaConf
 logging.basicConfig(level=logging.INFO)
@@ -37,7 +38,9 @@ def register_handlers(bot: TeleBot):
 
         lang_menu_markup = create_lang_menu_markup(app_strings[user.lang])
 
-        bot.edit_message_text(
+        outbound.fire(
+            bot,
+            "edit_message_text",
             chat_id=call.message.chat.id,
             message_id=call.message.message_id,
             text=app_strings[user.lang].select_language,
@@ -50,7 +53,9 @@ def register_handlers(bot: TeleBot):
         user = data["user"]
         crud.update_user(id=user.id, lang=new_lang)
 
-        bot.edit_message_text(
+        outbound.fire(
+            bot,
+            "edit_message_text",
             chat_id=call.message.chat.id,
             message_id=call.message.message_id,
             text=app_strings[new_lang].language_updated,
@@ -5,6 +5,7 @@ from telebot import TeleBot
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from ....db import crud
+from ...outbound import outbound
 
 # Load logging configuration with OmegaConf
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +14,8 @@ logger = logging.getLogger(__name__)
 config = OmegaConf.load("./src/tablettop_bot/conf/apps/library.yaml")
 app_strings = config.strings
 
+ITEMS_PER_PAGE = 11
+
 
 def get_game_info_message(game_id):
     game_info = crud.get_game_details(game_id)
@@ -38,86 +41,82 @@ def register_handlers(bot: TeleBot):
     logger.info("Registering library app handlers")
     @bot.message_handler(commands=['library'])
     def handle_library_command(message):
-        initial_message = bot.send_message(message.chat.id, app_strings.library_list)
+        initial_message = outbound.call(bot, "send_message", message.chat.id, app_strings.library_list)
         game_library(message.chat.id, initial_message.message_id)
 
 
-    def game_library(chat_id, message_id, page=0):
-        games = crud.get_offline_games()
+    def game_library(chat_id, message_id, after_id=None, before_id=None):
+        page = crud.get_games_page(online=False, after_id=after_id, before_id=before_id, limit=ITEMS_PER_PAGE)
 
-        if not games:
-            bot.send_message(chat_id, app_strings.library_empty)
+        if not page.items:
+            outbound.fire(bot, "send_message", chat_id, app_strings.library_empty)
             return
 
-        items_per_page = 11
-        total_pages = (len(games) + items_per_page - 1) // items_per_page
-        page_games = games[page * items_per_page: (page + 1) * items_per_page]
-
         keyboard = InlineKeyboardMarkup()
-        for game in page_games:
+        for game in page.items:
             keyboard.add(InlineKeyboardButton(game.name, callback_data=f'game_info_{game.id}'))
 
         navigation_buttons = []
-        if total_pages > 1:
-            if page > 0:
-                navigation_buttons.append(
-                    InlineKeyboardButton(app_strings.prev_page, callback_data=f'prev_page_library_{page - 1}'))
-            if page < total_pages - 1:
-                navigation_buttons.append(
-                    InlineKeyboardButton(app_strings.next_page, callback_data=f'next_page_library_{page + 1}'))
+        if page.has_prev:
+            navigation_buttons.append(
+                InlineKeyboardButton(app_strings.prev_page, callback_data=f'prev_page_library_{page.first_id}'))
+        if page.has_next:
+            navigation_buttons.append(
+                InlineKeyboardButton(app_strings.next_page, callback_data=f'next_page_library_{page.last_id}'))
         if navigation_buttons:
             keyboard.row(*navigation_buttons)
 
-        bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=keyboard)
+        outbound.fire(bot, "edit_message_reply_markup", chat_id=chat_id, message_id=message_id, reply_markup=keyboard)
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith('prev_page_library') or call.data.startswith('next_page_library'))
     def handle_library_page_navigation(call):
-        page = int(call.data.split('_')[-1])
-        game_library(call.message.chat.id, call.message.message_id, page=page)
+        cursor = int(call.data.split('_')[-1])
+        if call.data.startswith('prev_page'):
+            game_library(call.message.chat.id, call.message.message_id, before_id=cursor)
+        else:
+            game_library(call.message.chat.id, call.message.message_id, after_id=cursor)
 
 
     @bot.message_handler(commands=['tabletop_library'])
     def handle_online_library_command(message):
-        initial_message = bot.send_message(message.chat.id, app_strings.online_library_list)
+        initial_message = outbound.call(bot, "send_message", message.chat.id, app_strings.online_library_list)
         online_library(message.chat.id, initial_message.message_id)
 
 
-    def online_library(chat_id, message_id, page=0):
-        online_games = crud.get_online_games()
+    def online_library(chat_id, message_id, after_id=None, before_id=None):
+        page = crud.get_games_page(online=True, after_id=after_id, before_id=before_id, limit=ITEMS_PER_PAGE)
 
-        if not online_games:
-            bot.send_message(chat_id, app_strings.online_library_empty)
+        if not page.items:
+            outbound.fire(bot, "send_message", chat_id, app_strings.online_library_empty)
             return
 
-        items_per_page = 11
-        total_pages = (len(online_games) + items_per_page - 1) // items_per_page
-        page_games = online_games[page * items_per_page: (page + 1) * items_per_page]
-
         keyboard = InlineKeyboardMarkup()
-        for game in page_games:
+        for game in page.items:
             keyboard.add(InlineKeyboardButton(game.name, callback_data=f'game_info_{game.id}'))
 
         navigation_buttons = []
-        if total_pages > 1:
-            if page > 0:
-                navigation_buttons.append(
-                    InlineKeyboardButton(app_strings.prev_page, callback_data=f'prev_page_online_{page - 1}'))
-            if page < total_pages - 1:
-                navigation_buttons.append(
-                    InlineKeyboardButton(app_strings.next_page, callback_data=f'next_page_online_{page + 1}'))
+        if page.has_prev:
+            navigation_buttons.append(
+                InlineKeyboardButton(app_strings.prev_page, callback_data=f'prev_page_online_{page.first_id}'))
+        if page.has_next:
+            navigation_buttons.append(
+                InlineKeyboardButton(app_strings.next_page, callback_data=f'next_page_online_{page.last_id}'))
         if navigation_buttons:
             keyboard.row(*navigation_buttons)
 
-        bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=keyboard)
+        outbound.fire(bot, "edit_message_reply_markup", chat_id=chat_id, message_id=message_id, reply_markup=keyboard)
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith('prev_page_online') or call.data.startswith('next_page_online'))
     def handle_online_page_navigation(call):
-        page = int(call.data.split('_')[-1])
-        online_library(call.message.chat.id, call.message.message_id, page=page)
+        cursor = int(call.data.split('_')[-1])
+        if call.data.startswith('prev_page'):
+            online_library(call.message.chat.id, call.message.message_id, before_id=cursor)
+        else:
+            online_library(call.message.chat.id, call.message.message_id, after_id=cursor)
 
 
     @bot.callback_query_handler(func=lambda call: call.data.startswith('game_info_'))
     def handle_select_game(call):
         game_id = int(call.data.split('_')[-1])
         game_message = get_game_info_message(game_id)
-        bot.send_message(call.message.chat.id, game_message, parse_mode='HTML')
+        outbound.fire(bot, "send_message", call.message.chat.id, game_message, parse_mode='HTML')
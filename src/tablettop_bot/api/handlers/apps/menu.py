@@ -3,6 +3,8 @@ import logging.config
 from omegaconf import OmegaConf
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 
+from ...outbound import outbound
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -25,4 +27,4 @@ def register_handlers(bot):
     def menu_menu_command(message: Message, data: dict):
         user = data["user"]
 
-        bot.send_message(message.chat.id, strings[user.lang].title, reply_markup=create_user_menu_markup(user.lang))
+        outbound.fire(bot, "send_message", message.chat.id, strings[user.lang].title, reply_markup=create_user_menu_markup(user.lang))
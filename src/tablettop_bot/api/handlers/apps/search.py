@@ -0,0 +1,81 @@
+import logging
+
+from omegaconf import OmegaConf
+from telebot import TeleBot
+from telebot.types import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
+
+from ....db import crud
+from ...outbound import outbound
+from .library import get_game_info_message
+
+# Load logging configuration with OmegaConf
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+config = OmegaConf.load("./src/tablettop_bot/conf/apps/search.yaml")
+app_strings = config.strings
+
+
+def create_results_markup(games) -> InlineKeyboardMarkup:
+    keyboard = InlineKeyboardMarkup()
+    for game in games:
+        keyboard.add(InlineKeyboardButton(game.name, callback_data=f'game_info_{game.id}'))
+    return keyboard
+
+
+def create_inline_result(game) -> InlineQueryResultArticle:
+    return InlineQueryResultArticle(
+        id=str(game.id),
+        title=game.name,
+        description=(game.description or "")[:100],
+        input_message_content=InputTextMessageContent(
+            get_game_info_message(game.id), parse_mode='HTML', disable_web_page_preview=True
+        ),
+    )
+
+
+def register_handlers(bot: TeleBot):
+    """ Register handlers for game search app """
+
+    logger.info("Registering `search` handlers")
+
+    @bot.message_handler(commands=['find'])
+    def handle_find_command(message):
+        query = message.text.partition(' ')[2].strip()
+        if query:
+            send_search_results(message.chat.id, query)
+        else:
+            msg = outbound.call(bot, "send_message", message.chat.id, app_strings.enter_query)
+            bot.register_next_step_handler(msg, process_query)
+
+    def process_query(message):
+        send_search_results(message.chat.id, (message.text or '').strip())
+
+    def send_search_results(chat_id, query):
+        games = crud.search_games(query, limit=config.app.results_limit)
+        if games:
+            outbound.fire(
+                bot, "send_message", chat_id, app_strings.results.format(query=query),
+                reply_markup=create_results_markup(games),
+            )
+        else:
+            outbound.fire(bot, "send_message", chat_id, app_strings.nothing_found.format(query=query))
+
+    @bot.inline_handler(func=lambda query: True)
+    def handle_inline_query(inline_query: InlineQuery):
+        query = inline_query.query.strip()
+        if query:
+            games = crud.search_games(query, limit=config.app.inline_results_limit)
+        else:
+            games = crud.get_all_games()[:config.app.inline_results_limit]
+
+        outbound.fire(
+            bot, "answer_inline_query", inline_query.id, [create_inline_result(game) for game in games],
+            cache_time=config.app.inline_cache_time,
+        )
@@ -0,0 +1,64 @@
+import logging
+from zoneinfo import available_timezones
+
+from omegaconf import OmegaConf
+from telebot import TeleBot
+from telebot.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
+
+from ....core.timezones import get_zone, user_timezones, utcnow, zone_label
+from ....db import crud
+from ...outbound import outbound
+
+# Load logging configuration with OmegaConf
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+config = OmegaConf.load("./src/tablettop_bot/conf/apps/timezone.yaml")
+app_strings = config.strings
+
+
+def describe_zone(name):
+    return f"{name} ({zone_label(utcnow().astimezone(get_zone(name)))})"
+
+
+def create_timezone_markup():
+    markup = InlineKeyboardMarkup(row_width=1)
+    for name in config.app.zones:
+        markup.add(InlineKeyboardButton(describe_zone(name), callback_data=f"tz_{name}"))
+    return markup
+
+
+def register_handlers(bot: TeleBot):
+    """ Register handlers for timezone app """
+
+    logger.info("Registering `timezone` handlers")
+
+    def set_timezone(user_id, chat_id, name):
+        crud.update_user(id=user_id, timezone=name)
+        user_timezones.remember(user_id, name)
+        outbound.fire(bot, "send_message", chat_id, app_strings.timezone_updated.format(timezone=describe_zone(name)))
+
+    @bot.message_handler(commands=["timezone"])
+    def handle_timezone(message: Message, data: dict):
+        user = data["user"]
+        name = message.text.partition(" ")[2].strip()
+        if not name:
+            current = user.timezone or str(get_zone())
+            outbound.fire(
+                bot,
+                "send_message",
+                message.chat.id,
+                app_strings.select_timezone.format(timezone=describe_zone(current)),
+                reply_markup=create_timezone_markup(),
+            )
+        elif name in available_timezones():
+            set_timezone(user.id, message.chat.id, name)
+        else:
+            outbound.fire(bot, "send_message", message.chat.id, app_strings.unknown_timezone)
+
+    @bot.callback_query_handler(func=lambda call: call.data.startswith("tz_"))
+    def handle_timezone_selection(call: CallbackQuery, data: dict):
+        name = call.data[len("tz_"):]
+        outbound.fire(bot, "answer_callback_query", call.id)
+        if name in config.app.zones:
+            set_timezone(data["user"].id, call.message.chat.id, name)
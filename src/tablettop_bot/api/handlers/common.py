@@ -2,6 +2,8 @@ from omegaconf import OmegaConf
 from telebot import types
 from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from tablettop_bot.api.outbound import outbound
+
 strings = OmegaConf.load("./src/tablettop_bot/conf/common.yaml")
 
 
@@ -44,5 +46,5 @@ def register_handlers(bot):
     def cancel_callback(call: types.CallbackQuery, data: dict):
         """Cancel current operation"""
         user = data["user"]
-        bot.send_message(call.message.chat.id, strings[user.lang].cancelled)
+        outbound.fire(bot, "send_message", call.message.chat.id, strings[user.lang].cancelled)
         bot.clear_step_handler_by_chat_id(chat_id=call.message.chat.id)
@@ -1,6 +1,8 @@
 from telebot import TeleBot
 from telebot.handler_backends import BaseMiddleware, CancelUpdate
 
+from tablettop_bot.api.outbound import outbound
+
 
 class AntifloodMiddleware(BaseMiddleware):
     def __init__(self, bot: TeleBot, limit: int) -> None:
@@ -22,7 +24,7 @@ class AntifloodMiddleware(BaseMiddleware):
             return
         if message.date - self.last_time[message.from_user.id] < self.limit:
             # User is flooding
-            self.bot.send_message(message.chat.id, "You are making request too often")
+            outbound.fire(self.bot, "send_message", message.chat.id, "You are making request too often")
             return CancelUpdate()
         self.last_time[message.from_user.id] = message.date
 
@@ -0,0 +1,74 @@
+import functools
+import logging
+import re
+import threading
+
+from telebot import TeleBot
+from telebot.handler_backends import BaseMiddleware
+from telebot.types import CallbackQuery, Message
+
+from tablettop_bot.db import instrumentation
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+_TRAILING_IDS = re.compile(r"(_-?\d+)+$")
+
+
+def get_update_label(update) -> str:
+    """Describe an update by its command or callback data without ids."""
+    if isinstance(update, CallbackQuery):
+        return f"callback:{_TRAILING_IDS.sub('', update.data or '')}"
+    if isinstance(update, Message) and update.text and update.text.startswith("/"):
+        return f"command:{update.text.split()[0]}"
+    return "message"
+
+
+class QueryBudgetMiddleware(BaseMiddleware):
+    """Middleware to count statements per update and log handlers over budget"""
+
+    def __init__(self, bot: TeleBot, max_queries: int, n_plus_one_threshold: int) -> None:
+        self.bot = bot
+        self.max_queries = max_queries
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.update_types = ["message", "callback_query"]
+        self._local = threading.local()
+        for handler in bot.message_handlers + bot.callback_query_handlers:
+            handler["function"] = self.record_handler(handler["function"])
+
+    def record_handler(self, function):
+        """Wrap a registered handler to remember its name for the update being processed"""
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            self._local.handler = function.__name__
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    def get_handler_name(self, update) -> str:
+        """Name the handler that ran for the update, falling back to the update label"""
+        handler = getattr(self._local, "handler", None)
+        if handler is None:
+            return get_update_label(update)
+        return f"{handler} ({get_update_label(update)})"
+
+    def pre_process(self, update, data: dict):
+        """Start counting statements for the update"""
+        # A cancelled update never reaches post_process, drop its leftover counter
+        stale = getattr(self._local, "stats", None)
+        if stale is not None:
+            instrumentation.stop_tracking(stale)
+        self._local.handler = None
+        self._local.stats = instrumentation.start_tracking(get_update_label(update))
+
+    def post_process(self, update, data, exception):
+        """Stop counting and log the update if it broke the budget"""
+        stats = getattr(self._local, "stats", None)
+        if stats is None:
+            return
+        self._local.stats = None
+        instrumentation.stop_tracking(stats)
+        if instrumentation.find_offences(stats, self.max_queries, self.n_plus_one_threshold):
+            stats.name = self.get_handler_name(update)
+            instrumentation.report(stats, self.max_queries, self.n_plus_one_threshold)
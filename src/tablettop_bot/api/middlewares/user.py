@@ -5,6 +5,8 @@ from telebot.handler_backends import BaseMiddleware
 from telebot.states.sync.context import StateContext
 from telebot.types import CallbackQuery, Message
 
+from tablettop_bot.core.nicknames import display_name, nicknames
+from tablettop_bot.core.timezones import user_timezones
 from tablettop_bot.db import crud
 
 logger = logging.getLogger(__name__)
@@ -22,12 +24,14 @@ class UserMessageMiddleware(BaseMiddleware):
         """Pre-process the message"""
         state_context = StateContext(message, self.bot)
 
-        user = crud.upsert_user(
+        user = crud.touch_user(
             id=message.from_user.id,
             username=message.from_user.username,
             first_name=message.from_user.first_name,
             last_name=message.from_user.last_name,
         )
+        nicknames.remember(user.id, display_name(message.from_user))
+        user_timezones.remember(user.id, user.timezone)
         event = crud.create_event(user_id=user.id, content=message.text, type="message", state=state_context.get())
 
         # Log event to the console
@@ -51,12 +55,14 @@ class UserCallbackMiddleware(BaseMiddleware):
         """Pre-process the callback query"""
         state_context = StateContext(callback_query.message, self.bot)
 
-        user = crud.upsert_user(
+        user = crud.touch_user(
             id=callback_query.from_user.id,
             username=callback_query.from_user.username,
             first_name=callback_query.from_user.first_name,
             last_name=callback_query.from_user.last_name,
         )
+        nicknames.remember(user.id, display_name(callback_query.from_user))
+        user_timezones.remember(user.id, user.timezone)
         event = crud.create_event(
             user_id=user.id, content=callback_query.data, type="callback", state=state_context.get()
         )
@@ -0,0 +1,272 @@
+"""Outbound Telegram API calls with rate limits, retries and background delivery."""
+
+import inspect
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from telebot import TeleBot, apihelper
+from telebot.apihelper import ApiTelegramException
+from urllib3.exceptions import NewConnectionError
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Edits of one message can replace each other while they wait in the queue
+COALESCED_METHODS = {"edit_message_text", "edit_message_reply_markup"}
+
+_STOP = object()
+
+
+def is_unsent(error: Exception) -> bool:
+    """
+    Whether a request failed before it reached Telegram, so sending it again can not duplicate it.
+
+    After a read timeout or a dropped connection Telegram may have handled the request already.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], "reason", error.args[0]), NewConnectionError)
+    return False
+
+
+class TokenBucket:
+    """Token bucket rate limiter."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def is_full(self) -> bool:
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.burst
+
+
+class OutboundRequest:
+    """A queued API call."""
+
+    def __init__(self, bot: TeleBot, method: str, args: tuple, kwargs: dict, chat_id: Optional[int], coalesce_key=None):
+        self.bot = bot
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.chat_id = chat_id
+        self.coalesce_key = coalesce_key
+        self.future: Future = Future()
+
+
+def configure_http_session(pool_size: int) -> None:
+    """Share one keep-alive HTTP session between all threads that call the Telegram API."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    apihelper.session = session
+    apihelper.SESSION_TIME_TO_LIVE = None
+
+
+class OutboundQueue:
+    """
+    Send Telegram API calls through global and per-chat rate limits.
+
+    `call` runs a request in the calling thread and returns its result. `submit` and `fire`
+    queue it for a background worker; requests to one chat always go to the same worker,
+    so they keep their order. Pending edits of one message are coalesced, only the last
+    one is sent. A 429 response pauses all workers for the `retry_after` the API asked for.
+    Network errors are retried only if the request was never sent, see `is_unsent`.
+    Before `start` every request runs in the calling thread.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+        max_retries: int = 3,
+    ):
+        self.sent = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.configure(workers, global_rate, chat_rate, chat_burst, max_retries)
+        self._limits_lock = threading.Lock()
+        self._paused_until = 0.0
+        self._queues: list[queue.Queue] = []
+        self._threads: list[threading.Thread] = []
+        self._pending: dict[Any, OutboundRequest] = {}
+        self._pending_lock = threading.Lock()
+        self._signatures: dict[tuple, inspect.Signature] = {}
+
+    def configure(
+        self, workers: int, global_rate: float, chat_rate: float, chat_burst: float, max_retries: int
+    ) -> None:
+        """Set the limits. Workers only change on the next `start`."""
+        self.n_workers = workers
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: dict[int, TokenBucket] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self) -> None:
+        """Start the background workers."""
+        configure_http_session(self.n_workers + 4)
+        self._queues = [queue.Queue() for _ in range(self.n_workers)]
+        self._threads = [
+            threading.Thread(target=self._work, args=(q,), name=f"outbound-{i}", daemon=True)
+            for i, q in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Outbound queue started with {self.n_workers} workers")
+
+    def stop(self, timeout: float = 10.0) -> int:
+        """Deliver queued requests until the deadline and stop the workers. Return the number of dropped requests."""
+        if not self.running:
+            return 0
+        deadline = time.monotonic() + timeout
+        for q in self._queues:
+            q.put(_STOP)
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+
+        dropped = 0
+        for q in self._queues:
+            while not q.empty():
+                request = q.get_nowait()
+                if request is not _STOP and not request.future.done():
+                    request.future.cancel()
+                    dropped += 1
+        self._threads = []
+        self._queues = []
+        logger.info(f"Outbound queue stopped, sent: {self.sent}, failed: {self.failed}, dropped: {dropped}")
+        return dropped
+
+    def pending(self) -> int:
+        """Number of queued requests."""
+        return sum(q.qsize() for q in self._queues)
+
+    def _bind(self, bot: TeleBot, method: str, args: tuple, kwargs: dict) -> dict:
+        """Map the call's arguments to the API method's parameter names."""
+        key = (type(bot), method)
+        if key not in self._signatures:
+            self._signatures[key] = inspect.signature(getattr(bot, method))
+        try:
+            return self._signatures[key].bind_partial(*args, **kwargs).arguments
+        except TypeError:
+            return kwargs
+
+    def _wait_for_limits(self, chat_id: Optional[int]) -> None:
+        with self._limits_lock:
+            wait = max(self._global_bucket.reserve(), self._paused_until - time.monotonic())
+            if chat_id is not None:
+                if len(self._chat_buckets) > 10000:
+                    self._chat_buckets = {k: b for k, b in self._chat_buckets.items() if not b.is_full()}
+                bucket = self._chat_buckets.setdefault(chat_id, TokenBucket(self.chat_rate, self.chat_burst))
+                wait = max(wait, bucket.reserve())
+        if wait > 0:
+            time.sleep(wait)
+
+    def _execute(self, bot: TeleBot, method: str, args: tuple, kwargs: dict, chat_id: Optional[int]):
+        attempt = 0
+        while True:
+            self._wait_for_limits(chat_id)
+            try:
+                result = getattr(bot, method)(*args, **kwargs)
+                self.sent += 1
+                return result
+            except ApiTelegramException as e:
+                if e.error_code != 429 or attempt >= self.max_retries:
+                    raise
+                retry_after = (e.result_json or {}).get("parameters", {}).get("retry_after", 1)
+                logger.warning(f"Telegram API rate limit hit on {method}, retrying after {retry_after} seconds")
+                with self._limits_lock:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not is_unsent(e) or attempt >= self.max_retries:
+                    raise
+                logger.warning(f"Network error on {method}: {e}. Retrying")
+                time.sleep(2**attempt)
+            attempt += 1
+
+    def call(self, bot: TeleBot, method: str, *args, **kwargs):
+        """Run an API call in the calling thread, within the rate limits. Return its result."""
+        return self._execute(bot, method, args, kwargs, self._bind(bot, method, args, kwargs).get("chat_id"))
+
+    def submit(self, bot: TeleBot, method: str, *args, **kwargs) -> Future:
+        """Queue an API call for a background worker. Return a future with its result."""
+        bound = self._bind(bot, method, args, kwargs)
+        chat_id = bound.get("chat_id")
+        if not self.running:
+            future: Future = Future()
+            try:
+                future.set_result(self._execute(bot, method, args, kwargs, chat_id))
+            except Exception as e:
+                self.failed += 1
+                future.set_exception(e)
+            return future
+
+        coalesce_key = None
+        if method in COALESCED_METHODS:
+            coalesce_key = (method, chat_id, bound.get("message_id"), bound.get("inline_message_id"))
+            with self._pending_lock:
+                request = self._pending.get(coalesce_key)
+                if request is not None:
+                    request.args, request.kwargs = args, kwargs
+                    self.coalesced += 1
+                    return request.future
+
+        request = OutboundRequest(bot, method, args, kwargs, chat_id, coalesce_key)
+        if coalesce_key is not None:
+            with self._pending_lock:
+                self._pending[coalesce_key] = request
+        self._queues[hash(chat_id) % len(self._queues)].put(request)
+        return request.future
+
+    def fire(self, bot: TeleBot, method: str, *args, **kwargs) -> None:
+        """Queue an API call whose result nobody waits for. Errors are logged."""
+        future = self.submit(bot, method, *args, **kwargs)
+        future.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Background Telegram API call failed: {future.exception()}")
+
+    def _work(self, requests_queue: queue.Queue) -> None:
+        while True:
+            request = requests_queue.get()
+            if request is _STOP:
+                return
+            if request.coalesce_key is not None:
+                with self._pending_lock:
+                    self._pending.pop(request.coalesce_key, None)
+            if not request.future.set_running_or_notify_cancel():
+                continue
+            try:
+                request.future.set_result(self._execute(request.bot, request.method, request.args, request.kwargs, request.chat_id))
+            except Exception as e:
+                self.failed += 1
+                request.future.set_exception(e)
+
+
+outbound = OutboundQueue()
@@ -0,0 +1,184 @@
+"""Long polling of the Telegram updates with backoff, error classes and a persisted offset."""
+
+import itertools
+import logging
+import random
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Optional
+
+import requests
+from telebot import TeleBot
+from telebot.apihelper import ApiException, ApiTelegramException
+from telebot.types import Update
+
+from tablettop_bot.db import crud
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NETWORK_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+def classify(error: Exception) -> str:
+    """
+    Name the kind of a getUpdates failure.
+
+    "network" and "api" errors are retried with backoff, "fatal" ones, a revoked or
+    wrong token, never recover, and "bug" is anything else, retried but logged with its
+    traceback.
+    """
+    if isinstance(error, NETWORK_ERRORS):
+        return "network"
+    if isinstance(error, ApiTelegramException) and error.error_code in (401, 404):
+        return "fatal"
+    if isinstance(error, ApiException):
+        return "api"
+    return "bug"
+
+
+def backoff_delay(failures: int, base: float, maximum: float) -> float:
+    """Delay after `failures` failures in a row: doubled on each up to `maximum`, the upper half of it random."""
+    delay = min(maximum, base * 2 ** (failures - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds a 429 response asked to wait."""
+    if isinstance(error, ApiTelegramException) and error.error_code == 429:
+        return (error.result_json or {}).get("parameters", {}).get("retry_after")
+    return None
+
+
+class PollingSupervisor:
+    """
+    Long-poll getUpdates and handle every batch before the next one is fetched.
+
+    The updates of a batch are handled in `workers` threads. When they are done the id of
+    the last one is saved in the polling_offsets table, and polling resumes right after it,
+    also after a restart, so an update is handled once even when the process stopped in
+    between. A failed getUpdates is retried after an exponential backoff with jitter that
+    the next success resets. Exceptions of the handlers and middlewares are logged and
+    counted, they never stop the polling.
+
+    The startup getMe call and offset read are retried the same way, so a network or
+    database outage at startup delays the polling instead of ending it.
+
+    The bot must be created with `threaded=False`, the supervisor runs its handlers.
+    """
+
+    def __init__(
+        self,
+        bot: TeleBot,
+        workers: int = 4,
+        long_polling_timeout: int = 25,
+        backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 60.0,
+    ):
+        if bot.threaded:
+            raise ValueError("The bot must be created with threaded=False")
+        self.bot = bot
+        self.long_polling_timeout = long_polling_timeout
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.handled = 0
+        self.handler_errors = 0
+        # Failed getUpdates calls by `classify`
+        self.errors: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._batch: list[Future] = []
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="updates")
+        bot.exception_handler = self
+
+    def run(self) -> None:
+        """Poll until `stop`. Return early if Telegram rejects the bot's token."""
+        offset, started = None, False
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                # The startup calls are retried with the same backoff as getUpdates
+                if not started:
+                    offset = self._start()
+                    started = True
+                updates = self.bot.get_updates(
+                    offset=None if offset is None else offset + 1,
+                    timeout=self.long_polling_timeout + 5,
+                    long_polling_timeout=self.long_polling_timeout,
+                )
+            except Exception as e:
+                kind = classify(e)
+                self.errors[kind] += 1
+                if kind == "fatal":
+                    logger.critical(f"Telegram rejected the bot, polling stopped: {e}")
+                    return
+                failures += 1
+                delay = retry_after(e) or backoff_delay(failures, self.backoff_seconds, self.max_backoff_seconds)
+                log = logger.exception if kind == "bug" else logger.warning
+                log(f"Polling failed with a {kind} error, {failures} in a row: {e}. Retrying in {delay:.1f} seconds")
+                self._stopping.wait(delay)
+                continue
+
+            failures = 0
+            # Updates fetched while stopping are not confirmed to Telegram and come again after the restart
+            if updates and not self._stopping.is_set():
+                offset = self._handle_batch(updates, offset)
+        logger.info(f"Polling stopped, handled: {self.handled}, handler errors: {self.handler_errors}")
+
+    def stop(self, timeout: float = 10.0) -> int:
+        """Stop polling and let the current batch finish until the deadline. Return the number of dropped updates."""
+        self._stopping.set()
+        self._idle.wait(timeout)
+        # Cancel the updates no worker took. The running ones are counted too, their offset is not saved
+        dropped = sum(1 for future in self._batch if future.cancel() or not future.done())
+        self._executor.shutdown(wait=False)
+        return dropped
+
+    def handle(self, exception: Exception) -> bool:
+        """Log an exception of a handler or middleware, telebot calls it as the bot's `exception_handler`."""
+        with self._lock:
+            self.handler_errors += 1
+        logger.exception(f"Error handling an update: {exception}")
+        return True
+
+    def _start(self) -> Optional[int]:
+        """Check the bot's token and read the saved offset. Return the offset."""
+        me = self.bot.get_me()
+        offset = crud.read_update_offset(self.bot.bot_id)
+        logger.info(f"Bot {me.username} polling started after update {offset}")
+        return offset
+
+    def _handle_batch(self, updates: list[Update], offset: Optional[int]) -> Optional[int]:
+        """Handle the updates and save the offset. Return the id of the last handled update."""
+        self._idle.clear()
+        try:
+            self._batch = [self._executor.submit(self._handle, update) for update in updates]
+            wait(self._batch)
+            # After an update `stop` cancelled, the next ones are handled again after the restart
+            handled = sum(1 for _ in itertools.takewhile(lambda future: not future.cancelled(), self._batch))
+        finally:
+            self._batch = []
+            self._idle.set()
+
+        if handled == 0:
+            return offset
+        self.handled += handled
+        offset = updates[handled - 1].update_id
+        try:
+            crud.save_update_offset(self.bot.bot_id, offset)
+        except Exception as e:
+            logger.error(f"Offset {offset} of a handled update was not saved, it is handled again after a restart: {e}")
+        return offset
+
+    def _handle(self, update: Update) -> None:
+        try:
+            self.bot.process_new_updates([update])
+        except Exception as e:
+            self.handle(e)
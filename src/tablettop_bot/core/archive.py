@@ -0,0 +1,39 @@
+"""Archival of played games out of the hot scheduled_games table."""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Callable
+
+from tablettop_bot.core.timezones import utcnow
+from tablettop_bot.db import crud
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ArchiveJob:
+    """
+    Move games that started more than `grace_minutes` ago to the archive tables.
+
+    Replaces the cleanup that /start used to run, so no user waits on the deletion.
+
+    Args:
+        grace_minutes: How long a started game stays on the schedule.
+        batch_size: Games moved per transaction.
+        clock: Function that returns the current aware time, replaced by a fake clock in tests.
+    """
+
+    def __init__(self, grace_minutes: int = 30, batch_size: int = 500, clock: Callable[[], datetime] = utcnow):
+        self.grace_minutes = grace_minutes
+        self.batch_size = batch_size
+        self.clock = clock
+
+    def run_once(self) -> int:
+        """Archive the games that are due. Return the number of archived games."""
+        cutoff = self.clock() - timedelta(minutes=self.grace_minutes)
+        try:
+            return crud.archive_past_games(cutoff, self.batch_size)
+        except Exception as e:
+            # The scheduler loop must survive a failed run, the games are picked up by the next one
+            logger.error(f"Error archiving past games: {e}")
+            return 0
@@ -2,6 +2,7 @@
 
 import logging.config
 
+from tablettop_bot.core.timezones import zone_label
 from tablettop_bot.db import crud
 
 logging.basicConfig(level=logging.INFO)
@@ -10,6 +11,7 @@ logger = logging.getLogger(__name__)
 
 def generate_summary(game_id, scheduled_datetime, serverdata, server_password, use_steam, ini_id, discord_telegram_link,
                      room, flag, repeat):
+    """Summary of a new game, `scheduled_datetime` is the aware start in the host's time zone."""
     game_details = crud.get_game_details(game_id)
 
     if game_details is None:
@@ -23,7 +25,7 @@ def generate_summary(game_id, scheduled_datetime, serverdata, server_password, u
     summary = (
         f"<b>Игра успешно создана!</b>\n\n"
         f"{time_repeat}"
-        f"Время: {scheduled_datetime.strftime('%H:%M')} (UTC+3 MSK)\n\n"
+        f"Время: {scheduled_datetime.strftime('%H:%M')} ({zone_label(scheduled_datetime)})\n\n"
         f"<a href = '{discord_telegram_link}'>Ссылка на комнату #{room} в Discord</a>\n\n"
     )
 
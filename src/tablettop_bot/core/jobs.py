@@ -0,0 +1,247 @@
+"""Background jobs with named queues, priorities, retries and a status table."""
+
+import itertools
+import logging
+import math
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, NamedTuple, Optional
+
+from tablettop_bot.db import crud, database
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Task(NamedTuple):
+    """Options of a function registered with `@task`"""
+
+    name: str
+    queue: str
+    # "thread" runs in the queue's worker thread, "process" in the process pool
+    pool: str
+    max_attempts: int
+
+
+TASKS: dict[Callable, Task] = {}
+
+
+def task(queue: str = "default", pool: str = "thread", max_attempts: int = 3):
+    """
+    Register a module-level function as a task. It gets a `JobContext` and the arguments of `enqueue`.
+
+    Process pool tasks must not need the parent's state: their arguments and result are
+    pickled, and they run in a fresh interpreter that only shares the database.
+    """
+    if pool not in ("thread", "process"):
+        raise ValueError(f"Unknown pool {pool}")
+
+    def register(function: Callable) -> Callable:
+        TASKS[function] = Task(function.__name__, queue, pool, max_attempts)
+        return function
+    return register
+
+
+class JobContext:
+    """Handle a running task reports its progress through, also from the process pool."""
+
+    __slots__ = ("job_id",)
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+
+    def progress(self, done: int, total: int) -> None:
+        """Record that `done` of the `total` steps are done, shown by the admin /jobs view."""
+        crud.update_job_progress(self.job_id, done, total)
+
+
+class QueuedJob(NamedTuple):
+    job_id: int
+    function: Callable
+    task: Task
+    args: tuple
+    kwargs: dict
+    then: Optional[Callable]
+    on_error: Optional[Callable]
+    attempt: int = 1
+
+
+def _init_process(database_url: str) -> None:
+    # Spawned workers import the modules afresh, the database URL may have been set at runtime
+    database.DATABASE_URL = database_url
+
+
+class JobRunner:
+    """
+    Run slow side effects of the handlers in the background.
+
+    Every named queue has its own worker threads and takes jobs in priority order, lower
+    first, then in arrival order. Process pool tasks are sent from the worker thread to a
+    shared pool of spawned processes, so CPU-heavy work does not hold the GIL away from
+    update dispatch. A failed attempt is retried after `retry_seconds`, doubled on every
+    attempt, until the task's `max_attempts`. Every job has a jobs row with its status and
+    progress. Before `start` every job runs in the calling thread.
+    """
+
+    def __init__(self, queues: Optional[dict] = None, process_workers: int = 2, retry_seconds: float = 5.0):
+        self.completed = 0
+        self.failed = 0
+        self.configure(queues or {"default": 1}, process_workers, retry_seconds)
+        self._queues: dict[str, queue.PriorityQueue] = {}
+        self._threads: list[threading.Thread] = []
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._sequence = itertools.count()
+        # Timers of the failed jobs waiting for their retry, by job id
+        self._retries: dict[int, threading.Timer] = {}
+
+    def configure(self, queues: dict, process_workers: int, retry_seconds: float) -> None:
+        """Set the worker threads of each queue by name and the pool sizes. They change on the next `start`."""
+        self.queue_workers = dict(queues)
+        self.process_workers = process_workers
+        self.retry_seconds = retry_seconds
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self) -> None:
+        """Start the workers. Jobs an earlier process left unfinished are marked as interrupted."""
+        interrupted = crud.interrupt_unfinished_jobs()
+        if interrupted:
+            logger.warning(f"{interrupted} jobs were interrupted by the previous shutdown")
+        if self.process_workers > 0:
+            # Processes are spawned on the first process pool job
+            self._process_pool = ProcessPoolExecutor(
+                self.process_workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process, initargs=(database.DATABASE_URL,),
+            )
+        self._queues = {name: queue.PriorityQueue() for name in self.queue_workers}
+        self._threads = [
+            threading.Thread(target=self._work, args=(self._queues[name],), name=f"jobs-{name}-{i}", daemon=True)
+            for name, workers in self.queue_workers.items() for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Job runner started with queues {self.queue_workers}")
+
+    def stop(self, timeout: float = 10.0) -> int:
+        """Finish the queued jobs until the deadline and stop the workers. Return the number of dropped jobs."""
+        if not self.running:
+            return 0
+        deadline = time.monotonic() + timeout
+        for timer in list(self._retries.values()):
+            timer.cancel()
+        for name, q in self._queues.items():
+            # The stop markers sort after every job
+            for _ in range(self.queue_workers[name]):
+                q.put((math.inf, next(self._sequence), _STOP))
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+
+        dropped = len(self._retries)
+        for q in self._queues.values():
+            while not q.empty():
+                if q.get_nowait()[2] is not _STOP:
+                    dropped += 1
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        self._threads = []
+        self._queues = {}
+        self._retries = {}
+        # The rows of the dropped jobs stay queued and are marked as interrupted on the next start
+        logger.info(f"Job runner stopped, completed: {self.completed}, failed: {self.failed}, dropped: {dropped}")
+        return dropped
+
+    def pending(self) -> int:
+        """Number of queued jobs, retries waiting for their delay included."""
+        return sum(q.qsize() for q in self._queues.values()) + len(self._retries)
+
+    def enqueue(
+        self, function: Callable, *args, priority: int = 0, user_id: Optional[int] = None,
+        then: Optional[Callable] = None, on_error: Optional[Callable] = None, **kwargs,
+    ) -> int:
+        """
+        Queue a call of a task. Return the job id.
+
+        Args:
+            function: Function registered with `@task`.
+            priority: Lower runs first within the task's queue.
+            user_id: Admin who started the job.
+            then: Called with the result in the worker thread, e.g. to send it to the user.
+            on_error: Called with the exception when the last attempt fails.
+        """
+        options = TASKS[function]
+        if self.running and options.queue not in self._queues:
+            raise ValueError(f"Unknown job queue {options.queue}")
+        job_id = crud.create_job(options.name, options.queue, priority, options.max_attempts, user_id)
+        job = QueuedJob(job_id, function, options, args, kwargs, then, on_error)
+        if not self.running:
+            self._run_now(job)
+        else:
+            self._put(job, priority)
+        return job_id
+
+    def _put(self, job: QueuedJob, priority: int) -> None:
+        self._retries.pop(job.job_id, None)
+        if self.running:
+            self._queues[job.task.queue].put((priority, next(self._sequence), job))
+
+    def _run_now(self, job: QueuedJob) -> None:
+        # Without workers the retries follow each other immediately
+        while not self._run(job):
+            job = job._replace(attempt=job.attempt + 1)
+
+    def _work(self, jobs: queue.PriorityQueue) -> None:
+        while True:
+            priority, _, job = jobs.get()
+            if job is _STOP:
+                return
+            if not self._run(job):
+                delay = self.retry_seconds * 2 ** (job.attempt - 1)
+                timer = threading.Timer(delay, self._put, args=(job._replace(attempt=job.attempt + 1), priority))
+                timer.daemon = True
+                self._retries[job.job_id] = timer
+                timer.start()
+
+    def _run(self, job: QueuedJob) -> bool:
+        """Run one attempt of a job. Return False if it is to be retried."""
+        crud.start_job(job.job_id)
+        context = JobContext(job.job_id)
+        try:
+            if job.task.pool == "process" and self._process_pool is not None:
+                result = self._process_pool.submit(job.function, context, *job.args, **job.kwargs).result()
+            else:
+                result = job.function(context, *job.args, **job.kwargs)
+        except Exception as e:
+            retry = job.attempt < job.task.max_attempts
+            crud.fail_job(job.job_id, f"{type(e).__name__}: {e}", retry)
+            if retry:
+                logger.warning(f"Job {job.job_id} {job.task.name} failed on attempt {job.attempt}: {e}. Retrying")
+                return False
+            self.failed += 1
+            logger.error(f"Job {job.job_id} {job.task.name} failed: {e}")
+            self._callback(job, job.on_error, e)
+            return True
+
+        crud.finish_job(job.job_id)
+        self.completed += 1
+        self._callback(job, job.then, result)
+        return True
+
+    @staticmethod
+    def _callback(job: QueuedJob, callback: Optional[Callable], value) -> None:
+        if callback is None:
+            return
+        try:
+            callback(value)
+        except Exception as e:
+            logger.error(f"Error in the callback of job {job.job_id} {job.task.name}: {e}")
+
+
+jobs = JobRunner()
@@ -0,0 +1,72 @@
+"""Graceful shutdown: stop taking updates, drain the queues and close the database."""
+
+import logging
+import signal
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ShutdownReport(NamedTuple):
+    seconds: float
+    # Work each step dropped at the deadline, by step name, steps that dropped nothing are left out
+    dropped: dict[str, int]
+
+
+class Lifecycle:
+    """
+    Stop the bot on SIGTERM or SIGINT within one deadline.
+
+    The services register their shutdown steps with `on_stop`. A step gets the seconds left
+    until the deadline and returns the number of requests, jobs or updates it had to drop,
+    or None. Steps run in registration order, so the update intake is registered first and
+    the database last.
+    """
+
+    def __init__(self, timeout: float = 25.0):
+        self.timeout = timeout
+        self.stopping = threading.Event()
+        self._steps: list[tuple[str, Callable[[float], Optional[int]]]] = []
+
+    def configure(self, timeout: float) -> None:
+        """Set the seconds the whole shutdown may take."""
+        self.timeout = timeout
+
+    def on_stop(self, name: str, step: Callable[[float], Optional[int]]) -> None:
+        """Register a shutdown step, it is called with the seconds left until the deadline."""
+        self._steps.append((name, step))
+
+    def install_signal_handlers(self) -> None:
+        """Start the shutdown on SIGTERM and SIGINT, must be called from the main thread."""
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._handle_signal)
+
+    def _handle_signal(self, signum, frame) -> None:
+        logger.info(f"Received {signal.Signals(signum).name}, shutting down")
+        self.stopping.set()
+
+    def shutdown(self) -> ShutdownReport:
+        """Run the shutdown steps once. Return how long they took and what they dropped."""
+        self.stopping.set()
+        start = time.monotonic()
+        deadline = start + self.timeout
+        dropped = {}
+        steps, self._steps = self._steps, []
+        for name, step in steps:
+            try:
+                count = step(max(deadline - time.monotonic(), 0))
+            except Exception as e:
+                logger.error(f"Error in the shutdown step {name}: {e}")
+                continue
+            if count:
+                dropped[name] = count
+
+        report = ShutdownReport(time.monotonic() - start, dropped)
+        logger.info(f"Shutdown finished in {report.seconds:.1f} seconds, dropped: {report.dropped or 'nothing'}")
+        return report
+
+
+lifecycle = Lifecycle()
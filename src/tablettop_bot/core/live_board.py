@@ -0,0 +1,126 @@
+"""Pinned schedule message per chat that is edited in place when the schedule changes."""
+
+import hashlib
+import logging
+import threading
+from typing import Callable, Optional
+
+from telebot import TeleBot
+from telebot.apihelper import ApiTelegramException
+from telebot.types import InlineKeyboardMarkup
+
+from tablettop_bot.api.outbound import outbound
+from tablettop_bot.db import crud
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str, keyboard: Optional[InlineKeyboardMarkup]) -> str:
+    """Hash the rendered board so that unchanged content is never re-sent."""
+    payload = text + (keyboard.to_json() if keyboard else "")
+    return hashlib.sha1(payload.encode(), usedforsecurity=False).hexdigest()
+
+
+class LiveBoard:
+    """
+    Keep one pinned schedule message per chat and edit it when its content changes.
+
+    Schedule changes are coalesced: the first change starts a timer and every change
+    within `debounce_seconds` is published by the same single refresh.
+
+    Args:
+        bot: The Telegram bot instance.
+        render: Function that returns the board as (text, keyboard).
+        debounce_seconds: Delay between the first change of a burst and the refresh.
+    """
+
+    def __init__(self, bot: TeleBot, render: Callable, debounce_seconds: float = 5.0):
+        self.bot = bot
+        self.render = render
+        self.debounce_seconds = debounce_seconds
+        self.edits = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def publish(self, chat_id: int) -> int:
+        """Bring the chat's board up to date, sending and pinning it if there is none. Return its message id."""
+        text, keyboard = self.render()
+        board = crud.read_board(chat_id)
+        if board is not None and self._update(board, text, keyboard):
+            return board.message_id
+
+        message = outbound.call(
+            self.bot, "send_message", chat_id, text, reply_markup=keyboard, parse_mode="HTML", disable_web_page_preview=True
+        )
+        try:
+            outbound.call(self.bot, "pin_chat_message", chat_id, message.message_id, disable_notification=True)
+        except ApiTelegramException as e:
+            logger.warning(f"Could not pin the schedule board in chat {chat_id}: {e}")
+        crud.upsert_board(chat_id, message.message_id, content_hash(text, keyboard))
+        return message.message_id
+
+    def request_refresh(self) -> None:
+        """Schedule a refresh of all boards, coalescing with a refresh that is already pending."""
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.debounce_seconds, self._run_refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run_refresh(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.refresh_all()
+
+    def refresh_all(self) -> None:
+        """Edit every board whose rendered content changed."""
+        text, keyboard = self.render()
+        for board in crud.read_boards():
+            try:
+                self._update(board, text, keyboard)
+            except Exception as e:
+                logger.error(f"Error refreshing the schedule board in chat {board.chat_id}: {e}")
+
+    def _update(self, board, text: str, keyboard: Optional[InlineKeyboardMarkup]) -> bool:
+        """Edit a board if its content changed. Return False if the board message is gone."""
+        new_hash = content_hash(text, keyboard)
+        if new_hash == board.content_hash:
+            self.skipped += 1
+            return True
+
+        try:
+            # Refreshing many chats at once goes through the global rate limit
+            outbound.call(
+                self.bot, "edit_message_text", text, board.chat_id, board.message_id, reply_markup=keyboard, parse_mode="HTML",
+                disable_web_page_preview=True,
+            )
+        except ApiTelegramException as e:
+            if "message is not modified" in e.description:
+                crud.upsert_board(board.chat_id, board.message_id, new_hash)
+                return True
+            logger.warning(f"Schedule board in chat {board.chat_id} can not be edited, it will be re-sent: {e}")
+            crud.delete_board(board.chat_id)
+            return False
+
+        self.edits += 1
+        crud.upsert_board(board.chat_id, board.message_id, new_hash)
+        return True
+
+    def stop(self) -> None:
+        """Cancel a pending refresh."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def flush(self) -> None:
+        """Run a pending refresh now instead of after the debounce delay."""
+        with self._lock:
+            if self._timer is None:
+                return
+            self._timer.cancel()
+            self._timer = None
+        self.refresh_all()
@@ -0,0 +1,97 @@
+"""Display names of Telegram users without a Bot API round trip on every lookup."""
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from telebot import TeleBot
+
+from tablettop_bot.api.outbound import outbound
+from tablettop_bot.db import crud
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+UNKNOWN_USER = "Unknown User"
+
+
+def display_name(user) -> Optional[str]:
+    """Return the username, or the first and last name of a Telegram or database user."""
+    if user is None:
+        return None
+    if user.username:
+        return user.username
+    name = " ".join(part for part in (user.first_name, user.last_name) if part)
+    return name or None
+
+
+class NicknameResolver:
+    """
+    Resolve user ids to display names with a TTL cache.
+
+    A name is taken from the update when the caller has it, then from the users table,
+    and only on a miss from `get_chat_member`.
+
+    Args:
+        ttl_seconds: How long a resolved name is kept.
+        max_size: Number of names kept before expired entries are dropped.
+        clock: Function that returns monotonic seconds, replaced by a fake clock in tests.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_size: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.clock = clock
+        self.hits = 0
+        self.api_calls = 0
+        self._lock = threading.Lock()
+        self._names: dict[int, tuple[str, float]] = {}
+
+    def remember(self, user_id: int, name: Optional[str]) -> None:
+        """Cache a name that is already known, e.g. from an incoming update."""
+        if not name:
+            return
+        with self._lock:
+            if len(self._names) >= self.max_size:
+                now = self.clock()
+                self._names = {k: v for k, v in self._names.items() if v[1] > now}
+                if len(self._names) >= self.max_size:
+                    self._names.clear()
+            self._names[user_id] = (name, self.clock() + self.ttl_seconds)
+
+    def resolve(self, user_id: int, user=None, bot: Optional[TeleBot] = None, chat_id: Optional[int] = None) -> str:
+        """
+        Return the display name of a user.
+
+        Args:
+            user_id: The user's ID.
+            user: The `from_user` of the update, if the caller has it.
+            bot: The bot used for the `get_chat_member` fallback.
+            chat_id: The chat used for the `get_chat_member` fallback.
+        """
+        name = display_name(user)
+        if name:
+            self.remember(user_id, name)
+            return name
+
+        entry = self._names.get(user_id)
+        if entry is not None and entry[1] > self.clock():
+            self.hits += 1
+            return entry[0]
+
+        name = display_name(crud.read_user(user_id))
+        if not name and bot is not None and chat_id is not None:
+            self.api_calls += 1
+            try:
+                name = display_name(outbound.call(bot, "get_chat_member", chat_id, user_id).user)
+            except Exception as e:
+                logger.warning(f"Error getting username of user {user_id}: {e}")
+
+        if not name:
+            return UNKNOWN_USER
+        self.remember(user_id, name)
+        return name
+
+
+nicknames = NicknameResolver()
@@ -0,0 +1,107 @@
+"""Batched delivery of notifications to users."""
+
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+from telebot import TeleBot
+
+from tablettop_bot.api.outbound import outbound
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Notifier:
+    """
+    Collect notifications and send them in batches from a background thread.
+
+    Notifications that arrive within `flush_seconds` of each other are sent together, and
+    several notifications for one user are merged into a single message. Messages go
+    through the outbound queue, so a batch respects the Telegram rate limits. Before
+    `start` every notification is sent in the calling thread.
+
+    Args:
+        flush_seconds: How long a batch collects notifications before it is sent.
+        max_batch: Largest number of notifications sent in one batch.
+    """
+
+    def __init__(self, flush_seconds: float = 2.0, max_batch: int = 100):
+        self.flush_seconds = flush_seconds
+        self.max_batch = max_batch
+        self.sent = 0
+        self.batches = 0
+        self.bot: Optional[TeleBot] = None
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, bot: TeleBot) -> None:
+        """Start the background sender."""
+        self.bot = bot
+        self._thread = threading.Thread(target=self._work, name="notifier", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> int:
+        """Send the queued notifications until the deadline and stop the sender. Return the number of dropped ones."""
+        if self._thread is None:
+            return 0
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+        dropped = 0
+        while not self._queue.empty():
+            if self._queue.get_nowait() is not _STOP:
+                dropped += 1
+        logger.info(f"Notifier stopped, sent: {self.sent}, dropped: {dropped}")
+        return dropped
+
+    def notify(self, user_id: int, text: str, bot: Optional[TeleBot] = None) -> None:
+        """Queue an HTML notification for a user."""
+        if self._thread is None:
+            self._send(bot or self.bot, [(user_id, text)])
+            return
+        self._queue.put((user_id, text))
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_seconds
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._send(self.bot, batch)
+            if stopping:
+                return
+
+    def _send(self, bot: TeleBot, batch: list[tuple[int, str]]) -> None:
+        by_user = defaultdict(list)
+        for user_id, text in batch:
+            by_user[user_id].append(text)
+
+        for user_id, texts in by_user.items():
+            try:
+                outbound.call(bot, "send_message", user_id, "\n\n".join(texts), parse_mode="HTML",
+                              disable_web_page_preview=True)
+                self.sent += 1
+            except Exception as e:
+                logger.error(f"Error sending a notification to user {user_id}: {e}")
+        self.batches += 1
+
+
+notifier = Notifier()
@@ -0,0 +1,94 @@
+"""Reminders sent to players shortly before their games."""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Callable
+
+from omegaconf import OmegaConf
+from telebot import TeleBot
+from telebot.apihelper import ApiTelegramException
+
+from tablettop_bot.api.outbound import outbound
+from tablettop_bot.core.timezones import get_zone, utcnow, zone_label
+from tablettop_bot.db import crud
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+strings = OmegaConf.load("./src/tablettop_bot/conf/apps/reminders.yaml").strings
+
+
+class ReminderService:
+    """
+    Send each joined player a reminder `lead_minutes` before their game.
+
+    Every run reads the due reminders with one range query per lead time, sends them through
+    the rate-limited outbound queue and records them in sent_reminders, so a restart never
+    repeats a reminder. A player due for several lead times in one run gets a single message.
+
+    Args:
+        bot: The Telegram bot instance.
+        lead_minutes: How many minutes before a game its reminders are sent.
+        clock: Function that returns the current aware time, replaced by a fake clock in tests.
+    """
+
+    def __init__(self, bot: TeleBot, lead_minutes: list[int], clock: Callable[[], datetime] = utcnow):
+        self.bot = bot
+        self.lead_minutes = sorted(lead_minutes)
+        self.clock = clock
+        self.sent = 0
+        self.failed = 0
+
+    def run_once(self) -> int:
+        """Send the reminders that are due now. Return the number of messages sent."""
+        now = self.clock()
+        due: dict[tuple[int, int], tuple] = {}
+        kinds: dict[tuple[int, int], list[str]] = {}
+        try:
+            # Occurrences of series have no rows, and so no players, until they are materialized
+            if self.lead_minutes:
+                crud.materialize_occurrences(now, now + timedelta(minutes=self.lead_minutes[-1]))
+            for lead in self.lead_minutes:
+                kind = f"{lead}m"
+                for reminder in crud.get_due_reminders(now, now + timedelta(minutes=lead), kind):
+                    key = (reminder.scheduled_game_id, reminder.user_id)
+                    # Lead times are ascending, the shortest one decides the message
+                    due.setdefault(key, reminder)
+                    kinds.setdefault(key, []).append(kind)
+        except Exception as e:
+            # The scheduler loop must survive a failed run, the reminders are picked up by the next one
+            logger.error(f"Error reading due reminders: {e}")
+            return 0
+
+        sent_before = self.sent
+        for key, reminder in due.items():
+            if not self._send(reminder):
+                continue
+            for kind in kinds[key]:
+                crud.mark_reminder_sent(reminder.scheduled_game_id, reminder.user_id, kind, now)
+        return self.sent - sent_before
+
+    def _send(self, reminder) -> bool:
+        """Send one reminder. Return False if it should be retried on the next run."""
+        start = reminder.datetime.astimezone(get_zone(reminder.timezone))
+        # Players who never talked to the bot have no user row, they get the default language
+        text = strings[reminder.lang or "en"].reminder.format(
+            game_name=crud.get_game_name_by_id(reminder.game_id),
+            game_date=start.strftime('%d.%m.%Y'),
+            game_time=start.strftime('%H:%M'),
+            timezone=zone_label(start),
+            room=reminder.room,
+        )
+        try:
+            outbound.call(self.bot, "send_message", reminder.user_id, text, parse_mode="HTML")
+            self.sent += 1
+            return True
+        except ApiTelegramException as e:
+            # The user blocked the bot or never started it, retrying will not help
+            logger.warning(f"Reminder to user {reminder.user_id} was rejected: {e}")
+            self.failed += 1
+            return True
+        except Exception as e:
+            logger.error(f"Error sending a reminder to user {reminder.user_id}: {e}")
+            self.failed += 1
+            return False
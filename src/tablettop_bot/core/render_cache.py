@@ -0,0 +1,71 @@
+"""Cache for rendered messages that only change with a data version."""
+
+import logging
+import threading
+from datetime import date
+from typing import Callable, Generic, Optional, TypeVar
+
+from tablettop_bot.core.timezones import get_zone, utcnow
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class VersionedRenderCache(Generic[T]):
+    """
+    Keep the last rendered value until the data version changes or the day rolls over.
+
+    Args:
+        render: Function that renders the value from the database.
+        get_version: Function that returns the current data version.
+        get_today: Function that returns the current date in the default zone, the day is part of the cache key.
+    """
+
+    def __init__(
+        self,
+        render: Callable[[], T],
+        get_version: Callable[[], int],
+        get_today: Callable[[], date] = lambda: utcnow().astimezone(get_zone()).date(),
+    ):
+        self.render = render
+        self.get_version = get_version
+        self.get_today = get_today
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entry: Optional[tuple[tuple[int, date], T]] = None
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of reads served without rendering."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self) -> T:
+        """Return the cached value, rendering it again if it is stale."""
+        key = (self.get_version(), self.get_today())
+        entry = self._entry
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry[0] != key:
+                self.misses += 1
+                # The version is read before rendering, so a write during rendering leaves the entry stale
+                entry = (key, self.render())
+                self._entry = entry
+            else:
+                self.hits += 1
+            return entry[1]
+
+    def invalidate(self) -> None:
+        """Drop the cached value."""
+        self._entry = None
+
+    def stats(self) -> dict:
+        """Return cache counters for logging."""
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": round(self.hit_ratio, 3)}
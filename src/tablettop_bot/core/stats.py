@@ -0,0 +1,116 @@
+"""Player and host analytics computed from the rollup tables."""
+
+import logging
+from datetime import date, timedelta
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from tablettop_bot.db import crud
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StatsReport(NamedTuple):
+    """Analytics of a window of days ending on `end`"""
+
+    start: date
+    end: date
+    dau: int
+    average_dau: float
+    wau: int
+    active_users: int
+    games_played: int
+    # (name, games, players) of the most played games
+    top_games: list[tuple[str, int, int]]
+    # (name, share of seats taken) of the most played games with a player limit
+    fill_rates: list[tuple[str, float]]
+    # No-show proxies: games below the minimum number of players and games nobody but the host joined
+    underfilled: int
+    host_only: int
+    # Players still on a waitlist when their game started
+    waitlisted: int
+    active_hosts: int
+    # (name, games, share of seats taken) of the most active hosts
+    top_hosts: list[tuple[str, int, float]]
+
+
+def _fill_rate(taken: pd.Series, seats: pd.Series) -> pd.Series:
+    return pd.Series(np.divide(taken, seats, out=np.zeros(len(seats)), where=seats > 0), index=seats.index)
+
+
+def compute_stats(activity: pd.DataFrame, games: pd.DataFrame, end: date, days: int, top: int = 5) -> StatsReport:
+    """
+    Aggregate the rollup rows of a window, read by crud.read_daily_activity and crud.read_game_rollups.
+
+    Args:
+        activity: (day, user_id) rows.
+        games: Game rollup rows.
+        end: Last day of the window.
+        days: Length of the window.
+        top: Length of the top lists.
+    """
+    start = end - timedelta(days=days - 1)
+
+    activity_days = pd.to_datetime(activity["day"])
+    daily = activity.groupby(activity_days)["user_id"].nunique().reindex(
+        pd.date_range(start, end, freq="D"), fill_value=0
+    )
+    week = activity["user_id"][activity_days > pd.Timestamp(end - timedelta(days=7))]
+
+    joined = games["joined"].to_numpy(dtype=float)
+    seats = games["seats"].to_numpy(dtype=float)
+    min_players = games["min_players"].to_numpy(dtype=float)
+    limited = ~np.isnan(seats)
+    games = games.assign(
+        taken=np.where(limited, np.minimum(joined, np.nan_to_num(seats)), 0.0),
+        limited_seats=np.where(limited, seats, 0.0),
+    )
+
+    by_game = games.groupby("name").agg(
+        games=("joined", "size"), players=("joined", "sum"), taken=("taken", "sum"), seats=("limited_seats", "sum")
+    ).sort_values(["games", "players"], ascending=False)
+    by_game["fill"] = _fill_rate(by_game["taken"], by_game["seats"])
+    by_host = games.groupby("initiator_id").agg(
+        name=("initiator_name", "first"), games=("joined", "size"), taken=("taken", "sum"),
+        seats=("limited_seats", "sum"),
+    ).sort_values("games", ascending=False)
+    by_host["fill"] = _fill_rate(by_host["taken"], by_host["seats"])
+
+    return StatsReport(
+        start=start,
+        end=end,
+        dau=int(daily.iloc[-1]),
+        average_dau=float(daily.mean()),
+        wau=int(week.nunique()),
+        active_users=int(activity["user_id"].nunique()),
+        games_played=len(games),
+        top_games=[(name, int(row.games), int(row.players)) for name, row in by_game.head(top).iterrows()],
+        fill_rates=[(name, float(row.fill)) for name, row in by_game[by_game["seats"] > 0].head(top).iterrows()],
+        underfilled=int(np.sum(~np.isnan(min_players) & (joined < min_players))),
+        host_only=int(np.sum(joined <= 1)),
+        waitlisted=int(games["waitlisted"].sum()),
+        active_hosts=len(by_host),
+        top_hosts=[(str(row["name"]), int(row["games"]), float(row["fill"])) for _, row in by_host.head(top).iterrows()],
+    )
+
+
+def get_stats(end: date, days: int, top: int = 5) -> StatsReport:
+    """Compute the analytics of the `days` days ending on `end` from the rollup tables only."""
+    start = end - timedelta(days=days - 1)
+    return compute_stats(crud.read_daily_activity(start, end), crud.read_game_rollups(start, end), end, days, top)
+
+
+class StatsRollupJob:
+    """Refresh the rollup tables the analytics read, run by the scheduler loop in main.py."""
+
+    def run_once(self) -> tuple[int, int]:
+        """Roll up the new events and archived games. Return the numbers of new rows."""
+        try:
+            return crud.refresh_rollups()
+        except Exception as e:
+            # The scheduler loop must survive a failed run, the rows are picked up by the next one
+            logger.error(f"Error refreshing stats rollups: {e}")
+            return 0, 0
@@ -0,0 +1,22 @@
+"""Slow work of the admin handlers run by the job runner, see core/jobs.py."""
+
+import os
+from datetime import date
+
+from tablettop_bot.core.jobs import JobContext, task
+from tablettop_bot.core.stats import StatsReport, get_stats
+from tablettop_bot.db.database import export_all_tables
+
+
+@task(queue="export", pool="process", max_attempts=2)
+def export_tables(job: JobContext, export_dir: str, tables: list[str]) -> list[str]:
+    """Export tables to CSV files in a new directory. Return the file paths."""
+    os.makedirs(export_dir, exist_ok=True)
+    export_all_tables(export_dir, tables, progress=job.progress)
+    return [os.path.join(export_dir, f"{table}.csv") for table in tables]
+
+
+@task(queue="analytics", pool="process")
+def stats_report(job: JobContext, end: date, days: int, top: int) -> StatsReport:
+    """Compute the analytics report, see core/stats.py."""
+    return get_stats(end, days, top)
@@ -0,0 +1,97 @@
+"""UTC storage and per-user display of game times."""
+
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timezone, tzinfo
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from omegaconf import OmegaConf
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+config = OmegaConf.load("./src/tablettop_bot/conf/config.yaml")
+
+UTC = timezone.utc
+# Time zone of users who did not choose one, and of the shared schedule board
+DEFAULT_TIMEZONE = config.timezone
+
+
+@lru_cache(maxsize=None)
+def get_zone(name: Optional[str] = None) -> tzinfo:
+    """Return the cached tz object of an IANA zone name, the default zone for None or an unknown name."""
+    try:
+        return ZoneInfo(name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown time zone {name!r}, using {DEFAULT_TIMEZONE}")
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def utcnow() -> datetime:
+    """Current time as an aware UTC datetime."""
+    return datetime.now(UTC)
+
+
+def to_utc(local: datetime, zone: tzinfo) -> datetime:
+    """Convert a wall clock time in `zone`, naive or aware, to UTC."""
+    if local.tzinfo is None:
+        local = local.replace(tzinfo=zone)
+    return local.astimezone(UTC)
+
+
+def start_of_day(zone: tzinfo, moment: Optional[datetime] = None) -> datetime:
+    """UTC start of the day in `zone` that contains `moment`, now by default."""
+    day = (moment or utcnow()).astimezone(zone).date()
+    return to_utc(datetime.combine(day, time.min), zone)
+
+
+def localize(moment: datetime, zone: tzinfo) -> datetime:
+    """Convert an aware datetime to the wall clock time of `zone`."""
+    return moment.astimezone(zone)
+
+
+def zone_label(moment: datetime) -> str:
+    """Label of the UTC offset of a localized datetime, e.g. `UTC+3 MSK` or `UTC+5:30`."""
+    minutes = int(moment.utcoffset().total_seconds() // 60)
+    sign, minutes = ("+" if minutes >= 0 else "-"), abs(minutes)
+    offset = f"{sign}{minutes // 60}" + (f":{minutes % 60:02d}" if minutes % 60 else "")
+    name = moment.tzname()
+    return f"UTC{offset} {name}" if name and name.isalpha() and name != "UTC" else f"UTC{offset}"
+
+
+class UserTimezones:
+    """
+    Time zone names of users, primed by the user middleware from the users table.
+
+    Users who are not cached, or did not choose a zone, get the default zone.
+
+    Args:
+        max_size: Largest number of users kept, the least recently used ones are dropped.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._names: OrderedDict[int, Optional[str]] = OrderedDict()
+
+    def remember(self, user_id: int, name: Optional[str]) -> None:
+        with self._lock:
+            self._names[user_id] = name
+            self._names.move_to_end(user_id)
+            while len(self._names) > self.max_size:
+                self._names.popitem(last=False)
+
+    def name(self, user_id: int) -> Optional[str]:
+        """Return the zone name a user chose, None for the default zone."""
+        with self._lock:
+            return self._names.get(user_id)
+
+    def zone(self, user_id: int) -> tzinfo:
+        """Return the tz object of a user."""
+        return get_zone(self.name(user_id))
+
+
+user_timezones = UserTimezones()
@@ -0,0 +1,109 @@
+"""In-memory cache of the game library."""
+
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from .database import get_session
+from .models import Game
+from .pagination import Page, slice_page
+from .read_models import GameRow, read_rows, select_rows
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class GameCatalog:
+    """
+    Whole game library loaded once and indexed by id, online flag and name.
+
+    Games are immutable GameRow tuples, see db/read_models.py. Call `invalidate` after
+    every write to the games table.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.version = 0
+        self._by_id: dict[int, GameRow] = {}
+        self._by_name: list[GameRow] = []
+        self._by_online: dict[bool, list[GameRow]] = {True: [], False: []}
+        self._positions: dict[Optional[bool], tuple[list[GameRow], dict[int, int]]] = {}
+
+    def _load(self) -> None:
+        db: Session = get_session()
+        try:
+            games = read_rows(db, GameRow, select_rows(GameRow, Game).order_by(Game.name, Game.id))
+        finally:
+            db.close()
+
+        self._by_id = {game.id: game for game in games}
+        self._by_name = games
+        self._by_online = {
+            True: [game for game in games if game.online],
+            False: [game for game in games if not game.online],
+        }
+        self._positions = {
+            key: (ordered, {game.id: position for position, game in enumerate(ordered)})
+            for key, ordered in ((None, games), (True, self._by_online[True]), (False, self._by_online[False]))
+        }
+        self._loaded = True
+        self.version += 1
+        logger.info(f"Game catalog loaded with {len(games)} games")
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+    def invalidate(self) -> None:
+        """Drop the cached library so that the next read reloads it."""
+        with self._lock:
+            self._loaded = False
+
+    def get(self, game_id: int) -> Optional[GameRow]:
+        """Get a game by id."""
+        self._ensure_loaded()
+        return self._by_id.get(game_id)
+
+    def all(self) -> list[GameRow]:
+        """Get all games sorted by name."""
+        self._ensure_loaded()
+        return list(self._by_name)
+
+    def by_online(self, online: bool) -> list[GameRow]:
+        """Get online or offline games sorted by name."""
+        self._ensure_loaded()
+        return list(self._by_online[bool(online)])
+
+    def seek(
+        self, online: Optional[bool] = None, after_id: Optional[int] = None, before_id: Optional[int] = None,
+        limit: int = 11,
+    ) -> Page:
+        """
+        Get the page of games sorted by name that follows `after_id` or precedes `before_id`.
+
+        Args:
+            online: Restrict to online or offline games, all games if None.
+            after_id: Id of the last game of the previous page.
+            before_id: Id of the first game of the next page.
+            limit: Page size.
+
+        Returns:
+            The page, starting from the first game if the cursor is unknown.
+        """
+        self._ensure_loaded()
+        ordered, positions = self._positions[None if online is None else bool(online)]
+        if before_id in positions:
+            start = max(positions[before_id] - limit, 0)
+        else:
+            start = positions[after_id] + 1 if after_id in positions else 0
+        return slice_page(ordered, start, start + limit)
+
+
+catalog = GameCatalog()
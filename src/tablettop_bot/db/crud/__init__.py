@@ -1,3 +1,9 @@
 from .users import *
 from .events import *
-from .games import *
\ No newline at end of file
+from .games import *
+from .boards import *
+from .reminders import *
+from .archive import *
+from .stats import *
+from .jobs import *
+from .polling import *
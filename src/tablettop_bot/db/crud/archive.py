@@ -0,0 +1,70 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from tablettop_bot.core.timezones import utcnow
+
+from ..database import get_session
+from ..models import ArchivedGame, ArchivedGamePlayer, GamePlayer, ScheduledGame, SentReminder, UTCDateTime
+from .games import bump_schedule_version
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def archive_past_games(cutoff: datetime, batch_size: int = 500) -> int:
+    """
+    Move the games that started before `cutoff` to archived_games, with their players.
+
+    Every batch takes the oldest `batch_size` games from the scheduled_games datetime index,
+    copies them with INSERT ... SELECT and deletes them in one short transaction, so the
+    board queries never wait on a long write. Return the number of archived games.
+    """
+    archived = 0
+    while True:
+        db: Session = get_session()
+        try:
+            ids = [row.id for row in db.execute(
+                select(ScheduledGame.id).where(ScheduledGame.datetime < cutoff)
+                .order_by(ScheduledGame.datetime, ScheduledGame.id).limit(batch_size)
+            )]
+            if not ids:
+                break
+
+            # Archived games get ids after the current last one, their players are matched by it
+            first_archived_id = (db.scalar(select(func.max(ArchivedGame.id))) or 0) + 1
+            db.execute(insert(ArchivedGame).from_select(
+                ["scheduled_game_id", "game_id", "datetime", "initiator_id", "initiator_name", "series_id", "room", "max_players",
+                 "archived_at"],
+                select(
+                    ScheduledGame.id, ScheduledGame.game_id, ScheduledGame.datetime, ScheduledGame.initiator_id,
+                    ScheduledGame.initiator_name, ScheduledGame.series_id, ScheduledGame.room,
+                    ScheduledGame.max_players, literal(utcnow(), UTCDateTime),
+                ).where(ScheduledGame.id.in_(ids)),
+            ))
+            db.execute(insert(ArchivedGamePlayer).from_select(
+                ["archived_game_id", "user_id", "nickname", "status", "joined_at"],
+                select(
+                    ArchivedGame.id, GamePlayer.user_id, GamePlayer.nickname, GamePlayer.status, GamePlayer.joined_at,
+                ).join(ArchivedGame, ArchivedGame.scheduled_game_id == GamePlayer.scheduled_game_id).where(
+                    ArchivedGame.id >= first_archived_id, GamePlayer.scheduled_game_id.in_(ids)
+                ),
+            ))
+            db.query(GamePlayer).filter(GamePlayer.scheduled_game_id.in_(ids)).delete(synchronize_session=False)
+            db.query(SentReminder).filter(SentReminder.scheduled_game_id.in_(ids)).delete(synchronize_session=False)
+            db.query(ScheduledGame).filter(ScheduledGame.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            archived += len(ids)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    if archived:
+        logger.info(f"Archived {archived} past games")
+        bump_schedule_version()
+    return archived
@@ -0,0 +1,63 @@
+import logging
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from tablettop_bot.core.timezones import utcnow
+
+from ..database import get_session
+from ..models import ScheduleBoard
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def read_board(chat_id: int) -> Optional[ScheduleBoard]:
+    """Read the pinned schedule board of a chat."""
+    db: Session = get_session()
+    try:
+        return db.query(ScheduleBoard).filter(ScheduleBoard.chat_id == chat_id).first()
+    finally:
+        db.close()
+
+
+def read_boards() -> list[ScheduleBoard]:
+    """Read the pinned schedule boards of all chats."""
+    db: Session = get_session()
+    try:
+        return db.query(ScheduleBoard).all()
+    finally:
+        db.close()
+
+
+def upsert_board(chat_id: int, message_id: int, content_hash: str) -> ScheduleBoard:
+    """Record the message and rendered content of a chat's schedule board."""
+    db: Session = get_session()
+    db.expire_on_commit = False
+    try:
+        board = db.query(ScheduleBoard).filter(ScheduleBoard.chat_id == chat_id).first()
+        if board is None:
+            board = ScheduleBoard(chat_id=chat_id)
+            db.add(board)
+        board.message_id = message_id
+        board.content_hash = content_hash
+        board.updated_at = utcnow()
+        db.commit()
+        return board
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error saving schedule board of chat {chat_id}: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def delete_board(chat_id: int) -> None:
+    """Forget the schedule board of a chat."""
+    db: Session = get_session()
+    try:
+        db.query(ScheduleBoard).filter(ScheduleBoard.chat_id == chat_id).delete()
+        db.commit()
+    finally:
+        db.close()
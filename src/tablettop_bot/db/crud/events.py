@@ -1,9 +1,10 @@
 import logging
-from datetime import datetime
 from typing import Optional
 
 from sqlalchemy.orm import Session
 
+from tablettop_bot.core.timezones import utcnow
+
 from ..database import get_session
 from ..models import Event
 
@@ -14,7 +15,7 @@ logger = logging.getLogger(__name__)
 
 def create_event(user_id: str, content: str, type: str, state: Optional[str] = None) -> Event:
     """Create an event for a user."""
-    event = Event(user_id=user_id, content=content, state=state, type=type, timestamp=datetime.now())
+    event = Event(user_id=user_id, content=content, state=state, type=type, timestamp=utcnow())
     db: Session = get_session()
     db.expire_on_commit = False
     db.add(event)
@@ -1,15 +1,76 @@
 import logging
-from datetime import datetime, timedelta
-
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta, tzinfo
+from enum import Enum
+from typing import Optional, Union
+
+from sqlalchemy import case, exists, func, insert, literal, or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from tablettop_bot.core.timezones import get_zone, to_utc, utcnow
+
+from ..catalog import catalog
 from ..database import get_session
-from ..models import Game, ScheduledGame
+from ..models import (
+    Game,
+    GamePlayer,
+    GameSeries,
+    ScheduledGame,
+    SentReminder,
+    SeriesException,
+    SeriesPlayer,
+    UTCDateTime,
+)
+from ..pagination import Page
+from ..read_models import ScheduledGameRow, SeriesRow, read_rows, select_rows
+from ..recurrence import (
+    Rule,
+    VirtualOccurrence,
+    expand,
+    format_rrule,
+    is_occurrence,
+    parse_occurrence_key,
+    parse_rrule,
+)
+from ..search import search_games as _search_games
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class _ScheduleVersion:
+    """Counter of schedule changes, bumped under a lock."""
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def bump(self) -> int:
+        with self.lock:
+            self.value += 1
+            return self.value
+
+# Incremented on every write that changes what the schedule board shows
+_schedule_version = _ScheduleVersion()
+_schedule_listeners = []
+
+def get_schedule_version() -> int:
+    return _schedule_version.value
+
+def add_schedule_listener(listener):
+    """Call `listener()` after every schedule change."""
+    _schedule_listeners.append(listener)
+
+def bump_schedule_version():
+    _schedule_version.bump()
+    for listener in _schedule_listeners:
+        try:
+            listener()
+        except Exception as e:
+            logger.error(f"Error in schedule listener {listener}: {e}")
+
 def add_game(
     name: str, min_players: int, max_players: int,
     description: str = "", link: str = "", online: bool = False
@@ -22,14 +83,25 @@ def add_game(
     db.add(game)
     db.commit()
     db.refresh(game)
+    catalog.invalidate()
     return game
 
-def schedule_game(game_id: int, scheduled_datetime, initiator_id: int, nickname: str, use_steam: bool, server_password: str, serverdata: str, discord_telegram_link: str = None, room: int = None, repeat_weekly: bool = False):
+def schedule_game(game_id: int, scheduled_datetime: datetime, initiator_id: int, nickname: str, use_steam: bool, server_password: str, serverdata: str, discord_telegram_link: str = None, room: int = None, repeat_weekly: bool = False, rrule: str = None, timezone: str = None):
+    """
+    Schedule a game, or a recurring series when `rrule` is given or `repeat_weekly` is set.
+
+    Only the first occurrence of a series gets a row, see get_scheduled_games.
+
+    Args:
+        scheduled_datetime: Aware start of the game.
+        timezone: IANA zone of the host, a series repeats at the same wall time in it.
+    """
+    if repeat_weekly and not rrule:
+        rrule = "FREQ=WEEKLY"
+
     db: Session = get_session()
     scheduled_game = ScheduledGame(
         game_id=game_id,
-        date=scheduled_datetime.date(),
-        time=scheduled_datetime.time(),
         datetime=scheduled_datetime,
         initiator_id=initiator_id,
         initiator_name=nickname,
@@ -37,220 +109,717 @@ def schedule_game(game_id: int, scheduled_datetime, initiator_id: int, nickname:
         server_password=server_password,
         server_data=serverdata,
         discord_telegram_link=discord_telegram_link,
-        player_ids=str(initiator_id),
-        player_nicknames=nickname,
         room=room,
-        repweekly=repeat_weekly
     )
+    if rrule:
+        rule = parse_rrule(rrule)
+        local_start = scheduled_datetime.astimezone(get_zone(timezone))
+        series = GameSeries(
+            game_id=game_id, initiator_id=initiator_id, initiator_name=nickname, created_at=utcnow(),
+            dtstart=scheduled_datetime, timezone=timezone, rrule=format_rrule(rule),
+            ends_on=get_series_end(local_start, rule), use_steam=use_steam, server_data=serverdata,
+            server_password=server_password, discord_telegram_link=discord_telegram_link, room=room,
+        )
+        db.add(series)
+        db.flush()
+        scheduled_game.series_id = series.id
+        db.add(SeriesPlayer(series_id=series.id, user_id=initiator_id, nickname=nickname, joined_at=utcnow()))
     db.add(scheduled_game)
+    db.flush()
+    db.add(GamePlayer(
+        scheduled_game_id=scheduled_game.id, user_id=initiator_id, nickname=nickname, joined_at=utcnow()
+    ))
     db.commit()
     db.refresh(scheduled_game)
+    bump_schedule_version()
     return scheduled_game
 
-def add_player_to_game(user_id: int, scheduled_game_id: int, lib_game_id: int, user_nickname: str):
-    db: Session = get_session()
-    scheduled_game = db.query(ScheduledGame).filter(ScheduledGame.id == scheduled_game_id).first()
-    if not scheduled_game:
-        return False, 'Игра не найдена.'
 
-    player_ids = scheduled_game.player_ids.split(',') if scheduled_game.player_ids else []
-    player_nicknames = scheduled_game.player_nicknames.split(',') if scheduled_game.player_nicknames else []
+def get_series_end(dtstart: datetime, rule: Rule) -> Optional[date]:
+    """Return the local date of the last occurrence of a rule with UNTIL or COUNT, None if it repeats forever."""
+    if not rule.count:
+        return rule.until
+    weeks = (-(-rule.count // max(len(rule.weekdays), 1)) + 1) * rule.interval
+    occurrences = expand(dtstart, rule, dtstart.date(), dtstart.date() + timedelta(weeks=weeks))
+    return occurrences[-1] if occurrences else dtstart.date()
+
+
+class EnrollmentStatus(str, Enum):
+    """Result of an enrollment attempt"""
+
+    JOINED = "joined"
+    WAITLISTED = "waitlisted"
+    ALREADY = "already"
+    FULL = "full"
+    NOT_FOUND = "not_found"
+
+
+class PlayerStatus(str, Enum):
+    """Status of a game_players row"""
+
+    JOINED = "joined"
+    WAITLISTED = "waitlisted"
+
+
+# Capacity of games without max_players
+UNLIMITED_PLAYERS = 2**31 - 1
+
+
+def _lock_scheduled_game(db: Session, scheduled_game_id: int):
+    """Queue up writers of one game's players on its row. SQLite serializes all writers anyway."""
+    if db.get_bind().dialect.name != "sqlite":
+        db.query(ScheduledGame.id).filter(ScheduledGame.id == scheduled_game_id).with_for_update().first()
+
+
+def _join_series(db: Session, scheduled_game_id: int, user_id: int, nickname: str):
+    """Make a joined player of a series occurrence a player of the series, see SeriesPlayer."""
+    series_id = select(ScheduledGame.series_id).where(ScheduledGame.id == scheduled_game_id).scalar_subquery()
+    db.execute(insert(SeriesPlayer).from_select(
+        ["series_id", "user_id", "nickname", "joined_at"],
+        select(series_id, literal(user_id), literal(nickname), literal(utcnow(), UTCDateTime)).where(
+            series_id.is_not(None),
+            ~exists().where(SeriesPlayer.series_id == series_id, SeriesPlayer.user_id == user_id),
+        ),
+    ))
+
+
+def _leave_series(db: Session, scheduled_game_id: int, user_id: int):
+    """Remove a player who left an occurrence from its series, the next occurrences are created without them."""
+    series_id = select(ScheduledGame.series_id).where(ScheduledGame.id == scheduled_game_id).scalar_subquery()
+    db.query(SeriesPlayer).filter(
+        SeriesPlayer.series_id == series_id, SeriesPlayer.user_id == user_id
+    ).delete(synchronize_session=False)
+
+
+def _capacity(scheduled_game_id: int):
+    """Scalar subquery with the number of seats of a scheduled game, NULL if the game is not found."""
+    return select(
+        func.coalesce(ScheduledGame.max_players, Game.max_players, UNLIMITED_PLAYERS)
+    ).join(Game, Game.id == ScheduledGame.game_id).where(ScheduledGame.id == scheduled_game_id).scalar_subquery()
+
+
+def _promote_waitlisted(db: Session, scheduled_game_id: int) -> list[GamePlayer]:
+    """Move the earliest waitlisted players into free seats. The caller holds the game's write lock."""
+    joined = db.query(func.count(GamePlayer.id)).filter(
+        GamePlayer.scheduled_game_id == scheduled_game_id, GamePlayer.status == PlayerStatus.JOINED.value
+    ).scalar()
+    capacity = db.execute(select(_capacity(scheduled_game_id))).scalar()
+    if capacity is None or joined >= capacity:
+        return []
+
+    # Served by ix_game_players_game_status_joined_at, only the promoted rows are read
+    promoted = db.query(GamePlayer).filter(
+        GamePlayer.scheduled_game_id == scheduled_game_id, GamePlayer.status == PlayerStatus.WAITLISTED.value
+    ).order_by(GamePlayer.joined_at, GamePlayer.id).limit(capacity - joined).all()
+    for player in promoted:
+        player.status = PlayerStatus.JOINED.value
+        _join_series(db, scheduled_game_id, player.user_id, player.nickname)
+    db.flush()
+    return promoted
+
+
+def _enrollment_failure(db: Session, scheduled_game_id: int, user_id: int) -> EnrollmentStatus:
+    """Explain why no player row was inserted."""
+    if db.execute(select(_capacity(scheduled_game_id))).scalar() is None:
+        return EnrollmentStatus.NOT_FOUND
+    player = db.query(GamePlayer.status).filter(
+        GamePlayer.scheduled_game_id == scheduled_game_id, GamePlayer.user_id == user_id
+    ).first()
+    if player is None:
+        return EnrollmentStatus.FULL
+    return EnrollmentStatus.WAITLISTED if player.status == PlayerStatus.WAITLISTED.value else EnrollmentStatus.ALREADY
+
+
+def _insert_player(
+    scheduled_game_id: int, user_id: int, nickname: str, waitlist: bool = True, joined_at: datetime = None
+):
+    """
+    INSERT ... SELECT of a player row that counts the seats in the same statement.
+
+    The player joins if there is a free seat and is waitlisted otherwise, or not inserted
+    at all without `waitlist`. Nothing is inserted if the game is not found.
+    """
+    capacity = _capacity(scheduled_game_id)
+    joined = select(func.count(GamePlayer.id)).where(
+        GamePlayer.scheduled_game_id == scheduled_game_id, GamePlayer.status == PlayerStatus.JOINED.value
+    ).scalar_subquery()
+    has_seat = joined < capacity
+    status = case((has_seat, PlayerStatus.JOINED.value), else_=PlayerStatus.WAITLISTED.value)
+    return insert(GamePlayer).from_select(
+        ["scheduled_game_id", "user_id", "nickname", "joined_at", "status"],
+        select(
+            literal(scheduled_game_id), literal(user_id), literal(nickname),
+            literal(joined_at or utcnow(), UTCDateTime), status,
+        ).where(capacity.is_not(None), or_(has_seat, literal(waitlist))),
+    )
 
-    player_ids.append(str(user_id))
-    player_nicknames.append(user_nickname)
 
-    scheduled_game.player_ids = ','.join(player_ids)
-    scheduled_game.player_nicknames = ','.join(player_nicknames)
-    db.commit()
-    db.refresh(scheduled_game)
-    return scheduled_game
+def enroll_player(scheduled_game_id: int, user_id: int, nickname: str, waitlist: bool = True) -> EnrollmentStatus:
+    """
+    Enroll a player in a scheduled game in one transaction.
 
-def get_all_games():
-    db: Session = get_session()
-    return db.query(Game).order_by(Game.name).all()
+    The seats are counted by the same statement that inserts the player row. A player who
+    finds the game full is put on its waitlist. The unique constraint on (game, player)
+    makes repeated clicks return the status of the first one instead of adding duplicates.
 
-def get_game_details(game_id: int):
-    db: Session = get_session()
-    return db.query(Game).filter(Game.id == game_id).first()
+    Args:
+        scheduled_game_id: The scheduled game's ID.
+        user_id: The player's ID.
+        nickname: The player's display name.
+        waitlist: Put the player on the waitlist of a full game instead of returning `FULL`.
 
-def get_scheduled_games():
+    Returns:
+        The enrollment status.
+    """
     db: Session = get_session()
-    return db.query(ScheduledGame).filter(
-        ScheduledGame.skipped == 0, ScheduledGame.date >= datetime.now().date()
-        ).order_by(ScheduledGame.date, ScheduledGame.time).all()
-
-def get_online_games():
+    try:
+        _lock_scheduled_game(db, scheduled_game_id)
+        if not db.execute(_insert_player(scheduled_game_id, user_id, nickname, waitlist)).rowcount:
+            return _enrollment_failure(db, scheduled_game_id, user_id)
+        player_status = db.query(GamePlayer.status).filter(
+            GamePlayer.scheduled_game_id == scheduled_game_id, GamePlayer.user_id == user_id
+        ).scalar()
+        if player_status == PlayerStatus.JOINED.value:
+            _join_series(db, scheduled_game_id, user_id, nickname)
+        db.commit()
+        if player_status == PlayerStatus.JOINED.value:
+            bump_schedule_version()
+        return EnrollmentStatus(player_status)
+    except IntegrityError:
+        db.rollback()
+        return _enrollment_failure(db, scheduled_game_id, user_id)
+    finally:
+        db.close()
+
+
+def leave_game(scheduled_game_id: int, user_id: int) -> tuple[bool, list[GamePlayer]]:
+    """
+    Remove a player, or a waitlisted player, from a game and fill the freed seat from the waitlist.
+
+    Both happen in one transaction, so concurrent unsubscribes never promote more players
+    than there are free seats.
+
+    Returns:
+        Whether the player was removed, and the promoted players.
+    """
     db: Session = get_session()
-    return db.query(Game).filter(Game.online == 1).order_by(Game.name).all()
+    db.expire_on_commit = False
+    try:
+        _lock_scheduled_game(db, scheduled_game_id)
+        removed = db.query(GamePlayer).filter(
+            GamePlayer.scheduled_game_id == scheduled_game_id, GamePlayer.user_id == user_id
+        ).delete(synchronize_session=False)
+        if not removed:
+            db.rollback()
+            return False, []
+        _leave_series(db, scheduled_game_id, user_id)
+        promoted = _promote_waitlisted(db, scheduled_game_id)
+        db.commit()
+        bump_schedule_version()
+        return True, promoted
+    finally:
+        db.close()
 
-def get_offline_games():
-    db: Session = get_session()
-    return db.query(Game).filter(Game.online == 0).order_by(Game.name).all()
 
-def get_available_room(selected_datetime: datetime):
+def set_game_capacity(scheduled_game_id: int, max_players: int) -> list[GamePlayer]:
+    """Change the number of seats of one scheduled game and promote waitlisted players into new seats."""
     db: Session = get_session()
-    scheduled_games = db.query(ScheduledGame).all()
-    taken_rooms = [
-        game.room for game in scheduled_games
-        if game.datetime + timedelta(hours=9) > selected_datetime
-    ]
+    db.expire_on_commit = False
+    try:
+        _lock_scheduled_game(db, scheduled_game_id)
+        updated = db.query(ScheduledGame).filter(ScheduledGame.id == scheduled_game_id).update(
+            {"max_players": max_players}, synchronize_session=False
+        )
+        if not updated:
+            db.rollback()
+            return []
+        promoted = _promote_waitlisted(db, scheduled_game_id)
+        db.commit()
+        bump_schedule_version()
+        return promoted
+    finally:
+        db.close()
 
-    for room in range(1, 21):
-        db: Session = get_session()
-        if room not in taken_rooms:
-            return room
-    return None
 
-def get_scheduled_game_by_id(game_id: int):
+def get_game_capacity(scheduled_game_id: int):
+    """Return the number of seats of a scheduled game, or None if it is not found."""
     db: Session = get_session()
-    return db.query(ScheduledGame).filter(ScheduledGame.id == game_id, ScheduledGame.skipped == 0).first()
+    try:
+        return db.execute(select(_capacity(scheduled_game_id))).scalar()
+    finally:
+        db.close()
 
-def update_scheduled_game_players(game_id: int, player_ids: str, player_nicknames: str):
-    db: Session = get_session()
-    scheduled_game = db.query(ScheduledGame).filter(ScheduledGame.id == game_id).first()
-    if scheduled_game:
-        scheduled_game.player_ids = player_ids
-        scheduled_game.player_nicknames = player_nicknames
-        db.commit()
-    return scheduled_game
 
-# filepath: /home/verner/tablettop_bot/src/tablettop_bot/db/crud/games.py
-def get_game_name_by_id(game_id: int):
+def get_players(scheduled_game_id: int) -> list[tuple[int, str]]:
+    """Return the (user_id, nickname) of the joined players of a game in join order."""
     db: Session = get_session()
-    game = db.query(Game).filter(Game.id == game_id).first()
-    return game.name if game else "Unknown Game"
+    try:
+        return _game_players(db, [scheduled_game_id])[scheduled_game_id]
+    finally:
+        db.close()
 
-def prolong():
-    db: Session = get_session()
-    today = datetime.now()
-    scheduled_games = db.query(ScheduledGame).filter(ScheduledGame.repweekly == True).all()
-
-    for game in scheduled_games:
-        game_datetime = datetime.combine(game.date, game.time)
-        next_game_datetime = game_datetime + timedelta(days=7)
-
-        # Check if there's already a child game created for the next week, including skipped ones
-        child_game = db.query(ScheduledGame).filter(
-            ScheduledGame.PGID == game.id,
-            ScheduledGame.date == next_game_datetime.date(),
-            ScheduledGame.time == next_game_datetime.time()
-        ).first()
-
-        synchronize_series_players(game.id)
-
-        if not child_game:
-            if today <= next_game_datetime < today + timedelta(days=21):
-                new_room = get_available_room(next_game_datetime)
-                if new_room:
-                    new_scheduled_game = ScheduledGame(
-                        game_id=game.game_id,
-                        date=next_game_datetime.date(),
-                        time=next_game_datetime.time(),
-                        datetime=next_game_datetime,
-                        initiator_id=game.initiator_id,
-                        initiator_name=game.initiator_name,
-                        use_steam=game.use_steam,
-                        server_data=game.server_data,
-                        server_password=game.server_password,
-                        discord_telegram_link=game.discord_telegram_link,
-                        player_ids=game.player_ids,
-                        player_nicknames=game.player_nicknames,
-                        room=new_room,
-                        repweekly=game.repweekly,
-                        PGID=game.id,
-                        GameTree=game.GameTree,
-                        skipped=False
-                    )
-                    db.add(new_scheduled_game)
-                    db.commit()
-                    update_gametree(game.id, new_scheduled_game.id)
-
-                    # Synchronize players across the entire series
-                    synchronize_series_players(game.id)
-
-def update_gametree(parent_game_id: int, new_game_id: int = None):
+
+def get_waitlist(scheduled_game_id: int) -> list[GamePlayer]:
+    """Return the waitlisted players of a game in promotion order."""
     db: Session = get_session()
-    parent_game = db.query(ScheduledGame).filter(ScheduledGame.id == parent_game_id).first()
-    if not parent_game:
-        return
+    try:
+        return db.query(GamePlayer).filter(
+            GamePlayer.scheduled_game_id == scheduled_game_id, GamePlayer.status == PlayerStatus.WAITLISTED.value
+        ).order_by(GamePlayer.joined_at, GamePlayer.id).all()
+    finally:
+        db.close()
 
-    game_tree = parent_game.GameTree.split(',') if parent_game.GameTree else []
-    if new_game_id:
-        game_tree.append(str(new_game_id))
-    game_tree.append(str(parent_game_id))
-    updated_gametree = ','.join(sorted(set(game_tree)))
 
-    db.query(ScheduledGame).filter(ScheduledGame.id.in_(game_tree)).update({"GameTree": updated_gametree}, synchronize_session=False)
-    db.commit()
+def get_all_games():
+    return catalog.all()
 
-def get_enrolled_games_by_user(user_id: int):
-    db: Session = get_session()
-    return db.query(ScheduledGame).filter(ScheduledGame.skipped == 0, ScheduledGame.player_ids.like(f'%{user_id}%')).all()
+def get_game_details(game_id: int):
+    return catalog.get(game_id)
+
+def get_games_page(online: bool = None, after_id: int = None, before_id: int = None, limit: int = 11) -> Page:
+    return catalog.seek(online=online, after_id=after_id, before_id=before_id, limit=limit)
+
+def get_scheduled_games_page(after_key: str = None, before_key: str = None, limit: int = 10, max_days: int = 8, zone: tzinfo = None) -> Page:
+    """
+    Return the page of upcoming games within the nearest `max_days` days with games, ordered by (datetime, id).
 
-def get_hosted_games_by_user(user_id: int):
+    Rows are sought in SQL from the cursor on (datetime, id), and series are expanded only
+    between the cursor and the last row of the page, so a page costs the same wherever it
+    is. Cursors are game keys, see ScheduledGame.key, an unknown cursor gives the first
+    page. Days are counted in `zone`.
+    """
+    zone = zone or get_zone()
     db: Session = get_session()
-    return db.query(ScheduledGame).filter(ScheduledGame.skipped == 0, ScheduledGame.initiator_id == user_id).all()
+    try:
+        now = utcnow()
+        horizon = now + timedelta(days=SERIES_HORIZON_DAYS)
+        last_day = _last_schedule_day(db, now, horizon, max_days, zone)
+        if last_day is None:
+            return Page([], False, False)
+        # Exclusive end of the last day with games
+        until = to_utc(datetime.combine(last_day + timedelta(days=1), datetime.min.time()), zone)
+
+        # A cursor outside of the shown days is unknown too
+        positions = {key: _cursor_position(db, key) for key in (before_key, after_key) if key is not None}
+        positions = {key: p for key, p in positions.items() if p is not None and now <= p[0] < until}
+        backward = before_key in positions
+        cursor = positions.get(before_key if backward else after_key)
+        rows = select_rows(ScheduledGameRow, ScheduledGame).where(
+            ScheduledGame.datetime >= now, ScheduledGame.datetime < until
+        )
+        if backward:
+            # Rows at the start of an occurrence come before it, see _schedule_order
+            cursor_start, virtual, cursor_id, _ = cursor
+            before = ScheduledGame.datetime <= cursor_start if virtual else or_(
+                ScheduledGame.datetime < cursor_start,
+                (ScheduledGame.datetime == cursor_start) & (ScheduledGame.id < cursor_id),
+            )
+            rows = rows.where(before).order_by(ScheduledGame.datetime.desc(), ScheduledGame.id.desc())
+        else:
+            if cursor is not None:
+                cursor_start, virtual, cursor_id, _ = cursor
+                rows = rows.where(ScheduledGame.datetime > cursor_start if virtual else or_(
+                    ScheduledGame.datetime > cursor_start,
+                    (ScheduledGame.datetime == cursor_start) & (ScheduledGame.id > cursor_id),
+                ))
+            rows = rows.order_by(ScheduledGame.datetime, ScheduledGame.id)
+        rows = _with_players(db, read_rows(db, ScheduledGameRow, rows.limit(limit + 1)))
+
+        # Occurrences past the (limit + 1)th row can not be on the page
+        full = len(rows) > limit
+        if backward:
+            start, end = (rows[-1].datetime if full else now), cursor[0]
+        else:
+            start = cursor[0] if cursor is not None else now
+            end = rows[-1].datetime if full else min(horizon, until - timedelta(microseconds=1))
+        occurrences = _series_occurrences(db, max(start, now), min(end, horizon))
+        games = sorted(rows + [o for o in occurrences if o.datetime < until], key=_schedule_order)
+        if cursor is not None:
+            games = [g for g in games if (_schedule_order(g) < cursor if backward else _schedule_order(g) > cursor)]
+
+        if backward:
+            return Page(games[-limit:], len(games) > limit, True)
+        return Page(games[:limit], cursor is not None, len(games) > limit)
+    finally:
+        db.close()
+
+
+def _cursor_position(db: Session, key: str) -> Optional[tuple]:
+    """Schedule order of the game a page cursor names, see _schedule_order. None if it is gone."""
+    try:
+        scheduled_game_id, series_id, day = parse_occurrence_key(key)
+    except ValueError:
+        return None
+    if scheduled_game_id is not None:
+        start = db.query(ScheduledGame.datetime).filter(ScheduledGame.id == scheduled_game_id).scalar()
+        return None if start is None else (start, False, scheduled_game_id, key)
+    # A cursor occurrence that got its row since keeps its place after the row
+    _, start = _find_occurrence(db, series_id, day)
+    return None if start is None else (start, True, 0, key)
+
+
+def _last_schedule_day(db: Session, start: datetime, horizon: datetime, max_days: int, zone: tzinfo) -> Optional[date]:
+    """Local date of the `max_days`-th day with games from `start`, None if there are no games."""
+    # Rows are streamed in order and only read until their `max_days`-th day
+    days = set()
+    statement = select(ScheduledGame.datetime).where(ScheduledGame.datetime >= start).order_by(ScheduledGame.datetime)
+    for (moment,) in db.execute(statement.execution_options(yield_per=100)):
+        day = moment.astimezone(zone).date()
+        if day not in days and len(days) == max_days:
+            break
+        days.add(day)
+    days.update(start.astimezone(zone).date() for _, _, start in _series_days(db, start, horizon))
+    return sorted(days)[:max_days][-1] if days else None
+
+
+# How far ahead occurrences of series are expanded
+SERIES_HORIZON_DAYS = 21
+
+
+def _game_players(db: Session, scheduled_game_ids) -> dict[int, list[tuple[int, str]]]:
+    """
+    Joined players of each game in join order, in one query.
+
+    `scheduled_game_ids` is a list of ids or a select of them.
+    """
+    rows = db.execute(
+        select(GamePlayer.scheduled_game_id, GamePlayer.user_id, GamePlayer.nickname)
+        .where(GamePlayer.scheduled_game_id.in_(scheduled_game_ids), GamePlayer.status == PlayerStatus.JOINED.value)
+        .order_by(GamePlayer.joined_at, GamePlayer.id)
+    )
+
+    players = defaultdict(list)
+    for row in rows:
+        players[row.scheduled_game_id].append((row.user_id, row.nickname))
+    return players
+
+
+def _with_players(db: Session, games: list[ScheduledGameRow], scheduled_game_ids=None) -> list[ScheduledGameRow]:
+    """Fill in the players of game rows, from `scheduled_game_ids` if given, see _game_players."""
+    if not games:
+        return games
+    players = _game_players(db, [game.id for game in games] if scheduled_game_ids is None else scheduled_game_ids)
+    return [game._replace(players=tuple(players[game.id])) for game in games]
+
+
+def _series_players(db: Session, series_ids: list[int]) -> dict[int, list[tuple[int, str]]]:
+    """Players of each series in join order, see SeriesPlayer."""
+    rows = db.query(SeriesPlayer.series_id, SeriesPlayer.user_id, SeriesPlayer.nickname).filter(
+        SeriesPlayer.series_id.in_(series_ids)
+    ).order_by(SeriesPlayer.joined_at, SeriesPlayer.id).all()
+
+    players = defaultdict(list)
+    for row in rows:
+        players[row.series_id].append((row.user_id, row.nickname))
+    return players
+
+
+def _occurrence_start(series: GameSeries, day: date) -> datetime:
+    """UTC start of the occurrence of a series on a local date."""
+    zone = get_zone(series.timezone)
+    return to_utc(datetime.combine(day, series.dtstart.astimezone(zone).time()), zone)
 
-def get_game_tree_by_id(game_id: int):
+
+def _schedule_order(game) -> tuple:
+    # Rows by (datetime, id), then the occurrences that have no row yet
+    return game.datetime, game.id is None, game.id or 0, game.key
+
+
+def _series_days(db: Session, start: datetime, end: datetime, initiator_id: int = None) -> list[tuple]:
+    """(series, local date, UTC start) of the occurrences between `start` and `end`, rows or not."""
+    # Local dates may be a day off the UTC dates of the window
+    first_day, last_day = start.date() - timedelta(days=1), end.date() + timedelta(days=1)
+    series = select_rows(SeriesRow, GameSeries).where(
+        GameSeries.dtstart <= end, or_(GameSeries.ends_on.is_(None), GameSeries.ends_on >= first_day)
+    )
+    if initiator_id is not None:
+        series = series.where(GameSeries.initiator_id == initiator_id)
+    series = read_rows(db, SeriesRow, series)
+    if not series:
+        return []
+
+    exceptions = defaultdict(list)
+    for series_id, day in db.query(SeriesException.series_id, SeriesException.date).filter(
+        SeriesException.series_id.in_([s.id for s in series]),
+        SeriesException.date >= first_day, SeriesException.date <= last_day,
+    ):
+        exceptions[series_id].append(day)
+
+    occurrences = []
+    for s in series:
+        zone = get_zone(s.timezone)
+        days = expand(
+            s.dtstart.astimezone(zone), parse_rrule(s.rrule),
+            start.astimezone(zone).date(), end.astimezone(zone).date(), exceptions[s.id],
+        )
+        for day in days:
+            occurrence_start = _occurrence_start(s, day)
+            if start <= occurrence_start <= end:
+                occurrences.append((s, day, occurrence_start))
+    return occurrences
+
+
+def _series_occurrences(
+    db: Session, start: datetime, end: datetime, initiator_id: int = None
+) -> list[VirtualOccurrence]:
+    """Occurrences of series between `start` and `end` that have no scheduled_games row yet."""
+    days = _series_days(db, start, end, initiator_id)
+    if not days:
+        return []
+    series_ids = list({s.id for s, _, _ in days})
+    materialized = set(db.query(ScheduledGame.series_id, ScheduledGame.datetime).filter(
+        ScheduledGame.series_id.in_(series_ids), ScheduledGame.datetime >= start, ScheduledGame.datetime <= end
+    ).all())
+    days = [(s, day, moment) for s, day, moment in days if (s.id, moment) not in materialized]
+    players = _series_players(db, list({s.id for s, _, _ in days})) if days else {}
+
+    occurrences = []
+    for s, day, occurrence_start in days:
+        series_players = players.get(s.id) or [(s.initiator_id, s.initiator_name)]
+        occurrences.append(VirtualOccurrence(s, day, occurrence_start, tuple(series_players)))
+    return occurrences
+
+
+def _get_occurrences(db: Session, start: datetime, end: datetime, initiator_id: int = None, rows_until: datetime = None) -> list:
+    """
+    Return the scheduled games from `start` and the series occurrences between `start` and `end`.
+
+    Games with a row are read-only ScheduledGameRow tuples, see db/read_models.py. Occurrences
+    without a row are expanded from the series rules, see db/recurrence.py, and returned as
+    VirtualOccurrence objects. Both bounds are aware datetimes, every rule is
+    expanded over the local dates of the window in its own zone. The result is ordered by
+    (datetime, id, key).
+    """
+    rows = select_rows(ScheduledGameRow, ScheduledGame).where(ScheduledGame.datetime >= start)
+    if rows_until is not None:
+        rows = rows.where(ScheduledGame.datetime <= rows_until)
+    if initiator_id is not None:
+        rows = rows.where(ScheduledGame.initiator_id == initiator_id)
+    # The players of all the rows come from one query over the same range
+    ids = rows.with_only_columns(ScheduledGame.id)
+    games = _with_players(db, read_rows(db, ScheduledGameRow, rows), ids)
+    return sorted(games + _series_occurrences(db, start, end, initiator_id), key=_schedule_order)
+
+
+def get_scheduled_games(horizon_days: int = SERIES_HORIZON_DAYS, since: datetime = None) -> list:
+    """Return the games from `since`, now by default, with the occurrences of series in the next `horizon_days` days."""
+    db: Session = get_session()
+    try:
+        now = utcnow()
+        return _get_occurrences(db, since or now, now + timedelta(days=horizon_days))
+    finally:
+        db.close()
+
+
+def _find_occurrence(db: Session, series_id: int, day: date):
+    """Return the series and the UTC start of its occurrence on a local date, (None, None) if there is none."""
+    series = db.get(GameSeries, series_id)
+    if series is None:
+        return None, None
+    exceptions = [row.date for row in db.query(SeriesException.date).filter(SeriesException.series_id == series_id)]
+    zone = get_zone(series.timezone)
+    if not is_occurrence(series.dtstart.astimezone(zone), parse_rrule(series.rrule), day, exceptions):
+        return None, None
+    return series, _occurrence_start(series, day)
+
+
+def get_occurrence(key: str) -> Union[ScheduledGame, VirtualOccurrence, None]:
+    """Return a scheduled game, or a series occurrence that has no row yet, by its key."""
+    scheduled_game_id, series_id, day = parse_occurrence_key(key)
+    if scheduled_game_id is not None:
+        return get_scheduled_game_by_id(scheduled_game_id)
     db: Session = get_session()
-    scheduled_game = db.query(ScheduledGame).filter(ScheduledGame.id == game_id).first()
-    return scheduled_game.GameTree if scheduled_game else None
+    try:
+        series, start = _find_occurrence(db, series_id, day)
+        if series is None:
+            return None
+        game = db.query(ScheduledGame).filter(ScheduledGame.series_id == series_id, ScheduledGame.datetime == start).first()
+        if game is not None:
+            return game
+        series_players = _series_players(db, [series_id])[series_id] or [(series.initiator_id, series.initiator_name)]
+        return VirtualOccurrence(series, day, start, tuple(series_players))
+    finally:
+        db.close()
+
+
+def materialize_occurrence(key: str) -> Optional[int]:
+    """
+    Return the scheduled_games id of a game key, creating the row of a series occurrence on its first write.
+
+    The row gets the players of the series in join order, the ones beyond its seats are
+    waitlisted, as by enroll_player. Returns None if the key is not an occurrence.
+    """
+    scheduled_game_id, series_id, day = parse_occurrence_key(key)
+    if scheduled_game_id is not None:
+        return scheduled_game_id
 
-def update_game_skipped_status(game_id: int, skipped: bool):
     db: Session = get_session()
-    scheduled_game = db.query(ScheduledGame).filter(ScheduledGame.id == game_id).first()
-    if scheduled_game:
-        scheduled_game.skipped = skipped
+    start = None
+    try:
+        series, start = _find_occurrence(db, series_id, day)
+        if series is None:
+            return None
+        existing = db.query(ScheduledGame.id).filter(
+            ScheduledGame.series_id == series_id, ScheduledGame.datetime == start
+        ).scalar()
+        if existing is not None:
+            return existing
+
+        scheduled_game = ScheduledGame(
+            game_id=series.game_id, datetime=start, initiator_id=series.initiator_id,
+            initiator_name=series.initiator_name, use_steam=series.use_steam, server_data=series.server_data,
+            server_password=series.server_password, discord_telegram_link=series.discord_telegram_link,
+            room=series.room, series_id=series.id, max_players=series.max_players,
+        )
+        db.add(scheduled_game)
+        db.flush()
+        players = _series_players(db, [series_id])[series_id] or [(series.initiator_id, series.initiator_name)]
+        now = utcnow()
+        for user_id, nickname in players:
+            db.execute(_insert_player(scheduled_game.id, user_id, nickname, joined_at=now))
         db.commit()
-    return scheduled_game
-
-def delete_games_by_ids(game_ids: list):
+        return scheduled_game.id
+    except IntegrityError:
+        # Another request created the row first
+        db.rollback()
+        return db.query(ScheduledGame.id).filter(
+            ScheduledGame.series_id == series_id, ScheduledGame.datetime == start
+        ).scalar()
+    finally:
+        db.close()
+
+
+def materialize_occurrences(start: datetime, end: datetime) -> int:
+    """Create the rows of every series occurrence starting between `start` and `end`. Return how many were created."""
     db: Session = get_session()
-    db.query(ScheduledGame).filter(ScheduledGame.id.in_(game_ids)).delete(synchronize_session=False)
-    db.commit()
-
-def get_game_initiator_and_tree(game_id: int):
+    try:
+        occurrences = _get_occurrences(db, start, end, rows_until=start)
+    finally:
+        db.close()
+    created = 0
+    for occurrence in occurrences:
+        if occurrence.id is None:
+            created += materialize_occurrence(occurrence.key) is not None
+    return created
+
+
+def cancel_occurrence(key: str) -> bool:
+    """
+    Cancel one game. An occurrence of a series becomes an exception date of the series.
+
+    Returns:
+        False if there is no such game.
+    """
+    scheduled_game_id, series_id, day = parse_occurrence_key(key)
     db: Session = get_session()
-    scheduled_game = db.query(ScheduledGame).filter(ScheduledGame.id == game_id).first()
-    if scheduled_game:
-        return scheduled_game.initiator_id, scheduled_game.GameTree
-    return None, None
+    try:
+        if scheduled_game_id is not None:
+            game = db.get(ScheduledGame, scheduled_game_id)
+            if game is None:
+                return False
+            games = select(ScheduledGame.id).where(ScheduledGame.id == scheduled_game_id)
+            series = db.get(GameSeries, game.series_id) if game.series_id else None
+            if series is not None:
+                day = game.datetime.astimezone(get_zone(series.timezone)).date()
+        else:
+            series = db.get(GameSeries, series_id)
+            if series is None:
+                return False
+            games = select(ScheduledGame.id).where(
+                ScheduledGame.series_id == series_id, ScheduledGame.datetime == _occurrence_start(series, day)
+            )
+        if series is not None:
+            db.add(SeriesException(series_id=series.id, date=day))
+            db.flush()
+        db.query(GamePlayer).filter(GamePlayer.scheduled_game_id.in_(games)).delete(synchronize_session=False)
+        db.query(SentReminder).filter(SentReminder.scheduled_game_id.in_(games)).delete(synchronize_session=False)
+        db.query(ScheduledGame).filter(ScheduledGame.id.in_(games)).delete(synchronize_session=False)
+        db.commit()
+    except IntegrityError:
+        # The occurrence is already cancelled
+        db.rollback()
+    finally:
+        db.close()
+    bump_schedule_version()
+    return True
 
-def delete_past_games(cutoff_time):
+
+def search_games(query: str, limit: int = 10):
+    return _search_games(query, limit)
+
+def get_online_games():
+    return catalog.by_online(True)
+
+def get_offline_games():
+    return catalog.by_online(False)
+
+def get_available_room(selected_datetime: datetime):
+    """Return the first room that no game from 9 hours before `selected_datetime` on takes, None when all are taken."""
     db: Session = get_session()
-    db.query(ScheduledGame).filter(
-        ScheduledGame.datetime < cutoff_time
-    ).delete()
-    db.commit()
+    try:
+        # A range over the datetime index, not a scan of the whole schedule
+        taken_rooms = set(db.scalars(
+            select(ScheduledGame.room).where(ScheduledGame.datetime > selected_datetime - timedelta(hours=9)).distinct()
+        ))
+    finally:
+        db.close()
+
+    for room in range(1, 21):
+        if room not in taken_rooms:
+            return room
+    return None
 
-def get_enrolled_players(id: int):
+def get_scheduled_game_by_id(game_id: int):
     db: Session = get_session()
-    scheduled_game = db.query(ScheduledGame).filter(ScheduledGame.skipped == 0, ScheduledGame.id == id).first()
-    if scheduled_game:
-        return scheduled_game.player_ids.split(','), scheduled_game.player_nicknames.split(',')
-    return None, None
+    try:
+        return db.query(ScheduledGame).filter(ScheduledGame.id == game_id).first()
+    finally:
+        db.close()
 
-def synchronize_series_players(game_id: int):
+# filepath: /home/verner/tablettop_bot/src/tablettop_bot/db/crud/games.py
+def get_game_name_by_id(game_id: int):
+    game = catalog.get(game_id)
+    return game.name if game else "Unknown Game"
+
+def get_enrolled_games_by_user(user_id: int, horizon_days: int = SERIES_HORIZON_DAYS):
+    """Return the upcoming games of a player, with the occurrences of the series they play in."""
     db: Session = get_session()
-    game = db.query(ScheduledGame).filter(ScheduledGame.id == game_id).first()
-    if not game or not game.GameTree:
-        return
-
-    game_tree_ids = game.GameTree.split(',')
-    all_players = []
-
-    for g_id in game_tree_ids:
-        g = db.query(ScheduledGame).filter(ScheduledGame.id == g_id).first()
-        if g:
-            player_ids = g.player_ids.split(',') if g.player_ids else []
-            player_nicknames = g.player_nicknames.split(',') if g.player_nicknames else []
-            print(f"all_players: {all_players}")
-            for player_id, player_nickname in zip(player_ids, player_nicknames):
-                if (player_id, player_nickname) not in all_players:
-                    all_players.append((player_id, player_nickname))
-
-    all_player_ids_str = ','.join([pid for pid, _ in all_players])
-    all_player_nicknames_str = ','.join([pname for _, pname in all_players])
-
-    db.query(ScheduledGame).filter(ScheduledGame.id.in_(game_tree_ids)).update({"player_ids": all_player_ids_str, "player_nicknames": all_player_nicknames_str}, synchronize_session=False)
-    db.commit()
+    try:
+        now = utcnow()
+        series_ids = select(ScheduledGame.series_id).join(
+            GamePlayer, GamePlayer.scheduled_game_id == ScheduledGame.id
+        ).where(GamePlayer.user_id == user_id, GamePlayer.status == PlayerStatus.JOINED.value)
+        enrolled = {game_id for (game_id,) in db.query(GamePlayer.scheduled_game_id).filter(GamePlayer.user_id == user_id)}
+        enrolled_series = {series_id for (series_id,) in db.execute(series_ids) if series_id is not None}
+        return [
+            game for game in _get_occurrences(db, now, now + timedelta(days=horizon_days))
+            if game.id in enrolled or (game.id is None and game.series_id in enrolled_series)
+        ]
+    finally:
+        db.close()
+
+def get_hosted_games_by_user(user_id: int, horizon_days: int = SERIES_HORIZON_DAYS):
+    """Return the upcoming games hosted by a user, with the occurrences of their series."""
+    db: Session = get_session()
+    try:
+        now = utcnow()
+        return _get_occurrences(db, now, now + timedelta(days=horizon_days), initiator_id=user_id)
+    finally:
+        db.close()
+
+def delete_series(series_id: int):
+    """Delete a series with all its occurrences, players, reminders and exceptions."""
+    db: Session = get_session()
+    try:
+        occurrences = select(ScheduledGame.id).where(ScheduledGame.series_id == series_id)
+        db.query(GamePlayer).filter(GamePlayer.scheduled_game_id.in_(occurrences)).delete(synchronize_session=False)
+        db.query(SentReminder).filter(SentReminder.scheduled_game_id.in_(occurrences)).delete(synchronize_session=False)
+        deleted = db.query(ScheduledGame).filter(ScheduledGame.series_id == series_id).delete(synchronize_session=False)
+        db.query(SeriesException).filter(SeriesException.series_id == series_id).delete(synchronize_session=False)
+        db.query(SeriesPlayer).filter(SeriesPlayer.series_id == series_id).delete(synchronize_session=False)
+        db.query(GameSeries).filter(GameSeries.id == series_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    bump_schedule_version()
+    return deleted
@@ -0,0 +1,97 @@
+import logging
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from tablettop_bot.core.timezones import utcnow
+
+from ..database import get_session
+from ..models import Job
+from ..read_models import JobRow, read_rows, select_rows
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    """Status of a jobs row"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    # Queued or running when the bot stopped
+    INTERRUPTED = "interrupted"
+
+
+def _update_job(job_id: int, **values) -> None:
+    db: Session = get_session()
+    try:
+        db.execute(update(Job).where(Job.id == job_id).values(**values))
+        db.commit()
+    finally:
+        db.close()
+
+
+def create_job(task: str, queue: str, priority: int, max_attempts: int, user_id: Optional[int] = None) -> int:
+    """Record a queued job. Return its id."""
+    db: Session = get_session()
+    try:
+        job_id = db.execute(insert(Job).values(
+            task=task, queue=queue, priority=priority, status=JobStatus.QUEUED.value, attempts=0,
+            max_attempts=max_attempts, user_id=user_id, created_at=utcnow(),
+        )).inserted_primary_key[0]
+        db.commit()
+        return job_id
+    finally:
+        db.close()
+
+
+def start_job(job_id: int) -> None:
+    """Mark a job as running and count the attempt."""
+    _update_job(job_id, status=JobStatus.RUNNING.value, attempts=Job.attempts + 1, started_at=utcnow())
+
+
+def update_job_progress(job_id: int, done: int, total: int) -> None:
+    """Record how many of the `total` steps of a running job are done."""
+    _update_job(job_id, progress_done=done, progress_total=total)
+
+
+def finish_job(job_id: int) -> None:
+    """Mark a job as done."""
+    _update_job(job_id, status=JobStatus.DONE.value, error=None, finished_at=utcnow())
+
+
+def fail_job(job_id: int, error: str, retry: bool) -> None:
+    """Record the error of an attempt, the job is queued again if it will be retried."""
+    if retry:
+        _update_job(job_id, status=JobStatus.QUEUED.value, error=error)
+    else:
+        _update_job(job_id, status=JobStatus.FAILED.value, error=error, finished_at=utcnow())
+
+
+def interrupt_unfinished_jobs() -> int:
+    """Mark the jobs left queued or running by an earlier process as interrupted. Return how many there were."""
+    db: Session = get_session()
+    try:
+        interrupted = db.execute(
+            update(Job)
+            .where(Job.status.in_([JobStatus.QUEUED.value, JobStatus.RUNNING.value]))
+            .values(status=JobStatus.INTERRUPTED.value, finished_at=utcnow())
+        ).rowcount
+        db.commit()
+        return interrupted
+    finally:
+        db.close()
+
+
+def read_recent_jobs(limit: int = 10) -> list[JobRow]:
+    """Read the latest jobs, newest first."""
+    db: Session = get_session()
+    try:
+        return read_rows(db, JobRow, select_rows(JobRow, Job).order_by(Job.created_at.desc(), Job.id.desc()).limit(limit))
+    finally:
+        db.close()
@@ -0,0 +1,40 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from tablettop_bot.core.timezones import utcnow
+
+from ..database import get_session
+from ..models import PollingOffset
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def read_update_offset(bot_id: int) -> Optional[int]:
+    """Read the id of the last update the bot handled, None if it never saved one."""
+    db: Session = get_session()
+    try:
+        return db.execute(select(PollingOffset.update_id).where(PollingOffset.bot_id == bot_id)).scalar()
+    finally:
+        db.close()
+
+
+def save_update_offset(bot_id: int, update_id: int) -> None:
+    """Record the id of the last update the bot handled."""
+    db: Session = get_session()
+    try:
+        values = {"update_id": update_id, "updated_at": utcnow()}
+        updated = db.execute(update(PollingOffset).where(PollingOffset.bot_id == bot_id).values(**values))
+        if updated.rowcount == 0:
+            db.execute(insert(PollingOffset).values(bot_id=bot_id, **values))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error saving the update offset of bot {bot_id}: {e}")
+        raise
+    finally:
+        db.close()
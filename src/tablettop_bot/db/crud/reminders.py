@@ -0,0 +1,65 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..database import get_session
+from ..models import GamePlayer, ScheduledGame, SentReminder, User
+from .games import PlayerStatus
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def get_due_reminders(start: datetime, end: datetime, kind: str) -> list:
+    """
+    Read the joined players of games starting between `start` and `end` who have not got a `kind` reminder yet.
+
+    One range query over the scheduled_games datetime index, joined with the players of
+    each game, so the cost grows with the number of due reminders, not with the schedule.
+
+    Returns:
+        Rows with scheduled_game_id, game_id, datetime, room, user_id and the user's timezone and language, ordered by game time.
+    """
+    db: Session = get_session()
+    try:
+        already_sent = exists().where(
+            SentReminder.scheduled_game_id == ScheduledGame.id,
+            SentReminder.user_id == GamePlayer.user_id,
+            SentReminder.kind == kind,
+        )
+        return db.query(
+            ScheduledGame.id.label("scheduled_game_id"),
+            ScheduledGame.game_id,
+            ScheduledGame.datetime,
+            ScheduledGame.room,
+            GamePlayer.user_id,
+            User.timezone,
+            User.lang,
+        ).join(GamePlayer, GamePlayer.scheduled_game_id == ScheduledGame.id).outerjoin(
+            User, User.id == GamePlayer.user_id
+        ).filter(
+            ScheduledGame.datetime >= start,
+            ScheduledGame.datetime <= end,
+            GamePlayer.status == PlayerStatus.JOINED.value,
+            ~already_sent,
+        ).order_by(ScheduledGame.datetime, ScheduledGame.id).all()
+    finally:
+        db.close()
+
+
+def mark_reminder_sent(scheduled_game_id: int, user_id: int, kind: str, sent_at: datetime) -> bool:
+    """Record a sent reminder. Return False if it was already recorded."""
+    db: Session = get_session()
+    try:
+        db.add(SentReminder(scheduled_game_id=scheduled_game_id, user_id=user_id, kind=kind, sent_at=sent_at))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+    finally:
+        db.close()
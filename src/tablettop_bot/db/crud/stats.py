@@ -0,0 +1,148 @@
+import logging
+from datetime import date, datetime
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from tablettop_bot.core.timezones import utcnow
+
+from ..database import get_session
+from ..models import ArchivedGame, ArchivedGamePlayer, DailyActivity, Event, Game, GameRollup, RollupState
+from .games import PlayerStatus
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACTIVITY_ROLLUP = "daily_activity"
+GAMES_ROLLUP = "game_rollups"
+
+
+def _as_date(value) -> date:
+    """SQLite returns date() as a string, PostgreSQL as a date."""
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _utc_date(db: Session, column):
+    """date() of a UTC column. PostgreSQL takes it in the session time zone, SQLite stores UTC wall times."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date(func.timezone("UTC", column))
+    return func.date(column)
+
+
+def _rollup_state(db: Session, name: str) -> RollupState:
+    state = db.get(RollupState, name)
+    if state is None:
+        state = RollupState(name=name, last_id=0)
+        db.add(state)
+    return state
+
+
+def refresh_daily_activity() -> int:
+    """Roll up the events added since the last refresh into daily_activity. Return the number of new rows."""
+    db: Session = get_session()
+    try:
+        state = _rollup_state(db, ACTIVITY_ROLLUP)
+        last_id = state.last_id or 0
+        upper = db.scalar(select(func.max(Event.id))) or 0
+        added = 0
+        if upper > last_id:
+            pairs = {
+                (_as_date(day), user_id)
+                for day, user_id in db.execute(
+                    select(_utc_date(db, Event.timestamp), Event.user_id)
+                    .where(Event.id > last_id, Event.id <= upper, Event.user_id.is_not(None))
+                    .distinct()
+                )
+            }
+            days = {day for day, _ in pairs}
+            known = set(db.execute(
+                select(DailyActivity.day, DailyActivity.user_id).where(DailyActivity.day.in_(days))
+            ).tuples())
+            new = pairs - known
+            if new:
+                db.execute(insert(DailyActivity), [{"day": day, "user_id": user_id} for day, user_id in new])
+            added = len(new)
+            state.last_id = upper
+        state.updated_at = utcnow()
+        db.commit()
+        return added
+    finally:
+        db.close()
+
+
+def refresh_game_rollups() -> int:
+    """Roll up the archived games that have no game_rollups row yet. Return the number of new rows."""
+    def count_players(status: PlayerStatus):
+        return select(func.count()).where(
+            ArchivedGamePlayer.archived_game_id == ArchivedGame.id, ArchivedGamePlayer.status == status.value
+        ).scalar_subquery()
+
+    db: Session = get_session()
+    try:
+        result = db.execute(insert(GameRollup).from_select(
+            ["archived_game_id", "game_id", "day", "initiator_id", "initiator_name", "seats", "min_players",
+             "joined", "waitlisted"],
+            select(
+                ArchivedGame.id,
+                ArchivedGame.game_id,
+                _utc_date(db, ArchivedGame.datetime),
+                ArchivedGame.initiator_id,
+                ArchivedGame.initiator_name,
+                func.coalesce(ArchivedGame.max_players, Game.max_players),
+                Game.min_players,
+                count_players(PlayerStatus.JOINED),
+                count_players(PlayerStatus.WAITLISTED),
+            ).outerjoin(Game, Game.id == ArchivedGame.game_id).where(
+                ~exists().where(GameRollup.archived_game_id == ArchivedGame.id)
+            ),
+        ))
+        _rollup_state(db, GAMES_ROLLUP).updated_at = utcnow()
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+def refresh_rollups() -> tuple[int, int]:
+    """Refresh every rollup. Return the numbers of new activity and game rows."""
+    return refresh_daily_activity(), refresh_game_rollups()
+
+
+def read_daily_activity(start: date, end: date) -> pd.DataFrame:
+    """Read the (day, user_id) rollup rows of a date range, both ends included."""
+    db: Session = get_session()
+    try:
+        return pd.read_sql(
+            select(DailyActivity.day, DailyActivity.user_id).where(DailyActivity.day.between(start, end)),
+            db.connection(),
+        )
+    finally:
+        db.close()
+
+
+def read_game_rollups(start: date, end: date) -> pd.DataFrame:
+    """Read the game rollup rows of a date range, both ends included, with the names of their games."""
+    db: Session = get_session()
+    try:
+        return pd.read_sql(
+            select(
+                GameRollup.day, GameRollup.game_id, func.coalesce(Game.name, "?").label("name"),
+                GameRollup.initiator_id, GameRollup.initiator_name, GameRollup.seats, GameRollup.min_players,
+                GameRollup.joined, GameRollup.waitlisted,
+            ).outerjoin(Game, Game.id == GameRollup.game_id).where(GameRollup.day.between(start, end)),
+            db.connection(),
+        )
+    finally:
+        db.close()
+
+
+def read_rollups_updated_at() -> Optional[datetime]:
+    """Return when the least recently refreshed rollup was refreshed, None before the first refresh."""
+    db: Session = get_session()
+    try:
+        return db.scalar(select(func.min(RollupState.updated_at)))
+    finally:
+        db.close()
@@ -1,11 +1,14 @@
 import logging
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
 
+from sqlalchemy import Row, and_, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from ..database import get_session
 from ..models import User
+from ..read_models import UserRow, select_rows
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -20,22 +23,82 @@ def read_user(id: int) -> User:
     return result
 
 
+def normalize_username(username: str) -> str:
+    """Username as matched by the lookups: without the leading @ and lowercased, Telegram usernames are ASCII"""
+    return username.strip().lstrip("@").lower()
+
+
 def read_user_by_username(username: str) -> User:
-    """Read user by username"""
+    """Read user by username, case-insensitively and with or without the leading @"""
+    db: Session = get_session()
+    result = db.query(User).filter(func.lower(User.username) == normalize_username(username)).first()
+    db.close()
+    return result
+
+
+def search_users_by_username(prefix: str, limit: int = 10) -> list[Row]:
+    """
+    Read the (id, username, role) of the users whose username starts with `prefix`, in username order.
+
+    On PostgreSQL the prefix is a LIKE served by the pattern operator index ix_users_username_prefix,
+    a range would follow the collation's order. SQLite compares text bytewise, so there the prefix
+    is a range of the lower(username) index, which its LIKE can not use.
+    """
+    prefix = normalize_username(prefix)
+    if not prefix:
+        return []
+    username = func.lower(User.username)
     db: Session = get_session()
-    result = db.query(User).filter(User.username == username).first()
+    try:
+        if db.get_bind().dialect.name == "sqlite":
+            # Usernames are ASCII, so every name with the prefix sorts below prefix + DEL
+            matches = and_(username >= prefix, username < prefix + "\x7f")
+        else:
+            matches = username.startswith(prefix, autoescape=True)
+        return db.execute(
+            select(User.id, User.username, User.role)
+            .where(matches)
+            .order_by(username)
+            .limit(limit)
+        ).all()
+    finally:
+        db.close()
+
+
+def read_user_timezones(ids: list[int]) -> dict[int, Optional[str]]:
+    """Read the time zone names of several users, users without one are left out"""
+    db: Session = get_session()
+    result = dict(db.query(User.id, User.timezone).filter(User.id.in_(ids), User.timezone.is_not(None)).all())
     db.close()
     return result
 
 
 def read_users() -> list[User]:
-    """Read all users"""
+    """Read all users, bulk consumers should stream the columns they need with `iter_users`"""
     db: Session = get_session()
     result = db.query(User).all()
     db.close()
     return result
 
 
+def iter_users(*columns, batch_size: int = 1000) -> Iterator[Row]:
+    """
+    Stream rows of the given User columns, (User.id, User.lang) by default, in id order.
+
+    Rows are fetched `batch_size` at a time, from a server-side cursor on PostgreSQL, so
+    memory stays flat however many users there are. The session is open until the
+    iterator is exhausted or closed.
+    """
+    db: Session = get_session()
+    try:
+        result = db.execute(
+            select(*(columns or (User.id, User.lang))).order_by(User.id).execution_options(yield_per=batch_size)
+        )
+        yield from result
+    finally:
+        db.close()
+
+
 def create_user(
     id: int,
     username: Optional[str] = None,
@@ -94,6 +157,7 @@ def update_user(
     phone_number: Optional[str] = None,
     lang: Optional[str] = None,
     role: Optional[str] = None,
+    timezone: Optional[str] = None,
 ) -> User:
     """
     Update an existing user.
@@ -106,6 +170,7 @@ def update_user(
         phone_number: The user's phone number.
         lang: The user's language.
         role: The user's role.
+        timezone: The user's IANA time zone.
 
     Returns:
         The updated user object.
@@ -127,6 +192,8 @@ def update_user(
                 user.lang = lang
             if role is not None:
                 user.role = role
+            if timezone is not None:
+                user.timezone = timezone
             user.last_message_timestamp = datetime.now()
             db.commit()
             logger.info(f"User with ID {user.id} updated successfully.")
@@ -184,3 +251,38 @@ def upsert_user(
     finally:
         db.close()
     return user
+
+
+def touch_user(
+    id: int, username: Optional[str] = None, first_name: Optional[str] = None, last_name: Optional[str] = None
+) -> UserRow:
+    """
+    Record an update from a user, like `upsert_user`, and return the read-only row the handlers get.
+
+    A known user is updated and read back by one UPDATE ... RETURNING, a new one is inserted
+    with the column defaults. No ORM instance is built on this per-update path.
+    """
+    values = {"username": username, "first_name": first_name, "last_name": last_name}
+    values = {column: value for column, value in values.items() if value is not None}
+    now = datetime.now()
+    db: Session = get_session()
+    try:
+        returning = [getattr(User, field) for field in UserRow._fields]
+        touched = update(User).where(User.id == id).values(**values, last_message_timestamp=now).returning(*returning)
+        row = db.execute(touched).first()
+        if row is None:
+            try:
+                db.execute(insert(User).values(id=id, **values, first_message_timestamp=now, last_message_timestamp=now))
+            except IntegrityError:
+                # A concurrent update of the same user inserted it first
+                db.rollback()
+            row = db.execute(select_rows(UserRow, User).where(User.id == id)).first()
+            logger.info(f"User with name {username} added successfully.")
+        db.commit()
+        return UserRow._make(row)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error touching user with ID {id}: {e}")
+        raise
+    finally:
+        db.close()
@@ -2,9 +2,12 @@ import csv
 import logging
 import logging.config
 import os
+import threading
+from typing import Callable, Optional
 
 from dotenv import find_dotenv, load_dotenv
 from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 
@@ -36,13 +39,34 @@ else:
     # Construct the database URL for PostgreSQL
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=require"
 
-def get_engine():
-    """Get a new engine for the database."""
-    return create_engine(
-        DATABASE_URL,
-        connect_args={"connect_timeout": 5, "application_name": "tablettop_bot"} if "postgresql" in DATABASE_URL else {},
-        poolclass=NullPool if "postgresql" in DATABASE_URL else None,
-    )
+
+# The engine of the current `DATABASE_URL`, sessions share its connection pool
+_engines: dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """Get the engine of the database. It is rebuilt when `DATABASE_URL` changes."""
+    with _engines_lock:
+        engine = _engines.get(DATABASE_URL)
+        if engine is None:
+            for stale in _engines.values():
+                stale.dispose()
+            _engines.clear()
+            engine = _engines[DATABASE_URL] = create_engine(
+                DATABASE_URL,
+                # SQLite writers wait for the database lock instead of failing under concurrent enrollments
+                connect_args={"connect_timeout": 5, "application_name": "tablettop_bot"} if "postgresql" in DATABASE_URL else {"timeout": 30},
+                poolclass=NullPool if "postgresql" in DATABASE_URL else None,
+            )
+        return engine
+
+
+def dispose_engine() -> None:
+    """Close the pooled connections of the engine."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
 
 
 def create_tables():
@@ -65,12 +89,19 @@ def get_session():
     return sessionmaker(bind=engine)()
 
 
-def export_all_tables(export_dir: str):
-    """Export all tables to CSV files."""
+def export_all_tables(export_dir: str, tables: Optional[list[str]] = None, progress: Optional[Callable] = None):
+    """
+    Export tables to CSV files, all of them by default.
+
+    Args:
+        tables: Names of the tables to export.
+        progress: Called with the numbers of exported and all tables after each one.
+    """
     db = get_session()
     inspector = inspect(db.get_bind())
 
-    for table_name in inspector.get_table_names():
+    table_names = tables or inspector.get_table_names()
+    for position, table_name in enumerate(table_names, start=1):
         file_path = os.path.join(export_dir, f"{table_name}.csv")
         with open(file_path, mode="w", newline="") as file:
             writer = csv.writer(file)
@@ -80,25 +111,14 @@ def export_all_tables(export_dir: str):
             records = db.execute(text(f"SELECT * FROM {table_name}")).fetchall()
             for record in records:
                 writer.writerow(record)
+        if progress:
+            progress(position, len(table_names))
 
     db.close()
 
 
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-# Start a new session
-Session = sessionmaker(bind=engine)
-session = Session()
-
-def init_games_table():
+def init_games_table() -> int:
+    """Seed the game library with the starter games it does not have yet. Return the number of added games."""
     # Insert data into the games table
     games_data = [
         {
@@ -175,9 +195,16 @@ def init_games_table():
         },
     ]
 
-    # Add and commit data
-    for game_data in games_data:
-        game = Game(**game_data)
-        session.add(game)
-
-    session.commit()
+    # Games are matched by name, so the seed is safe to run on every start
+    db = get_session()
+    try:
+        existing = {name for (name,) in db.query(Game.name).filter(Game.name.in_([g["name"] for g in games_data]))}
+        added = [Game(**{k: v for k, v in game_data.items() if k != "id"}) for game_data in games_data
+                 if game_data["name"] not in existing]
+        db.add_all(added)
+        db.commit()
+    finally:
+        db.close()
+    if added:
+        logger.info(f"Seeded {len(added)} games")
+    return len(added)
@@ -0,0 +1,134 @@
+"""Statement counting and N+1 detection built on SQLAlchemy engine events."""
+
+import logging
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|%\([^)]*\)s|%s|:\w+)\s*,?)+\)")
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a tracked block runs more statements than its budget allows."""
+
+
+class QueryStats:
+    """Statements executed while a tracking block was active."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        """Number of statements executed."""
+        return len(self.statements)
+
+    @property
+    def shapes(self) -> Counter:
+        """Number of executions per normalized statement."""
+        return Counter(normalize_statement(statement) for statement in self.statements)
+
+    def repeated_shapes(self, threshold: int) -> list[tuple[str, int]]:
+        """Return statement shapes executed at least `threshold` times (N+1 suspects)."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+def normalize_statement(statement: str) -> str:
+    """Reduce a SQL statement to its shape so that per-row lookups compare equal."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    return _PLACEHOLDER_LIST.sub("(?)", shape)
+
+
+def _active() -> list[QueryStats]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    for stats in _active():
+        stats.statements.append(statement)
+
+
+def start_tracking(name: str) -> QueryStats:
+    """Start counting statements executed by the current thread."""
+    stats = QueryStats(name)
+    _active().append(stats)
+    return stats
+
+
+def stop_tracking(stats: QueryStats) -> QueryStats:
+    """Stop counting statements for a block started with `start_tracking`."""
+    stack = _active()
+    if stats in stack:
+        stack.remove(stats)
+    return stats
+
+
+@contextmanager
+def track_queries(name: str) -> Iterator[QueryStats]:
+    """Count statements executed by the current thread inside the block."""
+    stats = start_tracking(name)
+    try:
+        yield stats
+    finally:
+        stop_tracking(stats)
+
+
+def find_offences(stats: QueryStats, max_queries: Optional[int], n_plus_one_threshold: Optional[int]) -> list[str]:
+    """Describe how a tracked block broke its budget, if it did."""
+    offences = []
+    if max_queries is not None and stats.count > max_queries:
+        offences.append(f"{stats.count} statements (budget {max_queries})")
+    if n_plus_one_threshold is not None:
+        for shape, n in stats.repeated_shapes(n_plus_one_threshold):
+            offences.append(f"N+1 suspect, {n} executions of: {shape}")
+    return offences
+
+
+def report(stats: QueryStats, max_queries: Optional[int], n_plus_one_threshold: Optional[int]) -> list[str]:
+    """Log budget offences of a tracked block and return them."""
+    offences = find_offences(stats, max_queries, n_plus_one_threshold)
+    for offence in offences:
+        logger.warning(f"Query budget: handler '{stats.name}' ran {offence}")
+    return offences
+
+
+@contextmanager
+def query_budget(
+    max_queries: Optional[int] = None, n_plus_one_threshold: Optional[int] = None, name: str = "block"
+) -> Iterator[QueryStats]:
+    """
+    Fail when the block exceeds a statement budget or repeats a statement shape.
+
+    Args:
+        max_queries: Maximum number of statements the block may execute.
+        n_plus_one_threshold: Number of executions of one statement shape treated as N+1.
+        name: Label used in the error message.
+
+    Raises:
+        QueryBudgetExceeded: If the block breaks the budget.
+    """
+    with track_queries(name) as stats:
+        yield stats
+    offences = find_offences(stats, max_queries, n_plus_one_threshold)
+    if offences:
+        raise QueryBudgetExceeded(f"'{name}' exceeded its query budget: " + "; ".join(offences))
@@ -0,0 +1,463 @@
+"""
+Versioned schema and data migrations.
+
+Startup calls `migrate`, which applies the migrations the database has not recorded in
+schema_migrations yet, in version order, each in its own transaction. Migrations are
+never edited once released: a schema change is a new `@migration` with the next version
+at the end of this file, written so that it also runs on a database that already has
+the change (`add_column`, `create_index`).
+"""
+
+import logging
+from datetime import datetime
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import Connection, Engine, Index, Table, bindparam, insert, inspect, select, text
+from sqlalchemy.schema import CreateIndex
+
+from tablettop_bot.core.timezones import UTC, get_zone, to_utc, utcnow
+
+from . import database
+from .models import (
+    POSTGRES_SEARCH_DDL,
+    SQLITE_SEARCH_DDL,
+    ArchivedGame,
+    ArchivedGamePlayer,
+    Base,
+    Event,
+    Game,
+    GamePlayer,
+    GameSeries,
+    Job,
+    PollingOffset,
+    ScheduleBoard,
+    ScheduledGame,
+    SchemaMigration,
+    SeriesException,
+    SeriesPlayer,
+    User,
+    sqlite_has_fts5,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Key of the PostgreSQL advisory lock that keeps two starting bots from migrating at once
+MIGRATION_LOCK_ID = 7461301
+
+
+class Migration(NamedTuple):
+    """One versioned migration"""
+
+    version: int
+    name: str
+    apply: Callable[[Connection], object]
+    # False for statements that cannot run in a transaction, e.g. CREATE INDEX CONCURRENTLY
+    transactional: bool = True
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, name: str, transactional: bool = True):
+    """Register the decorated function as the migration `version`."""
+    def register(apply: Callable[[Connection], object]):
+        if any(known.version == version for known in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, name, apply, transactional))
+        return apply
+    return register
+
+
+def add_column(connection: Connection, table: str, column: str, ddl: str) -> bool:
+    """Add a column unless the table has it. `ddl` is its definition after the name. Return whether it was added."""
+    if column in {c["name"] for c in inspect(connection).get_columns(table)}:
+        return False
+    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+def model_index(table: Table, name: str) -> Index:
+    """Index declared on a model table, migrations create the model's own index instead of a copy."""
+    return next(index for index in table.indexes if index.name == name)
+
+
+def create_index(connection: Connection, index: Index) -> None:
+    """
+    Create a model index unless it exists.
+
+    On PostgreSQL the index is built CONCURRENTLY, without blocking writes, so the migration
+    must be registered with `transactional=False`.
+    """
+    statement = str(CreateIndex(index, if_not_exists=True).compile(dialect=connection.dialect))
+    if connection.dialect.name == "postgresql":
+        statement = statement.replace("INDEX", "INDEX CONCURRENTLY", 1)
+    connection.execute(text(statement))
+
+
+def drop_index(connection: Connection, name: str) -> None:
+    """Drop an index if it exists, CONCURRENTLY on PostgreSQL like `create_index`."""
+    concurrently = " CONCURRENTLY" if connection.dialect.name == "postgresql" else ""
+    connection.execute(text(f"DROP INDEX{concurrently} IF EXISTS {name}"))
+
+
+def get_applied_versions(engine: Engine) -> set[int]:
+    """Versions recorded in schema_migrations."""
+    SchemaMigration.__table__.create(engine, checkfirst=True)
+    with engine.connect() as connection:
+        return set(connection.scalars(select(SchemaMigration.version)))
+
+
+def _record(connection: Connection, step: Migration) -> None:
+    connection.execute(insert(SchemaMigration.__table__).values(
+        version=step.version, name=step.name, applied_at=utcnow()
+    ))
+
+
+def migrate(engine: Optional[Engine] = None) -> list[int]:
+    """Apply the pending migrations in version order. Return the applied versions."""
+    engine = engine or database.get_engine()
+    applied = []
+    with engine.connect() as lock:
+        if engine.dialect.name == "postgresql":
+            lock.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+        try:
+            done = get_applied_versions(engine)
+            for step in sorted(MIGRATIONS):
+                if step.version in done:
+                    continue
+                logger.info(f"Applying migration {step.version}: {step.name}")
+                if step.transactional:
+                    with engine.begin() as connection:
+                        step.apply(connection)
+                        _record(connection, step)
+                else:
+                    with engine.connect() as connection:
+                        step.apply(connection.execution_options(isolation_level="AUTOCOMMIT"))
+                    with engine.begin() as connection:
+                        _record(connection, step)
+                applied.append(step.version)
+        finally:
+            if engine.dialect.name == "postgresql":
+                lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_ID})
+                lock.commit()
+    logger.info(f"Applied migrations: {applied}" if applied else "Database schema is up to date")
+    return applied
+
+
+def _find(parents: dict, game_id: int) -> int:
+    while parents[game_id] != game_id:
+        parents[game_id] = parents[parents[game_id]]
+        game_id = parents[game_id]
+    return game_id
+
+
+def _as_utc(value) -> datetime:
+    # Raw SQLite rows return DATETIME columns as strings, legacy rows hold wall times of the default zone
+    value = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return to_utc(value, get_zone())
+
+
+def migrate_game_trees(engine: Engine) -> int:
+    """
+    Move weekly series from the legacy PGID/GameTree columns of scheduled_games to game_series.
+
+    Games linked by PGID or listed in one GameTree form one series, a weekly rule starting
+    at its first game. The legacy columns are left in place and ignored. Return the number
+    of created series.
+    """
+    with engine.begin() as connection:
+        return _migrate_game_trees(connection)
+
+
+def _migrate_game_trees(connection: Connection) -> int:
+    if add_column(connection, "scheduled_games", "series_id", "INTEGER REFERENCES game_series(id)"):
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_scheduled_games_series_id ON scheduled_games (series_id)"
+        ))
+    columns = {column["name"] for column in inspect(connection).get_columns("scheduled_games")}
+    if "GameTree" not in columns or "PGID" not in columns:
+        return 0
+
+    rows = connection.execute(text(
+        'SELECT id, game_id, initiator_id, initiator_name, datetime, use_steam, server_data, server_password, '
+        'discord_telegram_link, room, "PGID", "GameTree" FROM scheduled_games '
+        'WHERE series_id IS NULL AND ("PGID" IS NOT NULL OR "GameTree" IS NOT NULL OR repweekly)'
+    )).all()
+    parents = {row.id: row.id for row in rows}
+    for row in rows:
+        linked = [row.PGID] + [int(i) for i in (row.GameTree or "").split(",") if i.strip().isdigit()]
+        for other in linked:
+            if other in parents:
+                parents[_find(parents, other)] = _find(parents, row.id)
+
+    groups: dict[int, list] = {}
+    for row in rows:
+        groups.setdefault(_find(parents, row.id), []).append(row)
+
+    for members in groups.values():
+        first = min(members, key=lambda row: row.id)
+        series_id = connection.execute(insert(GameSeries.__table__).values(
+            game_id=first.game_id, initiator_id=first.initiator_id, initiator_name=first.initiator_name,
+            created_at=utcnow(), dtstart=_as_utc(first.datetime), rrule="FREQ=WEEKLY",
+            use_steam=first.use_steam, server_data=first.server_data, server_password=first.server_password,
+            discord_telegram_link=first.discord_telegram_link, room=first.room,
+        )).inserted_primary_key[0]
+        connection.execute(
+            text("UPDATE scheduled_games SET series_id = :series_id WHERE id = :id"),
+            [{"series_id": series_id, "id": row.id} for row in members],
+        )
+
+    logger.info(f"Migrated {len(groups)} game series from GameTree")
+    return len(groups)
+
+
+@migration(1, "baseline schema")
+def _baseline(connection: Connection) -> None:
+    """Create the missing tables, databases from before the migration runner keep theirs and their data."""
+    Base.metadata.create_all(connection)
+
+
+@migration(2, "game series from GameTree")
+def _game_trees(connection: Connection) -> None:
+    _migrate_game_trees(connection)
+
+
+@migration(3, "indexes for username, host, event and series lookups", transactional=False)
+def _lookup_indexes(connection: Connection) -> None:
+    for table, name in [
+        (User.__table__, "ix_users_username"),
+        (ScheduledGame.__table__, "ix_scheduled_games_initiator_datetime"),
+        (Event.__table__, "ix_events_user_id"),
+        (ScheduledGame.__table__, "ix_scheduled_games_series"),
+        (ArchivedGame.__table__, "ix_archived_games_series"),
+    ]:
+        create_index(connection, model_index(table, name))
+    # Replaced by the partial indexes above
+    drop_index(connection, "ix_scheduled_games_series_id")
+    drop_index(connection, "ix_archived_games_series_id")
+
+
+@migration(4, "case-insensitive username index", transactional=False)
+def _username_index(connection: Connection) -> None:
+    # Migration 3 indexed the raw username under the same name
+    drop_index(connection, "ix_users_username")
+    create_index(connection, model_index(User.__table__, "ix_users_username"))
+
+
+@migration(5, "background jobs table")
+def _jobs(connection: Connection) -> None:
+    Job.__table__.create(connection, checkfirst=True)
+
+
+@migration(6, "polling offsets table")
+def _polling_offsets(connection: Connection) -> None:
+    PollingOffset.__table__.create(connection, checkfirst=True)
+
+
+def _legacy_players(player_ids: Optional[str], player_nicknames: Optional[str]) -> list[tuple[int, str]]:
+    # Comma separated and paired by position, a player listed twice keeps the first seat
+    ids = (player_ids or "").split(",")
+    nicknames = (player_nicknames or "").split(",")
+    players = {}
+    for position, player_id in enumerate(ids):
+        if player_id.strip().lstrip("-").isdigit():
+            players.setdefault(int(player_id), nicknames[position] if position < len(nicknames) else "")
+    return list(players.items())
+
+
+@migration(7, "columns, players and UTC times of baseline databases")
+def _baseline_data(connection: Connection) -> None:
+    """
+    Bring scheduled_games and users of a database from before the migration runner to the current models.
+
+    Migration 1 only created the missing tables. The legacy date column tells the baseline
+    scheduled_games table apart, databases created by migration 1 have nothing to convert.
+    """
+    add_column(connection, "users", "timezone", "VARCHAR")
+    add_column(connection, "scheduled_games", "max_players", "INTEGER")
+    columns = {column["name"] for column in inspect(connection).get_columns("scheduled_games")}
+    if "date" not in columns:
+        return
+
+    # Baseline times are naive wall times of the default zone
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            f"ALTER TABLE scheduled_games ALTER COLUMN datetime TYPE TIMESTAMP WITH TIME ZONE "
+            f"USING datetime AT TIME ZONE '{get_zone().key}'"
+        ))
+    else:
+        rows = connection.execute(text("SELECT id, datetime FROM scheduled_games WHERE datetime IS NOT NULL")).all()
+        if rows:
+            # Bound with the model's type, so the values are formatted like the ones the ORM writes
+            statement = text("UPDATE scheduled_games SET datetime = :datetime WHERE id = :id").bindparams(
+                bindparam("datetime", type_=ScheduledGame.__table__.c.datetime.type)
+            )
+            connection.execute(statement, [{"id": row.id, "datetime": _as_utc(row.datetime)} for row in rows])
+
+    # Skipped rows were cancelled occurrences, series keep them as exceptions
+    skipped = connection.execute(text(
+        "SELECT id, series_id, datetime FROM scheduled_games WHERE skipped"
+    )).all()
+    series_zones = dict(connection.execute(select(GameSeries.id, GameSeries.timezone)).all())
+    for row in skipped:
+        if row.series_id is None:
+            continue
+        start = datetime.fromisoformat(row.datetime) if isinstance(row.datetime, str) else row.datetime
+        day = start.replace(tzinfo=start.tzinfo or UTC).astimezone(get_zone(series_zones.get(row.series_id))).date()
+        if connection.execute(select(SeriesException.id).where(
+            SeriesException.series_id == row.series_id, SeriesException.date == day
+        )).first() is None:
+            connection.execute(insert(SeriesException.__table__).values(series_id=row.series_id, date=day))
+    if skipped:
+        connection.execute(text("DELETE FROM scheduled_games WHERE skipped"))
+
+    # Players of the legacy columns, for the games that have no game_players rows yet
+    rows = connection.execute(text(
+        "SELECT id, player_ids, player_nicknames FROM scheduled_games WHERE NOT EXISTS "
+        "(SELECT 1 FROM game_players WHERE game_players.scheduled_game_id = scheduled_games.id)"
+    )).all()
+    now = utcnow()
+    players = [
+        {"scheduled_game_id": row.id, "user_id": user_id, "nickname": nickname, "status": "joined", "joined_at": now}
+        for row in rows for user_id, nickname in _legacy_players(row.player_ids, row.player_nicknames)
+    ]
+    if players:
+        connection.execute(insert(GamePlayer.__table__), players)
+    logger.info(f"Converted {len(skipped)} skipped games and {len(players)} players of the baseline schedule")
+
+
+@migration(8, "indexes of baseline tables", transactional=False)
+def _baseline_indexes(connection: Connection) -> None:
+    # Model indexes of the tables migration 1 did not create
+    for table, name in [
+        (Game.__table__, "ix_games_name_id"),
+        (ScheduledGame.__table__, "ix_scheduled_games_datetime_id"),
+    ]:
+        create_index(connection, model_index(table, name))
+    # The unique constraint of the model, occurrences of a series are materialized once
+    inspector = inspect(connection)
+    names = {c["name"] for c in inspector.get_unique_constraints("scheduled_games")}
+    names |= {index["name"] for index in inspector.get_indexes("scheduled_games")}
+    if "uq_scheduled_games_series_datetime" not in names:
+        concurrently = " CONCURRENTLY" if connection.dialect.name == "postgresql" else ""
+        connection.execute(text(
+            f"CREATE UNIQUE INDEX{concurrently} uq_scheduled_games_series_datetime "
+            "ON scheduled_games (series_id, datetime)"
+        ))
+
+
+@migration(9, "series players")
+def _series_players(connection: Connection) -> None:
+    """
+    Store the players of each series, they were collected from all its occurrences, archived ones included.
+
+    A series starts with the joined players of its latest occurrence that has a row, so the
+    players who left the series before do not come back.
+    """
+    SeriesPlayer.__table__.create(connection, checkfirst=True)
+    if connection.execute(select(SeriesPlayer.id).limit(1)).first() is not None:
+        return
+
+    latest = {}
+    for model, player, game_id in [
+        (ArchivedGame, ArchivedGamePlayer, ArchivedGamePlayer.archived_game_id),
+        (ScheduledGame, GamePlayer, GamePlayer.scheduled_game_id),
+    ]:
+        games = select(model.series_id, model.datetime, model.id).where(model.series_id.is_not(None))
+        for series_id, start, id in connection.execute(games):
+            if series_id not in latest or start >= latest[series_id][0]:
+                latest[series_id] = (start, player, game_id, id)
+
+    players = []
+    for series_id, (_, player, game_id, id) in latest.items():
+        rows = connection.execute(select(player.user_id, player.nickname, player.joined_at).where(
+            game_id == id, player.status == "joined"
+        ))
+        players += [
+            {"series_id": series_id, "user_id": row.user_id, "nickname": row.nickname, "joined_at": row.joined_at}
+            for row in rows
+        ]
+    if players:
+        connection.execute(insert(SeriesPlayer.__table__), players)
+
+
+@migration(10, "UTC update times of schedule boards")
+def _board_times(connection: Connection) -> None:
+    # Boards were stamped with naive wall times of the server, taken as the default zone
+    if connection.dialect.name == "postgresql":
+        data_type = connection.execute(text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'schedule_boards' AND column_name = 'updated_at'"
+        )).scalar()
+        if data_type == "timestamp without time zone":
+            connection.execute(text(
+                f"ALTER TABLE schedule_boards ALTER COLUMN updated_at TYPE TIMESTAMP WITH TIME ZONE "
+                f"USING updated_at AT TIME ZONE '{get_zone().key}'"
+            ))
+        return
+    rows = connection.execute(text(
+        "SELECT chat_id, updated_at FROM schedule_boards WHERE updated_at IS NOT NULL"
+    )).all()
+    if rows:
+        statement = text("UPDATE schedule_boards SET updated_at = :updated_at WHERE chat_id = :chat_id").bindparams(
+            bindparam("updated_at", type_=ScheduleBoard.__table__.c.updated_at.type)
+        )
+        connection.execute(statement, [{"chat_id": row.chat_id, "updated_at": _as_utc(row.updated_at)} for row in rows])
+
+
+@migration(11, "own ids of archived games")
+def _archived_game_ids(connection: Connection) -> None:
+    # Archived games kept the id of their scheduled_games row, which SQLite reuses
+    add_column(connection, "archived_games", "scheduled_game_id", "INTEGER")
+    connection.execute(text("UPDATE archived_games SET scheduled_game_id = id WHERE scheduled_game_id IS NULL"))
+
+
+@migration(12, "search index of games")
+def _game_search(connection: Connection) -> None:
+    """
+    Create the search objects of db/search.py for a games table from before the migration runner.
+
+    They are created with the table, see models.py, so older tables have none. The FTS5
+    table is filled from the existing games.
+    """
+    if connection.dialect.name == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            connection.execute(text(statement))
+    elif sqlite_has_fts5(connection):
+        for statement in SQLITE_SEARCH_DDL:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO games_fts(games_fts) VALUES('rebuild')"))
+
+
+@migration(13, "username prefix index", transactional=False)
+def _username_prefix_index(connection: Connection) -> None:
+    # The pattern operator index is PostgreSQL only, SQLite searches the prefix as a range
+    if connection.dialect.name == "postgresql":
+        create_index(connection, model_index(User.__table__, "ix_users_username_prefix"))
+
+
+@migration(14, "UTC times of events")
+def _event_times(connection: Connection) -> None:
+    # Events were stamped with naive wall times of the default zone
+    if connection.dialect.name == "postgresql":
+        data_type = connection.execute(text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'events' AND column_name = 'timestamp'"
+        )).scalar()
+        if data_type == "timestamp without time zone":
+            connection.execute(text(
+                f"ALTER TABLE events ALTER COLUMN timestamp TYPE TIMESTAMP WITH TIME ZONE "
+                f"USING timestamp AT TIME ZONE '{get_zone().key}'"
+            ))
+        return
+    statement = text("UPDATE events SET timestamp = :timestamp WHERE id = :id").bindparams(
+        bindparam("timestamp", type_=Event.__table__.c.timestamp.type)
+    )
+    # In batches by id, the events table grows with every update the bot handles
+    last_id = 0
+    while rows := connection.execute(text(
+        "SELECT id, timestamp FROM events WHERE id > :last_id AND timestamp IS NOT NULL ORDER BY id LIMIT 10000"
+    ), {"last_id": last_id}).all():
+        connection.execute(statement, [{"id": row.id, "timestamp": _as_utc(row.timestamp)} for row in rows])
+        last_id = rows[-1].id
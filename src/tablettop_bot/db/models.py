@@ -1,7 +1,53 @@
-from sqlalchemy import BigInteger, Boolean, Column, Date, DateTime, ForeignKey, Integer, String, Text, Time
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    TypeDecorator,
+    UniqueConstraint,
+    event,
+    func,
+    text,
+)
 from sqlalchemy.orm import DeclarativeBase, relationship
 
 
+class UTCDateTime(TypeDecorator):
+    """
+    Timestamp stored in UTC and read back as an aware UTC datetime.
+
+    SQLite has no time zone type, so the UTC wall time is stored there and the zone is
+    restored on read. Naive datetimes are rejected instead of being guessed.
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if value.tzinfo is None:
+            raise ValueError(f"Naive datetime {value} for a UTC column")
+        value = value.astimezone(timezone.utc)
+        return value.replace(tzinfo=None) if dialect.name == "sqlite" else value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
 class Base(DeclarativeBase):
     """Base model"""
 
@@ -22,12 +68,25 @@ class User(Base):
     phone_number = Column(String)
     lang = Column(String, default="en")
     role = Column(String, default="user")
+    # IANA time zone for displaying game times, NULL for the default zone
+    timezone = Column(String, nullable=True)
 
     events = relationship("Event", back_populates="user", cascade="all, delete-orphan")
 
 
+# Case-insensitive username lookups and prefix search, see crud.read_user_by_username
+Index("ix_users_username", func.lower(User.username))
+# PostgreSQL serves LIKE 'prefix%' from an index only with the pattern operators under other collations than C
+Index(
+    "ix_users_username_prefix",
+    func.lower(User.username).label("username_lower"),
+    postgresql_ops={"username_lower": "text_pattern_ops"},
+).ddl_if(dialect="postgresql")
+
+
 class Game(Base):
     __tablename__ = 'games'
+    __table_args__ = (Index("ix_games_name_id", "name", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -37,34 +96,308 @@ class Game(Base):
     description = Column(String, nullable=True)
     link = Column(String, nullable=True)
 
+
+def sqlite_has_fts5(bind) -> bool:
+    """Check that the SQLite build supports FTS5 before creating the search index."""
+    if bind.dialect.name != "sqlite":
+        return False
+    return any(option == "ENABLE_FTS5" for (option,) in bind.exec_driver_sql("PRAGMA compile_options"))
+
+
+# Full-text search index over game names and descriptions, see db/search.py
+GAME_SEARCH_DOCUMENT = "coalesce(name, '') || ' ' || coalesce(description, '')"
+
+# Created with the games table, and by a migration for tables that existed before
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_games_search_tsv ON games USING gin (to_tsvector('simple', {GAME_SEARCH_DOCUMENT}))",
+    "CREATE INDEX IF NOT EXISTS ix_games_name_trgm ON games USING gin (lower(name) gin_trgm_ops)",
+]
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5("
+    "name, description, content='games', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS games_fts_ai AFTER INSERT ON games BEGIN "
+    "INSERT INTO games_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS games_fts_ad AFTER DELETE ON games BEGIN "
+    "INSERT INTO games_fts(games_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS games_fts_au AFTER UPDATE ON games BEGIN "
+    "INSERT INTO games_fts(games_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO games_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(Game.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(
+        Game.__table__, "after_create",
+        DDL(statement).execute_if(callable_=lambda ddl, target, bind, **kw: sqlite_has_fts5(bind)),
+    )
+
+event.listen(Game.__table__, "before_drop", DDL("DROP TABLE IF EXISTS games_fts").execute_if(dialect="sqlite"))
+
+
+class GameSeries(Base):
+    """
+    Recurring game. Its occurrences are expanded from the rule when the schedule is read,
+    see db/recurrence.py, and get a scheduled_games row on the first write.
+    """
+
+    __tablename__ = "game_series"
+
+    id = Column(Integer, primary_key=True)
+    game_id = Column(Integer, ForeignKey("games.id"))
+    initiator_id = Column(BigInteger)
+    initiator_name = Column(String)
+    created_at = Column(UTCDateTime)
+    # First occurrence, its wall time in `timezone` is the time of every occurrence
+    dtstart = Column(UTCDateTime, nullable=False, index=True)
+    # IANA zone the rule is expanded in, NULL for the default zone
+    timezone = Column(String, nullable=True)
+    rrule = Column(String, nullable=False, default="FREQ=WEEKLY")
+    # Last local date of the series from UNTIL or COUNT, NULL while it repeats forever
+    ends_on = Column(Date, nullable=True)
+    use_steam = Column(Boolean)
+    server_data = Column(String, nullable=True)
+    server_password = Column(String, nullable=True)
+    discord_telegram_link = Column(String, nullable=True)
+    room = Column(Integer)
+    max_players = Column(Integer, nullable=True)
+
+
+class SeriesException(Base):
+    """Local date on which an occurrence of a series is cancelled"""
+
+    __tablename__ = "series_exceptions"
+    __table_args__ = (UniqueConstraint("series_id", "date", name="uq_series_exceptions_series_date"),)
+
+    id = Column(Integer, primary_key=True)
+    series_id = Column(Integer, ForeignKey("game_series.id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, nullable=False)
+
+
+class SeriesPlayer(Base):
+    """Player of a series, enrolled in every occurrence until they leave one"""
+
+    __tablename__ = "series_players"
+    __table_args__ = (UniqueConstraint("series_id", "user_id", name="uq_series_players_series_user"),)
+
+    id = Column(Integer, primary_key=True)
+    series_id = Column(Integer, ForeignKey("game_series.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(BigInteger, nullable=False)
+    nickname = Column(String)
+    joined_at = Column(UTCDateTime)
+
+
+# Predicate of the partial series_id indexes
+SERIES_ROWS = text("series_id IS NOT NULL")
+
+
 class ScheduledGame(Base):
     __tablename__ = 'scheduled_games'
+    __table_args__ = (
+        Index("ix_scheduled_games_datetime_id", "datetime", "id"),
+        # Games of a host, see crud.get_hosted_games_by_user
+        Index("ix_scheduled_games_initiator_datetime", "initiator_id", "datetime"),
+        # Occurrences of series, partial because most games are one-offs and SQLite's ANALYZE counts the NULLs
+        Index("ix_scheduled_games_series", "series_id", sqlite_where=SERIES_ROWS, postgresql_where=SERIES_ROWS),
+        # One row per occurrence of a series
+        UniqueConstraint("series_id", "datetime", name="uq_scheduled_games_series_datetime"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     game_id = Column(Integer, ForeignKey('games.id'))
-    date = Column(Date)
-    time = Column(Time)
-    datetime = Column(DateTime)
+    # Start of the game in UTC, localized for each user on display, see core/timezones.py
+    datetime = Column(UTCDateTime, nullable=False)
     initiator_id = Column(Integer)
     initiator_name = Column(String)
     use_steam = Column(Boolean)
     server_data = Column(String, nullable=True)
     server_password = Column(String, nullable=True)
     discord_telegram_link = Column(String, nullable=True)
-    player_ids = Column(Text, nullable=True)
-    player_nicknames = Column(Text, nullable=True)
     room = Column(Integer)
-    repweekly = Column(Boolean, default=False)
-    PGID = Column(Integer, nullable=True)
-    GameTree = Column(Text, nullable=True)
-    skipped = Column(Boolean, default=False)
+    series_id = Column(Integer, ForeignKey("game_series.id"), nullable=True)
+    # Seats of this game when the host changed them, otherwise the library game's max_players
+    max_players = Column(Integer, nullable=True)
+
+    @property
+    def key(self) -> str:
+        """Key of the game in callback data, see db/recurrence.py for occurrences without a row."""
+        return str(self.id)
+
+
+class GamePlayer(Base):
+    """Player enrolled in a scheduled game, one row per player and game"""
+
+    __tablename__ = "game_players"
+    __table_args__ = (
+        UniqueConstraint("scheduled_game_id", "user_id", name="uq_game_players_game_user"),
+        # Seat counts and the waitlist queue of a game are range scans of this index
+        Index("ix_game_players_game_status_joined_at", "scheduled_game_id", "status", "joined_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    scheduled_game_id = Column(Integer, ForeignKey("scheduled_games.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(BigInteger, nullable=False, index=True)
+    nickname = Column(String)
+    status = Column(String, nullable=False, default="joined")
+    joined_at = Column(UTCDateTime)
+
+
+class SentReminder(Base):
+    """Reminder already sent to a player, so that restarts never send it again"""
+
+    __tablename__ = "sent_reminders"
+    __table_args__ = (
+        UniqueConstraint("scheduled_game_id", "user_id", "kind", name="uq_sent_reminders_game_user_kind"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    scheduled_game_id = Column(Integer, ForeignKey("scheduled_games.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(BigInteger, nullable=False)
+    kind = Column(String, nullable=False)
+    sent_at = Column(UTCDateTime)
+
+
+class ArchivedGame(Base):
+    """
+    Game that has been played, moved out of scheduled_games by the archive job, see crud/archive.py.
+
+    It has its own id, SQLite hands the id of a deleted scheduled_games row out again, and
+    keeps the one of its scheduled_games row in scheduled_game_id. series_id has no foreign
+    key, so the history outlives deleted series.
+    """
+
+    __tablename__ = "archived_games"
+    __table_args__ = (
+        Index("ix_archived_games_series", "series_id", sqlite_where=SERIES_ROWS, postgresql_where=SERIES_ROWS),
+    )
+
+    id = Column(Integer, primary_key=True)
+    scheduled_game_id = Column(Integer)
+    game_id = Column(Integer, ForeignKey("games.id"))
+    datetime = Column(UTCDateTime, nullable=False, index=True)
+    initiator_id = Column(BigInteger, index=True)
+    initiator_name = Column(String)
+    series_id = Column(Integer, nullable=True)
+    room = Column(Integer)
+    max_players = Column(Integer, nullable=True)
+    archived_at = Column(UTCDateTime)
+
+
+class ArchivedGamePlayer(Base):
+    """Player of an archived game, including the ones still on its waitlist when it was played"""
+
+    __tablename__ = "archived_game_players"
+    __table_args__ = (Index("ix_archived_game_players_game_status", "archived_game_id", "status"),)
+
+    id = Column(Integer, primary_key=True)
+    archived_game_id = Column(Integer, ForeignKey("archived_games.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(BigInteger, nullable=False, index=True)
+    nickname = Column(String)
+    status = Column(String, nullable=False)
+    joined_at = Column(UTCDateTime)
+
+
+class DailyActivity(Base):
+    """User who sent at least one message or callback on a day, rolled up from events, see crud/stats.py"""
+
+    __tablename__ = "daily_activity"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(BigInteger, primary_key=True)
+
+
+class GameRollup(Base):
+    """Seats and players of an archived game, rolled up from the archive tables, see crud/stats.py"""
+
+    __tablename__ = "game_rollups"
+
+    archived_game_id = Column(Integer, primary_key=True)
+    game_id = Column(Integer, index=True)
+    # UTC date the game started on
+    day = Column(Date, nullable=False, index=True)
+    initiator_id = Column(BigInteger)
+    initiator_name = Column(String)
+    # NULL for games without a player limit
+    seats = Column(Integer, nullable=True)
+    min_players = Column(Integer, nullable=True)
+    joined = Column(Integer, nullable=False)
+    waitlisted = Column(Integer, nullable=False)
+
+
+class RollupState(Base):
+    """Progress of an incremental rollup: the last source row it has read and when"""
+
+    __tablename__ = "rollup_state"
+
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(UTCDateTime)
+
+
+class SchemaMigration(Base):
+    """Migration applied to the database, see db/migrations.py"""
+
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String, nullable=False)
+    applied_at = Column(UTCDateTime)
+
+
+class Job(Base):
+    """Background job run by the job runner, see core/jobs.py, kept for the admin /jobs view"""
+
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_created_at", "created_at"),)
+
+    id = Column(Integer, primary_key=True)
+    task = Column(String, nullable=False)
+    queue = Column(String, nullable=False)
+    # Lower runs first within a queue
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    progress_done = Column(Integer, nullable=True)
+    progress_total = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    # Admin who started the job
+    user_id = Column(BigInteger, nullable=True)
+    created_at = Column(UTCDateTime)
+    started_at = Column(UTCDateTime)
+    finished_at = Column(UTCDateTime)
+
+
+class PollingOffset(Base):
+    """Last update the bot handled, polling resumes after it, see api/polling.py"""
+
+    __tablename__ = "polling_offsets"
+
+    bot_id = Column(BigInteger, primary_key=True)
+    update_id = Column(BigInteger, nullable=False)
+    updated_at = Column(UTCDateTime)
+
+
+class ScheduleBoard(Base):
+    """Pinned schedule message kept up to date in a chat"""
+
+    __tablename__ = "schedule_boards"
+
+    chat_id = Column(BigInteger, primary_key=True)
+    message_id = Column(Integer)
+    content_hash = Column(String)
+    updated_at = Column(UTCDateTime)
 
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (Index("ix_events_user_id", "user_id"),)
 
     id = Column(Integer, primary_key=True)
-    timestamp = Column(DateTime)
+    timestamp = Column(UTCDateTime)
     user_id = Column(BigInteger, ForeignKey("users.id"))
     type = Column(String)
     state = Column(String, nullable=True)
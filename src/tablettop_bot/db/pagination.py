@@ -0,0 +1,33 @@
+"""Keyset (seek) pagination helpers."""
+
+from typing import Any, NamedTuple
+
+
+class Page(NamedTuple):
+    """One page of an ordered list. Cursors are the ids, or keys, of its first and last items."""
+
+    items: list[Any]
+    has_prev: bool
+    has_next: bool
+
+    @property
+    def first_id(self):
+        return self.items[0].id if self.items else None
+
+    @property
+    def last_id(self):
+        return self.items[-1].id if self.items else None
+
+    @property
+    def first_key(self):
+        return self.items[0].key if self.items else None
+
+    @property
+    def last_key(self):
+        return self.items[-1].key if self.items else None
+
+
+def slice_page(items: list, start: int, stop: int) -> Page:
+    """Cut a page out of a list that is already in memory."""
+    start, stop = max(start, 0), min(stop, len(items))
+    return Page(items[start:stop], start > 0, stop < len(items))
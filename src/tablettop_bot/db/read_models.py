@@ -0,0 +1,103 @@
+"""
+Read-only rows of the hot read paths: the board, the game library, my games and the user middleware.
+
+They are named tuples built from Core `select()` rows, with no identity map, change
+tracking or session attached, so they are cheap to build and safe to cache and share
+between threads. Writes go through the ORM models in models.py.
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import Select, select
+
+
+class UserRow(NamedTuple):
+    """User as the handlers see it, set by the user middleware"""
+
+    id: int
+    username: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    lang: Optional[str]
+    role: Optional[str]
+    timezone: Optional[str]
+
+
+class GameRow(NamedTuple):
+    """Game of the library, see db/catalog.py"""
+
+    id: int
+    name: str
+    online: Optional[bool]
+    min_players: Optional[int]
+    max_players: Optional[int]
+    description: Optional[str]
+    link: Optional[str]
+
+
+class SeriesRow(NamedTuple):
+    """Series the schedule expands occurrences from"""
+
+    id: int
+    game_id: int
+    initiator_id: int
+    initiator_name: Optional[str]
+    dtstart: datetime
+    timezone: Optional[str]
+    rrule: str
+    use_steam: Optional[bool]
+    server_data: Optional[str]
+    server_password: Optional[str]
+    discord_telegram_link: Optional[str]
+    room: Optional[int]
+    max_players: Optional[int]
+
+
+class ScheduledGameRow(NamedTuple):
+    """Scheduled game of the board and my games, it has the attributes of ScheduledGame that they show"""
+
+    id: int
+    game_id: int
+    datetime: datetime
+    initiator_id: int
+    initiator_name: Optional[str]
+    use_steam: Optional[bool]
+    server_data: Optional[str]
+    server_password: Optional[str]
+    discord_telegram_link: Optional[str]
+    room: Optional[int]
+    series_id: Optional[int]
+    max_players: Optional[int]
+    # (user_id, nickname) of the joined players in join order, read from game_players by crud
+    players: tuple = ()
+
+    @property
+    def key(self) -> str:
+        """Key of the game in callback data, like ScheduledGame.key."""
+        return str(self.id)
+
+
+class JobRow(NamedTuple):
+    """Background job as the admin /jobs view shows it"""
+
+    id: int
+    task: str
+    queue: str
+    status: str
+    attempts: int
+    max_attempts: int
+    progress_done: Optional[int]
+    progress_total: Optional[int]
+    error: Optional[str]
+    created_at: datetime
+
+
+def select_rows(row_type: type[NamedTuple], model) -> Select:
+    """Select the columns of `model` named by the fields of `row_type` without defaults, in field order."""
+    return select(*(getattr(model, field) for field in row_type._fields if field not in row_type._field_defaults))
+
+
+def read_rows(db, row_type: type[NamedTuple], statement: Select) -> list:
+    """Execute a `select_rows` statement and build a `row_type` from every row, fields with defaults keep them."""
+    return [row_type(*row) for row in db.execute(statement)]
@@ -0,0 +1,145 @@
+"""RRULE-style recurrence of game series and lazy expansion of their occurrences."""
+
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+
+class Rule(NamedTuple):
+    """Weekly recurrence rule, a subset of RFC 5545 RRULE"""
+
+    interval: int = 1
+    weekdays: tuple[int, ...] = ()
+    until: Optional[date] = None
+    count: Optional[int] = None
+
+
+def parse_rrule(text: str) -> Rule:
+    """
+    Parse a weekly RRULE such as `FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH;UNTIL=20301231;COUNT=10`.
+
+    Raises:
+        ValueError: If the rule is not a weekly rule or a part can not be parsed.
+    """
+    parts = dict(part.split("=", 1) for part in text.upper().removeprefix("RRULE:").split(";") if part)
+    if parts.pop("FREQ", "WEEKLY") != "WEEKLY":
+        raise ValueError(f"Only weekly rules are supported: {text}")
+    rule = Rule(
+        interval=int(parts.pop("INTERVAL", 1)),
+        weekdays=tuple(sorted(WEEKDAYS.index(day) for day in parts.pop("BYDAY").split(","))) if "BYDAY" in parts else (),
+        until=datetime.strptime(parts.pop("UNTIL")[:8], "%Y%m%d").date() if "UNTIL" in parts else None,
+        count=int(parts.pop("COUNT")) if "COUNT" in parts else None,
+    )
+    if parts or rule.interval < 1 or (rule.count is not None and rule.count < 1):
+        raise ValueError(f"Unsupported recurrence rule: {text}")
+    return rule
+
+
+def format_rrule(rule: Rule) -> str:
+    """Format a rule as an RRULE string."""
+    parts = ["FREQ=WEEKLY"]
+    if rule.interval != 1:
+        parts.append(f"INTERVAL={rule.interval}")
+    if rule.weekdays:
+        parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in rule.weekdays))
+    if rule.until:
+        parts.append(f"UNTIL={rule.until:%Y%m%d}")
+    if rule.count:
+        parts.append(f"COUNT={rule.count}")
+    return ";".join(parts)
+
+
+def expand(dtstart: datetime, rule: Rule, start: date, end: date, exceptions=()) -> list[date]:
+    """
+    Return the dates of the occurrences between `start` and `end`, both included, with
+    `dtstart` and the dates in the time zone of the series.
+
+    Only the days of the window are generated, whatever the age of the series. The ordinal
+    of each day, needed for COUNT, is computed arithmetically from the week number.
+    Exception dates are removed but, as with RFC 5545 EXDATE, still count towards COUNT.
+    """
+    first = dtstart.date()
+    weekdays = np.array(rule.weekdays or (first.weekday(),))
+    last = min(end, rule.until) if rule.until else end
+    window_start = max(start, first)
+    if window_start > last:
+        return []
+
+    days = np.arange(np.datetime64(window_start, "D"), np.datetime64(last, "D") + 1)
+    week_start = np.datetime64(first - timedelta(days=first.weekday()), "D")
+    offsets = (days - week_start).astype(int)
+    weeks, day_of_week = offsets // 7, offsets % 7
+    mask = (weeks % rule.interval == 0) & np.isin(day_of_week, weekdays)
+
+    if rule.count:
+        # Occurrences before this one: full periods, earlier weekdays of this week, minus days before dtstart
+        rank = np.searchsorted(np.sort(weekdays), day_of_week)
+        skipped_in_first_week = np.count_nonzero(weekdays < first.weekday())
+        ordinal = (weeks // rule.interval) * len(weekdays) + rank - skipped_in_first_week
+        mask &= ordinal < rule.count
+    if len(exceptions):
+        mask &= ~np.isin(days, np.array(list(exceptions), dtype="datetime64[D]"))
+
+    return days[mask].astype(date).tolist()
+
+
+def is_occurrence(dtstart: datetime, rule: Rule, day: date, exceptions=()) -> bool:
+    """Check that a date is an occurrence of the rule."""
+    return expand(dtstart, rule, day, day, exceptions) == [day]
+
+
+class VirtualOccurrence:
+    """
+    Occurrence of a series that has no scheduled_games row yet.
+
+    It has the attributes of ScheduledGame that the schedule uses. A row is created on the
+    first write, see crud.materialize_occurrence.
+    """
+
+    __slots__ = (
+        "series_id", "day", "game_id", "datetime", "initiator_id", "initiator_name", "use_steam",
+        "server_data", "server_password", "discord_telegram_link", "room", "max_players", "players",
+    )
+
+    id = None
+
+    def __init__(self, series, day: date, start: datetime, players: tuple = ()):
+        self.series_id = series.id
+        # Date in the time zone of the series, the start is in UTC
+        self.day = day
+        self.game_id = series.game_id
+        self.datetime = start
+        self.initiator_id = series.initiator_id
+        self.initiator_name = series.initiator_name
+        self.use_steam = series.use_steam
+        self.server_data = series.server_data
+        self.server_password = series.server_password
+        self.discord_telegram_link = series.discord_telegram_link
+        self.room = series.room
+        self.max_players = series.max_players
+        # (user_id, nickname) of the players of the series, like ScheduledGameRow.players
+        self.players = players
+
+    @property
+    def key(self) -> str:
+        return occurrence_key(self.series_id, self.day)
+
+
+def occurrence_key(series_id: int, day: date) -> str:
+    """Key of a series occurrence in callback data, `<series_id>.<yyyymmdd>` with the local date."""
+    return f"{series_id}.{day:%Y%m%d}"
+
+
+def parse_occurrence_key(key: str) -> tuple[Optional[int], Optional[int], Optional[date]]:
+    """
+    Split a key into (scheduled_game_id, series_id, date).
+
+    A plain number is the id of a scheduled_games row, see ScheduledGame.key.
+    """
+    if "." not in key:
+        return int(key), None, None
+    series_id, day = key.split(".", 1)
+    return None, int(series_id), datetime.strptime(day, "%Y%m%d").date()
@@ -0,0 +1,198 @@
+"""Ranked, prefix- and typo-tolerant search over the game library."""
+
+import logging
+import re
+import threading
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from . import database
+from .catalog import catalog
+from .database import get_session
+from .models import GAME_SEARCH_DOCUMENT
+from .read_models import GameRow
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+NAME_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.3
+PREFIX_SCORE = 0.9
+FUZZY_WEIGHT = 0.8
+FUZZY_THRESHOLD = 0.45
+
+
+def tokenize(value: Optional[str]) -> list[str]:
+    """Split text into lowercase words, folding `ё` into `е`."""
+    if not value:
+        return []
+    return _WORD.findall(value.casefold().replace("ё", "е"))
+
+
+def trigrams(token: str) -> set[str]:
+    """Return the padded character trigrams of a word."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NgramIndex:
+    """In-memory trigram index over game names and descriptions."""
+
+    def __init__(self, games: list[GameRow]):
+        self._games = {game.id: game for game in games}
+        self._order = {game.id: position for position, game in enumerate(games)}
+        self._postings: dict[str, dict[int, float]] = defaultdict(dict)
+        self._token_trigrams: dict[str, set[str]] = {}
+        self._trigram_tokens: dict[str, set[str]] = defaultdict(set)
+
+        for game in games:
+            for weight, field in ((DESCRIPTION_WEIGHT, game.description), (NAME_WEIGHT, game.name)):
+                for token in tokenize(field):
+                    postings = self._postings[token]
+                    postings[game.id] = max(postings.get(game.id, 0.0), weight)
+
+        for token in self._postings:
+            self._token_trigrams[token] = trigrams(token)
+            for trigram in self._token_trigrams[token]:
+                self._trigram_tokens[trigram].add(token)
+
+    def _similar_tokens(self, token: str) -> list[tuple[str, float]]:
+        """Find indexed words equal to, starting with or resembling the query word."""
+        query_trigrams = trigrams(token)
+        candidates = set().union(*(self._trigram_tokens.get(trigram, ()) for trigram in query_trigrams))
+
+        similar = []
+        for candidate in candidates:
+            if candidate == token:
+                similar.append((candidate, 1.0))
+            elif candidate.startswith(token):
+                similar.append((candidate, PREFIX_SCORE))
+            else:
+                candidate_trigrams = self._token_trigrams[candidate]
+                dice = 2 * len(query_trigrams & candidate_trigrams) / (len(query_trigrams) + len(candidate_trigrams))
+                if dice >= FUZZY_THRESHOLD:
+                    similar.append((candidate, FUZZY_WEIGHT * dice))
+        return similar
+
+    def search(self, query: str, limit: int = 10) -> list[GameRow]:
+        """Return the best matching games, best first."""
+        scores: dict[int, float] = defaultdict(float)
+        for token in tokenize(query):
+            best: dict[int, float] = {}
+            for candidate, similarity in self._similar_tokens(token):
+                for game_id, weight in self._postings[candidate].items():
+                    best[game_id] = max(best.get(game_id, 0.0), similarity * weight)
+            for game_id, score in best.items():
+                scores[game_id] += score
+
+        ranked = sorted(scores, key=lambda game_id: (-scores[game_id], self._order[game_id]))
+        return [self._games[game_id] for game_id in ranked[:limit]]
+
+
+class NgramSearchBackend:
+    """Search the cached catalog with an in-memory trigram index."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Optional[NgramIndex] = None
+        self._version = -1
+
+    def _get_index(self) -> NgramIndex:
+        games = catalog.all()
+        with self._lock:
+            if self._index is None or self._version != catalog.version:
+                self._index = NgramIndex(games)
+                self._version = catalog.version
+            return self._index
+
+    def search(self, query: str, limit: int = 10) -> list[GameRow]:
+        return self._get_index().search(query, limit)
+
+
+class SqliteFtsSearchBackend:
+    """Search the SQLite FTS5 `games_fts` table, with the trigram index for typos."""
+
+    def __init__(self, fallback: NgramSearchBackend):
+        self.fallback = fallback
+
+    def search(self, query: str, limit: int = 10) -> list[GameRow]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        match = " ".join(f'"{token}"*' for token in tokens)
+        db: Session = get_session()
+        try:
+            game_ids = db.execute(
+                text(
+                    "SELECT rowid FROM games_fts WHERE games_fts MATCH :match "
+                    "ORDER BY bm25(games_fts, 10.0, 1.0) LIMIT :limit"
+                ),
+                {"match": match, "limit": limit},
+            ).scalars().all()
+        except DBAPIError as e:
+            logger.warning(f"SQLite full-text search failed, using the trigram index: {e}")
+            game_ids = []
+        finally:
+            db.close()
+
+        games = [game for game in map(catalog.get, game_ids) if game is not None]
+        return games or self.fallback.search(query, limit)
+
+
+class PostgresSearchBackend:
+    """Search with PostgreSQL `tsvector` prefix matching ranked together with `pg_trgm` similarity."""
+
+    def __init__(self, fallback: NgramSearchBackend):
+        self.fallback = fallback
+
+    def search(self, query: str, limit: int = 10) -> list[GameRow]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        document = f"to_tsvector('simple', {GAME_SEARCH_DOCUMENT})"
+        db: Session = get_session()
+        try:
+            game_ids = db.execute(
+                text(
+                    f"SELECT id FROM games "
+                    f"WHERE {document} @@ to_tsquery('simple', :tsquery) OR lower(name) % :query "
+                    f"ORDER BY 2 * ts_rank({document}, to_tsquery('simple', :tsquery)) "
+                    f"+ similarity(lower(name), :query) DESC, name "
+                    f"LIMIT :limit"
+                ),
+                {"tsquery": " & ".join(f"{token}:*" for token in tokens), "query": " ".join(tokens), "limit": limit},
+            ).scalars().all()
+        except DBAPIError as e:
+            # pg_trgm or the search indexes are missing
+            logger.warning(f"PostgreSQL full-text search failed, using the trigram index: {e}")
+            return self.fallback.search(query, limit)
+        finally:
+            db.close()
+
+        return [game for game in map(catalog.get, game_ids) if game is not None]
+
+
+_ngram_backend = NgramSearchBackend()
+
+
+def get_search_backend():
+    """Pick the search backend matching the configured database."""
+    if database.DATABASE_URL.startswith("postgresql"):
+        return PostgresSearchBackend(_ngram_backend)
+    if database.DATABASE_URL.startswith("sqlite"):
+        return SqliteFtsSearchBackend(_ngram_backend)
+    return _ngram_backend
+
+
+def search_games(query: str, limit: int = 10) -> list[GameRow]:
+    """Search the game library by name and description, best matches first."""
+    return get_search_backend().search(query, limit)
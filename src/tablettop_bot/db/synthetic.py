@@ -0,0 +1,416 @@
+"""
+Deterministic synthetic data for scale tests, benchmarks and query plan checks.
+
+The same seed, scale and `now` always produce the same rows. Rows are generated with
+NumPy in chunks and written with executemany, or COPY on PostgreSQL, one transaction
+per chunk, so 10M events never sit in memory at once.
+
+CLI, from the repository root: `PYTHONPATH=src python -m tablettop_bot.db.synthetic --scale 100k --seed 0`
+"""
+
+import argparse
+import csv
+import io
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import Engine, Table, func, select, text
+
+from tablettop_bot.core.timezones import UTC, get_zone, utcnow
+
+from . import database
+from .catalog import catalog
+from .crud.games import PlayerStatus, get_series_end
+from .models import (
+    ArchivedGame,
+    ArchivedGamePlayer,
+    Event,
+    Game,
+    GamePlayer,
+    GameSeries,
+    ScheduledGame,
+    SeriesPlayer,
+    User,
+)
+from .recurrence import parse_rrule
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Scale(NamedTuple):
+    """Number of rows generated per entity"""
+
+    users: int
+    games: int
+    series: int
+    # Upcoming one-off games, the first occurrence of every series gets a row as well
+    scheduled_games: int
+    archived_games: int
+    events: int
+
+
+SCALES = {
+    "1k": Scale(users=1_000, games=100, series=20, scheduled_games=200, archived_games=500, events=1_000),
+    "100k": Scale(users=10_000, games=1_000, series=200, scheduled_games=2_000, archived_games=20_000, events=100_000),
+    "1m": Scale(users=100_000, games=3_000, series=1_000, scheduled_games=10_000, archived_games=200_000,
+                events=1_000_000),
+    "10m": Scale(users=1_000_000, games=10_000, series=5_000, scheduled_games=50_000, archived_games=2_000_000,
+                 events=10_000_000),
+}
+
+CHUNK_SIZE = 50_000
+ROOMS = 20
+
+FIRST_NAMES = ["Анна", "Борис", "Вера", "Глеб", "Дарья", "Егор", "Жанна", "Илья", "Ксения", "Лев", "Мария", "Никита"]
+TIMEZONES = [None, "Europe/Moscow", "Europe/Berlin", "Asia/Yekaterinburg", "Asia/Novosibirsk", "America/New_York"]
+TIMEZONE_WEIGHTS = [0.7, 0.1, 0.05, 0.05, 0.05, 0.05]
+GAME_WORDS = ["Ужас", "Аркхэма", "Каркассон", "Особняки", "Безумия", "Эволюция", "Грани", "Вселенной", "Колонизаторы",
+              "Древний", "Ужас", "Мрачная", "Гавань", "Сквозь", "Века", "Кланы", "Каледонии", "Война", "Кольца"]
+RRULES = ["FREQ=WEEKLY", "FREQ=WEEKLY;INTERVAL=2", "FREQ=WEEKLY;COUNT=8"]
+EVENT_CONTENTS = {
+    "message": ["/start", "/join_game", "/host_game", "/library", "/find", "/timezone", "Каркассон"],
+    "callback": ["enroll", "my_games", "update_schedule", "back_to_main", "enroll_game_1", "select_game_1"],
+}
+
+
+class Generated(NamedTuple):
+    """Ids and row counts of one generator run"""
+
+    users: range
+    games: range
+    series: range
+    scheduled_games: range
+    archived_games: range
+    rows: dict[str, int]
+
+
+def _next_id(engine: Engine, *columns) -> int:
+    with engine.connect() as connection:
+        return max(connection.scalar(select(func.coalesce(func.max(column), 0))) for column in columns) + 1
+
+
+def _copy(connection, table: Table, rows: list[dict]) -> None:
+    """Write rows with COPY ... FROM STDIN, PostgreSQL only."""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row[column] is None else row[column] for column in columns])
+    buffer.seek(0)
+    cursor = connection.connection.dbapi_connection.cursor()
+    cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def bulk_insert(engine: Engine, table: Table, rows: list[dict]) -> int:
+    """Insert rows in one transaction, with COPY on PostgreSQL. Return the number of rows."""
+    if not rows:
+        return 0
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            _copy(connection, table, rows)
+        else:
+            connection.execute(table.insert(), rows)
+    return len(rows)
+
+
+def _chunks(total: int, chunk_size: int):
+    for start in range(0, total, chunk_size):
+        yield start, min(start + chunk_size, total)
+
+
+def _half_hours(rng: np.random.Generator, start: datetime, n_half_hours: int, size: int) -> list[datetime]:
+    """Random starts on the half hour grid after `start`."""
+    return [start + timedelta(minutes=30 * int(step)) for step in rng.integers(0, n_half_hours, size)]
+
+
+def _players(
+    rng: np.random.Generator, game_ids: np.ndarray, hosts: np.ndarray, seats: np.ndarray, users: range,
+    created: list[datetime],
+) -> dict[str, np.ndarray]:
+    """
+    Players of games: the host joins first, then up to two more players than there are seats.
+
+    Players past the seats are waitlisted, every user appears once per game and players
+    join in seat order.
+    """
+    extra = rng.integers(0, seats + 2)
+    game_index = np.repeat(np.arange(len(game_ids)), extra + 1)
+    user_ids = rng.integers(users.start, users.stop, len(game_index))
+    # The first player of every game is its host
+    firsts = np.concatenate([[0], np.cumsum(extra + 1)[:-1]])
+    user_ids[firsts] = hosts
+    # Keep the first row of every (game, user) pair, so the host always stays
+    keep = np.zeros(len(game_index), dtype=bool)
+    keep[np.unique(game_index * users.stop + user_ids, return_index=True)[1]] = True
+    game_index, user_ids = game_index[keep], user_ids[keep]
+    positions = np.arange(len(game_index)) - np.searchsorted(game_index, game_index)
+    minutes = positions * 10 + rng.integers(0, 10, len(game_index)) * (positions > 0)
+    return {
+        "game_id": game_ids[game_index],
+        "user_id": user_ids,
+        "joined": positions < seats[game_index],
+        "joined_at": [created[i] + timedelta(minutes=int(m)) for i, m in zip(game_index, minutes)],
+    }
+
+
+def _player_rows(players: dict[str, np.ndarray], game_column: str) -> list[dict]:
+    return [
+        {
+            game_column: int(game_id),
+            "user_id": int(user_id),
+            "nickname": f"player{user_id}",
+            "status": (PlayerStatus.JOINED if joined else PlayerStatus.WAITLISTED).value,
+            "joined_at": joined_at,
+        }
+        for game_id, user_id, joined, joined_at in zip(
+            players["game_id"], players["user_id"], players["joined"], players["joined_at"]
+        )
+    ]
+
+
+def generate(
+    scale: Scale, seed: int = 0, engine: Optional[Engine] = None, now: Optional[datetime] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Generated:
+    """
+    Add synthetic users, games, series, scheduled and archived games with their players, and events.
+
+    Ids continue after the rows already in the database, so a generated dataset can be added
+    to an existing one. Archived games get lower ids than upcoming ones, as if they had been
+    scheduled first.
+
+    Args:
+        scale: Rows per entity.
+        seed: Seed of the random generator.
+        engine: Target database, the app database by default.
+        now: Time the dataset is generated around, the current hour by default.
+        chunk_size: Rows per insert transaction.
+    """
+    engine = engine or database.get_engine()
+    now = (now or utcnow().replace(minute=0, second=0, microsecond=0)).astimezone(UTC)
+    rng = np.random.default_rng(seed)
+    rows: dict[str, int] = {}
+
+    # Users
+    first_user_id = _next_id(engine, User.id)
+    users = range(first_user_id, first_user_id + scale.users)
+    for start, stop in _chunks(scale.users, chunk_size):
+        n = stop - start
+        first_seen = rng.integers(0, 365 * 24 * 60, n)
+        zones = rng.choice(len(TIMEZONES), n, p=TIMEZONE_WEIGHTS)
+        names = rng.integers(0, len(FIRST_NAMES), n)
+        has_username = rng.random(n) < 0.9
+        naive_now = now.replace(tzinfo=None)
+        rows["users"] = rows.get("users", 0) + bulk_insert(engine, User.__table__, [
+            {
+                "id": users[start + i],
+                "username": f"player{users[start + i]}" if has_username[i] else None,
+                "first_name": FIRST_NAMES[names[i]],
+                "last_name": None,
+                "phone_number": None,
+                "first_message_timestamp": naive_now - timedelta(minutes=int(first_seen[i])),
+                "last_message_timestamp": naive_now - timedelta(minutes=int(first_seen[i]) // 2),
+                "lang": "ru",
+                "role": "user",
+                "timezone": TIMEZONES[zones[i]],
+            }
+            for i in range(n)
+        ])
+
+    # Games
+    first_library_id = _next_id(engine, Game.id)
+    games = range(first_library_id, first_library_id + scale.games)
+    min_players = rng.integers(1, 4, scale.games)
+    max_players = min_players + rng.integers(0, 7, scale.games)
+    words = rng.integers(0, len(GAME_WORDS), (scale.games, 2))
+    online = rng.random(scale.games) < 0.5
+    rows["games"] = bulk_insert(engine, Game.__table__, [
+        {
+            "id": games[i],
+            "name": f"{GAME_WORDS[words[i, 0]]} {GAME_WORDS[words[i, 1]]} {i}",
+            "online": bool(online[i]),
+            "min_players": int(min_players[i]),
+            "max_players": int(max_players[i]),
+            "description": f"Игра {GAME_WORDS[words[i, 1]].lower()} для {min_players[i]}–{max_players[i]} игроков",
+            "link": f"https://boardgamegeek.com/boardgame/{100000 + i}" if online[i] else None,
+        }
+        for i in range(scale.games)
+    ])
+
+    # Series, their first occurrences get scheduled_games rows below
+    first_series_id = _next_id(engine, GameSeries.id)
+    series = range(first_series_id, first_series_id + scale.series)
+    series_games = rng.integers(0, scale.games, scale.series)
+    series_hosts = rng.integers(users.start, users.stop, scale.series)
+    series_starts = _half_hours(rng, now + timedelta(hours=1), 7 * 48, scale.series)
+    series_rules = [RRULES[i] for i in rng.integers(0, len(RRULES), scale.series)]
+    series_rooms = rng.integers(1, ROOMS + 1, scale.series)
+    rows["game_series"] = bulk_insert(engine, GameSeries.__table__, [
+        {
+            "id": series[i],
+            "game_id": games[series_games[i]],
+            "initiator_id": int(series_hosts[i]),
+            "initiator_name": f"player{series_hosts[i]}",
+            "created_at": now - timedelta(days=1),
+            "dtstart": series_starts[i],
+            "timezone": None,
+            "rrule": series_rules[i],
+            "ends_on": get_series_end(series_starts[i].astimezone(get_zone()), parse_rrule(series_rules[i])),
+            "use_steam": False,
+            "server_data": None,
+            "server_password": None,
+            "discord_telegram_link": None,
+            "room": int(series_rooms[i]),
+            "max_players": None,
+        }
+        for i in range(scale.series)
+    ])
+
+    # Archived games take the ids before the upcoming ones
+    first_game_id = _next_id(engine, ScheduledGame.id, ArchivedGame.id)
+    archived = range(first_game_id, first_game_id + scale.archived_games)
+    scheduled = range(archived.stop, archived.stop + scale.series + scale.scheduled_games)
+
+    for start, stop in _chunks(scale.archived_games, chunk_size):
+        n = stop - start
+        game_index = rng.integers(0, scale.games, n)
+        hosts = rng.integers(users.start, users.stop, n)
+        starts = sorted(_half_hours(rng, now - timedelta(days=365), 365 * 48 - 2, n))
+        ids = np.arange(archived[start], archived[start] + n)
+        rooms = rng.integers(1, ROOMS + 1, n)
+        rows["archived_games"] = rows.get("archived_games", 0) + bulk_insert(engine, ArchivedGame.__table__, [
+            {
+                "id": int(ids[i]),
+                "scheduled_game_id": int(ids[i]),
+                "game_id": games[game_index[i]],
+                "datetime": starts[i],
+                "initiator_id": int(hosts[i]),
+                "initiator_name": f"player{hosts[i]}",
+                "series_id": None,
+                "room": int(rooms[i]),
+                "max_players": None,
+                "archived_at": starts[i] + timedelta(hours=1),
+            }
+            for i in range(n)
+        ])
+        players = _players(rng, ids, hosts, max_players[game_index], users, [s - timedelta(days=3) for s in starts])
+        rows["archived_game_players"] = rows.get("archived_game_players", 0) + bulk_insert(
+            engine, ArchivedGamePlayer.__table__, _player_rows(players, "archived_game_id")
+        )
+
+    # Upcoming games: the first occurrence of every series, then one-offs over the next two weeks
+    n = len(scheduled)
+    game_index = np.concatenate([series_games, rng.integers(0, scale.games, scale.scheduled_games)]).astype(int)
+    hosts = np.concatenate([series_hosts, rng.integers(users.start, users.stop, scale.scheduled_games)])
+    starts = series_starts + _half_hours(rng, now + timedelta(hours=1), 14 * 48, scale.scheduled_games)
+    rooms = np.concatenate([series_rooms, rng.integers(1, ROOMS + 1, scale.scheduled_games)])
+    ids = np.arange(scheduled.start, scheduled.stop)
+    rows["scheduled_games"] = 0
+    rows["game_players"] = 0
+    rows["series_players"] = 0
+    for start, stop in _chunks(n, chunk_size):
+        rows["scheduled_games"] += bulk_insert(engine, ScheduledGame.__table__, [
+            {
+                "id": int(ids[i]),
+                "game_id": games[game_index[i]],
+                "datetime": starts[i],
+                "initiator_id": int(hosts[i]),
+                "initiator_name": f"player{hosts[i]}",
+                "use_steam": False,
+                "server_data": None,
+                "server_password": None,
+                "discord_telegram_link": None,
+                "room": int(rooms[i]),
+                "series_id": series[i] if i < scale.series else None,
+                "max_players": None,
+            }
+            for i in range(start, stop)
+        ])
+        players = _players(
+            rng, ids[start:stop], hosts[start:stop], max_players[game_index[start:stop]], users,
+            [now - timedelta(days=1)] * (stop - start),
+        )
+        rows["game_players"] += bulk_insert(engine, GamePlayer.__table__, _player_rows(players, "scheduled_game_id"))
+        # The joined players of a first occurrence are the players of its series
+        rows["series_players"] += bulk_insert(engine, SeriesPlayer.__table__, [
+            {
+                "series_id": series[int(game_id) - scheduled.start],
+                "user_id": int(user_id),
+                "nickname": f"player{user_id}",
+                "joined_at": joined_at,
+            }
+            for game_id, user_id, joined, joined_at in zip(
+                players["game_id"], players["user_id"], players["joined"], players["joined_at"]
+            )
+            if joined and game_id < scheduled.start + scale.series
+        ])
+
+    # Events in time order over the last 90 days, a few users send most of them
+    first_event_id = _next_id(engine, Event.id)
+    span = 90 * 24 * 3600
+    rows["events"] = 0
+    for start, stop in _chunks(scale.events, chunk_size):
+        n = stop - start
+        seconds = np.sort(rng.integers(span * start // scale.events, span * stop // scale.events + 1, n))
+        event_users = users.start + (rng.zipf(1.5, n) - 1) % scale.users
+        callbacks = rng.random(n) < 0.6
+        contents = rng.integers(0, 100, n)
+        event_types = np.where(callbacks, "callback", "message")
+        rows["events"] += bulk_insert(engine, Event.__table__, [
+            {
+                "id": first_event_id + start + i,
+                "timestamp": now - timedelta(seconds=span - int(seconds[i])),
+                "user_id": int(event_users[i]),
+                "type": str(event_types[i]),
+                "state": None,
+                "content_type": "text",
+                "content": EVENT_CONTENTS[event_types[i]][contents[i] % len(EVENT_CONTENTS[event_types[i]])],
+            }
+            for i in range(n)
+        ])
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as connection:
+            for table in ("users", "games", "game_series", "scheduled_games", "game_players", "series_players",
+                          "archived_game_players", "events"):
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+                ))
+            connection.execute(text("ANALYZE"))
+    catalog.invalidate()
+
+    return Generated(users, games, series, scheduled, archived, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the database with deterministic synthetic data.")
+    parser.add_argument("--scale", choices=list(SCALES), default="1k")
+    for field in Scale._fields:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, help=f"override the {field} of the scale")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--now", type=datetime.fromisoformat, help="aware ISO time the data is generated around")
+    parser.add_argument("--url", help="database URL, the app database by default")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.url:
+        database.DATABASE_URL = args.url
+    scale = SCALES[args.scale]._replace(**{
+        field: getattr(args, field) for field in Scale._fields if getattr(args, field) is not None
+    })
+    database.create_tables()
+
+    started = time.perf_counter()
+    generated = generate(scale, args.seed, now=args.now, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - started
+    for table, count in generated.rows.items():
+        logger.info(f"{table}: {count} rows")
+    logger.info(f"Generated {sum(generated.rows.values())} rows in {elapsed:.1f} seconds")
+
+
+if __name__ == "__main__":
+    main()
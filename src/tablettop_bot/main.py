@@ -1,14 +1,15 @@
 import logging
 import os
 import threading
-from time import sleep
 
 import schedule as sc
 from dotenv import find_dotenv, load_dotenv
 
 from tablettop_bot.api.bot import start_bot
+from tablettop_bot.core.lifecycle import lifecycle
 from tablettop_bot.db import crud
-from tablettop_bot.db.database import create_tables, drop_tables, init_games_table
+from tablettop_bot.db.database import get_engine, init_games_table
+from tablettop_bot.db.migrations import migrate
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,9 +21,9 @@ ADMIN_USER_ID = os.getenv("ADMIN_USER_ID")
 
 
 def init_db():
-    """Initialize the database."""
-    # Create tables
-    create_tables()
+    """Apply the pending migrations and seed the database, existing data is kept."""
+    migrate(get_engine())
+    init_games_table()
 
     # Add admin to user table
     if ADMIN_USERNAME:
@@ -32,20 +33,18 @@ def init_db():
     logger.info("Database initialized")
 
 
-sc.every().day.at("23:05").do(crud.prolong)
-
-# Function to run the scheduled tasks in a loop
+# Function to run the scheduled tasks in a loop until the shutdown starts
 def run_scheduled_tasks():
     print("def run_scheduled_tasks():")
-    while True:
+    while not lifecycle.stopping.wait(1):  # Wait for a second before checking again
         sc.run_pending()
-        sleep(1)  # Wait for a second before checking again
 
 if __name__ == "__main__":
-    drop_tables()
     init_db()
-    init_games_table()
-    bot_thread = threading.Thread(target=start_bot)
+    lifecycle.install_signal_handlers()
+    # The shutdown below stops the polling without joining it, the thread must not keep the process alive
+    bot_thread = threading.Thread(target=start_bot, daemon=True)
     bot_thread.start()
 
     run_scheduled_tasks()
+    lifecycle.shutdown()
@@ -0,0 +1,100 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+import requests
+from telebot.apihelper import ApiTelegramException
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from tablettop_bot.api.outbound import OutboundQueue
+
+
+class StubBot:
+    def __init__(self, rate_limited_calls=0):
+        self.calls = []
+        self.rate_limited_calls = rate_limited_calls
+        self.release = threading.Event()
+        self.release.set()
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.release.wait(5)
+        if self.rate_limited_calls:
+            self.rate_limited_calls -= 1
+            raise ApiTelegramException(
+                "sendMessage", None,
+                {"error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 0}},
+            )
+        self.calls.append(("send_message", chat_id, text))
+        return SimpleNamespace(message_id=len(self.calls))
+
+    def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        self.calls.append(("edit_message_text", chat_id, text))
+
+    def answer_callback_query(self, callback_query_id, text=None, **kwargs):
+        self.calls.append(("answer_callback_query", None, text))
+
+
+def test_call_retries_after_rate_limit():
+    # Arrange
+    bot = StubBot(rate_limited_calls=2)
+    outbound = OutboundQueue(max_retries=3)
+
+    # Act
+    message = outbound.call(bot, "send_message", 1, "hello")
+
+    # Assert
+    assert message.message_id == 1
+    assert bot.calls == [("send_message", 1, "hello")]
+
+
+def test_network_errors_are_retried_only_before_sending():
+    # Arrange
+    bot = StubBot()
+    unsent = requests.exceptions.ConnectionError(MaxRetryError(None, "/", NewConnectionError(None, "refused")))
+    errors = [unsent, requests.exceptions.ReadTimeout("read timed out")]
+
+    def send_message(chat_id, text, **kwargs):
+        bot.calls.append(("send_message", chat_id, text))
+        raise errors.pop(0)
+
+    bot.send_message = send_message
+    outbound = OutboundQueue(max_retries=3)
+
+    # Act
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        outbound.call(bot, "send_message", 1, "hello")
+
+    # Assert
+    assert len(bot.calls) == 2
+
+
+def test_queued_edits_of_one_message_are_coalesced():
+    # Arrange
+    bot = StubBot()
+    outbound = OutboundQueue(workers=1, chat_rate=100, chat_burst=100)
+    outbound.start()
+    bot.release.clear()
+
+    # Act
+    outbound.fire(bot, "send_message", 1, "hello")
+    futures = [outbound.submit(bot, "edit_message_text", f"page {i}", 1, 5) for i in range(5)]
+    bot.release.set()
+    dropped = outbound.stop(timeout=5)
+
+    # Assert
+    assert dropped == 0
+    assert bot.calls == [("send_message", 1, "hello"), ("edit_message_text", 1, "page 4")]
+    assert outbound.coalesced == 4
+    assert all(future.done() for future in futures)
+
+
+def test_requests_run_inline_before_start():
+    # Arrange
+    bot = StubBot()
+    outbound = OutboundQueue()
+
+    # Act
+    outbound.fire(bot, "answer_callback_query", "42", "ok")
+
+    # Assert
+    assert bot.calls == [("answer_callback_query", None, "ok")]
@@ -0,0 +1,130 @@
+import threading
+from typing import Optional
+
+import requests
+import telebot
+from telebot.apihelper import ApiTelegramException
+from telebot.types import Update, User
+
+from tablettop_bot.api.polling import PollingSupervisor, backoff_delay
+from tablettop_bot.db import crud
+
+
+def message_update(update_id: int, text: str) -> Update:
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": text,
+            "chat": {"id": 1, "type": "private"}, "from": {"id": 1, "is_bot": False, "first_name": "Anna"},
+        },
+    })
+
+
+def api_error(code: int) -> ApiTelegramException:
+    return ApiTelegramException("getUpdates", None, {"error_code": code, "description": "error"})
+
+
+def polling_bot(batches: list, offsets: list, workers: int = 2, startup: Optional[list] = None) -> PollingSupervisor:
+    """Supervisor of a bot whose getMe raises the `startup` errors, then getUpdates returns or raises the batches, then stops it."""
+    bot = telebot.TeleBot("1:x", threaded=False)
+    startup = list(startup or [])
+
+    def get_me():
+        if startup:
+            raise startup.pop(0)
+        return User(1, True, "bot", username="tablettop_bot")
+
+    def get_updates(offset=None, **kwargs):
+        offsets.append(offset)
+        if not batches:
+            supervisor.stop(timeout=5)
+            return []
+        batch = batches.pop(0)
+        if isinstance(batch, Exception):
+            raise batch
+        return batch
+
+    bot.get_me = get_me
+    bot.get_updates = get_updates
+    supervisor = PollingSupervisor(bot, workers=workers, backoff_seconds=0.001)
+    return supervisor
+
+
+def test_handler_errors_are_isolated_and_polling_resumes_after_the_saved_offset(db_url):
+    # Arrange
+    handled, offsets, restarted_offsets = [], [], []
+    supervisor = polling_bot([[message_update(10, "ok"), message_update(11, "bug")], [message_update(12, "ok")]], offsets)
+
+    @supervisor.bot.message_handler(func=lambda message: True)
+    def handle(message):
+        if message.text == "bug":
+            raise ValueError("handler bug")
+        handled.append(message.message_id)
+
+    # Act
+    supervisor.run()
+    polling_bot([], restarted_offsets).run()
+
+    # Assert
+    assert offsets == [None, 12, 13]
+    assert sorted(handled) == [10, 12]
+    assert (supervisor.handled, supervisor.handler_errors) == (3, 1)
+    assert crud.read_update_offset(supervisor.bot.bot_id) == 12
+    assert restarted_offsets == [13]
+
+
+def test_failed_polls_are_classified_and_backed_off_until_the_token_is_rejected(db_url):
+    # Arrange
+    offsets = []
+    supervisor = polling_bot(
+        [requests.exceptions.ConnectionError("reset"), api_error(502), KeyError("update"), api_error(401)], offsets
+    )
+
+    # Act
+    supervisor.run()
+    delays = [backoff_delay(failures, 1, 8) for failures in range(1, 7)]
+
+    # Assert
+    assert dict(supervisor.errors) == {"network": 1, "api": 1, "bug": 1, "fatal": 1}
+    assert len(offsets) == 4
+    assert [0.5 <= delays[0] <= 1, 1 <= delays[1] <= 2, 2 <= delays[2] <= 4] == [True] * 3
+    assert all(4 <= delay <= 8 for delay in delays[3:])
+
+
+def test_stop_drops_the_updates_of_a_batch_left_at_the_deadline(db_url):
+    # Arrange
+    started, gate = threading.Event(), threading.Event()
+    supervisor = polling_bot([[message_update(20, "slow"), message_update(21, "queued")]], [], workers=1)
+
+    @supervisor.bot.message_handler(func=lambda message: message.text == "slow")
+    def handle(message):
+        started.set()
+        gate.wait(5)
+
+    thread = threading.Thread(target=supervisor.run)
+
+    # Act
+    thread.start()
+    started.wait(5)
+    dropped = supervisor.stop(timeout=0.1)
+    gate.set()
+    thread.join(5)
+
+    # Assert
+    assert dropped == 2
+    assert supervisor.handled == 1
+    assert crud.read_update_offset(supervisor.bot.bot_id) == 20
+
+
+def test_startup_failures_are_retried_before_polling(db_url):
+    # Arrange
+    offsets = []
+    crud.save_update_offset(1, 30)
+    supervisor = polling_bot([], offsets, startup=[requests.exceptions.ConnectionError("reset"), api_error(502)])
+
+    # Act
+    supervisor.run()
+
+    # Assert
+    assert dict(supervisor.errors) == {"network": 1, "api": 1}
+    assert offsets == [31]
@@ -0,0 +1,37 @@
+import telebot
+from telebot.types import Update
+
+from tablettop_bot.api.middlewares.query_budget import QueryBudgetMiddleware
+from tablettop_bot.db import instrumentation
+
+
+def command_update(text: str) -> Update:
+    return Update.de_json({
+        "update_id": 1,
+        "message": {
+            "message_id": 1, "date": 0, "text": text,
+            "chat": {"id": 1, "type": "private"}, "from": {"id": 1, "is_bot": False, "first_name": "Anna"},
+        },
+    })
+
+
+def test_query_budget_names_the_handler_that_ran(monkeypatch):
+    # Arrange
+    bot = telebot.TeleBot("1:x", threaded=False, use_class_middlewares=True)
+    handled = []
+
+    @bot.message_handler(commands=["schedule"])
+    def show_schedule(message):
+        handled.append(message.text)
+
+    bot.setup_middleware(QueryBudgetMiddleware(bot, max_queries=-1, n_plus_one_threshold=None))
+    reported = []
+    monkeypatch.setattr(instrumentation, "report", lambda stats, *args: reported.append(stats.name))
+
+    # Act
+    bot.process_new_updates([command_update("/schedule")])
+    bot.process_new_updates([command_update("hello")])
+
+    # Assert
+    assert handled == ["/schedule"]
+    assert reported == ["show_schedule (command:/schedule)", "message"]
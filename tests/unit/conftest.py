@@ -0,0 +1,14 @@
+import pytest
+
+from tablettop_bot.db import database
+from tablettop_bot.db.catalog import catalog
+
+
+@pytest.fixture
+def db_url(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    monkeypatch.setattr(database, "DATABASE_URL", url)
+    database.create_tables()
+    catalog.invalidate()
+    yield url
+    catalog.invalidate()
@@ -0,0 +1,67 @@
+import threading
+
+from tablettop_bot.core.jobs import JobRunner, task
+from tablettop_bot.core.tasks import export_tables
+from tablettop_bot.db import crud
+
+attempts = {}
+order = []
+
+
+@task(max_attempts=3)
+def flaky(job, key: str, failures: int) -> str:
+    attempts[key] = attempts.get(key, 0) + 1
+    job.progress(attempts[key], failures + 1)
+    if attempts[key] <= failures:
+        raise RuntimeError(f"attempt {attempts[key]}")
+    return key
+
+
+@task(queue="slow")
+def record(job, name: str, gate: threading.Event = None) -> None:
+    if gate is not None:
+        gate.wait(5)
+    order.append(name)
+
+
+def test_jobs_are_retried_until_max_attempts(db_url):
+    # Arrange
+    runner = JobRunner(retry_seconds=0.01)
+    results, errors = [], []
+
+    # Act
+    recovered = runner.enqueue(flaky, "recovers", 2, then=results.append)
+    failed = runner.enqueue(flaky, "fails", 5, on_error=errors.append)
+
+    # Assert
+    jobs = {row.id: row for row in crud.read_recent_jobs()}
+    assert results == ["recovers"]
+    assert (jobs[recovered].status, jobs[recovered].attempts, jobs[recovered].progress_done) == ("done", 3, 3)
+    assert (jobs[failed].status, jobs[failed].attempts) == ("failed", 3)
+    assert jobs[failed].error == "RuntimeError: attempt 3"
+    assert [str(error) for error in errors] == ["attempt 3"]
+
+
+def test_queued_jobs_run_by_priority_and_process_pool(db_url, tmp_path):
+    # Arrange
+    crud.create_user(1, username="anna")
+    runner = JobRunner({"slow": 1, "export": 1}, process_workers=1, retry_seconds=0.01)
+    runner.start()
+    gate = threading.Event()
+    exported = []
+
+    # Act
+    runner.enqueue(record, "first", gate)
+    runner.enqueue(record, "low", priority=5)
+    runner.enqueue(record, "high", priority=1)
+    job_id = runner.enqueue(export_tables, str(tmp_path / "export"), ["users"], then=exported.extend)
+    gate.set()
+    dropped = runner.stop(timeout=60)
+
+    # Assert
+    assert dropped == 0
+    assert order == ["first", "high", "low"]
+    assert exported == [str(tmp_path / "export" / "users.csv")]
+    assert "anna" in (tmp_path / "export" / "users.csv").read_text()
+    export_job = next(row for row in crud.read_recent_jobs() if row.id == job_id)
+    assert (export_job.status, export_job.progress_done, export_job.progress_total) == ("done", 1, 1)
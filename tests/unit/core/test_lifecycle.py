@@ -0,0 +1,26 @@
+from tablettop_bot.core.lifecycle import Lifecycle
+
+
+def test_shutdown_runs_steps_in_order_and_reports_dropped_work():
+    # Arrange
+    lifecycle = Lifecycle(timeout=5)
+    calls = []
+
+    def failing(timeout):
+        raise RuntimeError("boom")
+
+    lifecycle.on_stop("updates", lambda timeout: calls.append(("updates", timeout)) or 2)
+    lifecycle.on_stop("broken", failing)
+    lifecycle.on_stop("database", lambda timeout: calls.append(("database", timeout)))
+
+    # Act
+    report = lifecycle.shutdown()
+    second = lifecycle.shutdown()
+
+    # Assert
+    assert [name for name, _ in calls] == ["updates", "database"]
+    assert all(0 < timeout <= 5 for _, timeout in calls)
+    assert report.dropped == {"updates": 2}
+    assert lifecycle.stopping.is_set()
+    assert second.dropped == {} and len(calls) == 2
+
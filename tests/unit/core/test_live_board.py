@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from tablettop_bot.core.live_board import LiveBoard
+from tablettop_bot.db import crud
+
+
+class StubBot:
+    def __init__(self):
+        self.calls = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.calls.append(("send_message", chat_id, text))
+        return SimpleNamespace(message_id=100 + len(self.calls))
+
+    def pin_chat_message(self, chat_id, message_id, **kwargs):
+        self.calls.append(("pin_chat_message", chat_id, message_id))
+
+    def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        self.calls.append(("edit_message_text", chat_id, text))
+
+
+def test_live_board_sends_once_and_edits_only_changes(db_url):
+    # Arrange
+    bot = StubBot()
+    board = {"text": "v1"}
+    live_board = LiveBoard(bot, lambda: (board["text"], None), debounce_seconds=0)
+
+    # Act
+    message_id = live_board.publish(1)
+    live_board.publish(1)
+    live_board.refresh_all()
+    board["text"] = "v2"
+    live_board.refresh_all()
+    live_board.refresh_all()
+
+    # Assert
+    assert [call[0] for call in bot.calls] == ["send_message", "pin_chat_message", "edit_message_text"]
+    assert crud.read_board(1).message_id == message_id
+    assert crud.read_board(1).updated_at.tzinfo is not None
+    assert (live_board.edits, live_board.skipped) == (1, 3)
+
+
+def test_live_board_coalesces_refresh_requests(db_url):
+    # Arrange
+    live_board = LiveBoard(StubBot(), lambda: ("v1", None), debounce_seconds=60)
+
+    # Act
+    for _ in range(10):
+        live_board.request_refresh()
+    timer = live_board._timer
+    live_board.request_refresh()
+
+    # Assert
+    assert live_board._timer is timer
+    live_board.stop()
+    assert live_board._timer is None
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from tablettop_bot.core.nicknames import UNKNOWN_USER, NicknameResolver
+from tablettop_bot.db import crud
+
+
+class StubBot:
+    def __init__(self):
+        self.calls = 0
+
+    def get_chat_member(self, chat_id, user_id):
+        self.calls += 1
+        return SimpleNamespace(user=SimpleNamespace(username=None, first_name="Анна", last_name=None))
+
+
+def test_resolver_prefers_update_and_users_table_over_api(db_url):
+    # Arrange
+    bot = StubBot()
+    resolver = NicknameResolver()
+    crud.upsert_user(id=2, username="boris")
+    from_user = SimpleNamespace(username=None, first_name="Иван", last_name="Петров")
+
+    # Act
+    from_update = resolver.resolve(1, user=from_user, bot=bot, chat_id=1)
+    from_table = resolver.resolve(2, bot=bot, chat_id=2)
+
+    # Assert
+    assert (from_update, from_table) == ("Иван Петров", "boris")
+    assert bot.calls == 0
+
+
+def test_resolver_caches_api_results_until_ttl_expires(db_url):
+    # Arrange
+    bot = StubBot()
+    now = [1000.0]
+    resolver = NicknameResolver(ttl_seconds=60, clock=lambda: now[0])
+
+    # Act
+    names = [resolver.resolve(3, bot=bot, chat_id=3) for _ in range(5)]
+    now[0] += 59
+    cached = resolver.resolve(3, bot=bot, chat_id=3)
+    now[0] += 2
+    expired = resolver.resolve(3, bot=bot, chat_id=3)
+
+    # Assert
+    assert names == ["Анна"] * 5 and cached == expired == "Анна"
+    assert (bot.calls, resolver.hits) == (2, 5)
+
+
+def test_resolver_falls_back_to_unknown_user(db_url):
+    # Assert
+    assert NicknameResolver().resolve(4) == UNKNOWN_USER
@@ -0,0 +1,26 @@
+from tablettop_bot.core.notifications import Notifier
+
+
+class StubBot:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.messages.append((chat_id, text))
+
+
+def test_notifier_merges_a_batch_per_user():
+    # Arrange
+    bot = StubBot()
+    notifier = Notifier(flush_seconds=60)
+    notifier.start(bot)
+
+    # Act
+    notifier.notify(1, "first")
+    notifier.notify(2, "other")
+    notifier.notify(1, "second")
+    notifier.stop(timeout=5)
+
+    # Assert
+    assert bot.messages == [(1, "first\n\nsecond"), (2, "other")]
+    assert (notifier.sent, notifier.batches) == (2, 1)
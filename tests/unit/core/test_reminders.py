@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+from tablettop_bot.core.reminders import ReminderService
+from tablettop_bot.core.timezones import UTC
+from tablettop_bot.db import crud
+
+
+class StubBot:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.messages.append((chat_id, text))
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_reminders_are_sent_once_when_due(db_url):
+    # Arrange
+    start = datetime(2030, 1, 1, 19, 0, tzinfo=UTC)
+    game = crud.add_game("Особняки Безумия", 1, 6)
+    scheduled_game = crud.schedule_game(
+        game.id, start, initiator_id=1, nickname="host", use_steam=False, server_password=None, serverdata=None, room=3
+    )
+    crud.enroll_player(scheduled_game.id, 2, "anna")
+    bot, clock = StubBot(), FakeClock(start - timedelta(hours=3))
+    service = ReminderService(bot, [60], clock=clock)
+
+    # Act
+    too_early = service.run_once()
+    clock.now = start - timedelta(minutes=50)
+    due = service.run_once()
+    repeated = service.run_once()
+    after_restart = ReminderService(bot, [60], clock=clock).run_once()
+
+    # Assert
+    assert (too_early, due, repeated, after_restart) == (0, 2, 0, 0)
+    assert sorted(chat_id for chat_id, _ in bot.messages) == [1, 2]
+    assert "Особняки Безумия" in bot.messages[0][1]
+
+
+def test_player_due_for_several_lead_times_gets_one_message(db_url):
+    # Arrange
+    start = datetime(2030, 1, 1, 19, 0, tzinfo=UTC)
+    game = crud.add_game("Спартак", 3, 6)
+    crud.schedule_game(
+        game.id, start, initiator_id=1, nickname="host", use_steam=False, server_password=None, serverdata=None, room=1
+    )
+    bot = StubBot()
+    service = ReminderService(bot, [1440, 60], clock=FakeClock(start - timedelta(minutes=30)))
+
+    # Act
+    service.run_once()
+
+    # Assert
+    assert len(bot.messages) == 1
+    assert len(crud.get_due_reminders(start - timedelta(days=1), start, "1440m")) == 0
+
+
+def test_series_occurrences_get_reminders(db_url):
+    # Arrange
+    start = datetime(2030, 1, 1, 19, 0, tzinfo=UTC)
+    game = crud.add_game("Root", 2, 4)
+    first = crud.schedule_game(
+        game.id, start, initiator_id=1, nickname="host", use_steam=False, server_password=None, serverdata=None,
+        room=1, repeat_weekly=True,
+    )
+    crud.enroll_player(first.id, 2, "anna")
+    bot = StubBot()
+    service = ReminderService(bot, [60], clock=FakeClock(start + timedelta(days=7, minutes=-30)))
+
+    # Act
+    sent = service.run_once()
+
+    # Assert
+    assert sent == 2
+    assert sorted(chat_id for chat_id, _ in bot.messages) == [1, 2]
+
+
+def test_reminders_are_sent_in_the_language_of_the_player(db_url):
+    # Arrange
+    start = datetime(2030, 1, 1, 19, 0, tzinfo=UTC)
+    crud.create_user(1, username="host", lang="ru")
+    crud.create_user(2, username="anna", lang="en")
+    game = crud.add_game("Root", 2, 4)
+    scheduled_game = crud.schedule_game(
+        game.id, start, initiator_id=1, nickname="host", use_steam=False, server_password=None, serverdata=None, room=1
+    )
+    crud.enroll_player(scheduled_game.id, 2, "anna")
+    crud.enroll_player(scheduled_game.id, 3, "guest")
+    bot = StubBot()
+
+    # Act
+    ReminderService(bot, [60], clock=FakeClock(start - timedelta(minutes=30))).run_once()
+
+    # Assert
+    texts = dict(bot.messages)
+    assert texts[1].startswith("⏰ Напоминание")
+    assert texts[2].startswith("⏰ Reminder")
+    assert texts[3].startswith("⏰ Reminder")
@@ -0,0 +1,40 @@
+from datetime import date
+
+from tablettop_bot.core.render_cache import VersionedRenderCache
+
+
+def test_render_cache_renders_once_per_version_and_day():
+    # Arrange
+    state = {"version": 1, "today": date(2025, 1, 1), "renders": 0}
+
+    def render():
+        state["renders"] += 1
+        return f"board v{state['version']}"
+
+    cache = VersionedRenderCache(render, lambda: state["version"], lambda: state["today"])
+
+    # Act
+    first = [cache.get() for _ in range(3)]
+    state["version"] = 2
+    second = cache.get()
+    state["today"] = date(2025, 1, 2)
+    cache.get()
+
+    # Assert
+    assert first == ["board v1"] * 3
+    assert second == "board v2"
+    assert state["renders"] == 3
+    assert cache.stats() == {"hits": 2, "misses": 3, "hit_ratio": 0.4}
+
+
+def test_render_cache_invalidate_forces_render():
+    # Arrange
+    renders = []
+    cache = VersionedRenderCache(lambda: renders.append(1) or len(renders), lambda: 1)
+    cache.get()
+
+    # Act
+    cache.invalidate()
+
+    # Assert
+    assert cache.get() == 2
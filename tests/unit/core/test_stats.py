@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from tablettop_bot.core.stats import StatsRollupJob, get_stats
+from tablettop_bot.core.timezones import utcnow
+from tablettop_bot.db import crud, database
+from tablettop_bot.db.models import Event
+
+
+def add_events(*rows):
+    with database.get_session() as db:
+        db.add_all(Event(user_id=user_id, timestamp=timestamp, type="message") for user_id, timestamp in rows)
+        db.commit()
+
+
+def play(name, max_players, players, hours_ago=2):
+    game = crud.add_game(name, 2, max_players)
+    scheduled = crud.schedule_game(
+        game.id, utcnow() - timedelta(hours=hours_ago), initiator_id=1, nickname="host", use_steam=False,
+        server_password=None, serverdata=None, room=1,
+    )
+    for user_id in range(2, players + 1):
+        crud.enroll_player(scheduled.id, user_id, f"player{user_id}")
+
+
+def test_rollups_are_incremental(db_url):
+    # Arrange
+    today = utcnow()
+    add_events((1, today), (1, today), (2, today - timedelta(days=1)))
+    job = StatsRollupJob()
+
+    # Act
+    first = job.run_once()
+    add_events((1, today), (3, today))
+    second = job.run_once()
+
+    # Assert
+    assert first == (2, 0)
+    assert second == (1, 0)
+    assert len(crud.read_daily_activity(today.date() - timedelta(days=1), today.date())) == 3
+
+
+def test_stats_from_rollups(db_url):
+    # Arrange
+    now = utcnow()
+    add_events((1, now), (2, now), (3, now - timedelta(days=10)))
+    play("Каркассон", 4, 4)
+    play("Каркассон", 4, 2)
+    play("Эволюция", 6, 1)
+    crud.archive_past_games(utcnow())
+    StatsRollupJob().run_once()
+
+    # Act
+    report = get_stats(now.date(), 30)
+
+    # Assert
+    assert (report.dau, report.wau, report.active_users) == (2, 2, 3)
+    assert report.games_played == 3
+    assert report.top_games[0] == ("Каркассон", 2, 6)
+    assert report.fill_rates[0] == ("Каркассон", 0.75)
+    assert (report.underfilled, report.host_only) == (1, 1)
+    assert report.top_hosts == [("host", 3, 7 / 14)]
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from tablettop_bot.core.timezones import UTC, UserTimezones, get_zone, start_of_day, zone_label
+from tablettop_bot.db import crud
+
+
+def test_user_timezones_fall_back_to_the_default_zone():
+    # Arrange
+    user_timezones = UserTimezones(max_size=1)
+
+    # Act
+    user_timezones.remember(1, "Asia/Yekaterinburg")
+    user_timezones.remember(2, None)
+
+    # Assert
+    assert user_timezones.zone(2) is get_zone() is get_zone("Europe/Moscow")
+    assert user_timezones.zone(1) is get_zone()
+    assert zone_label(datetime(2030, 1, 1, 12, tzinfo=UTC).astimezone(get_zone("Asia/Yekaterinburg"))) == "UTC+5"
+
+
+def test_series_keeps_its_wall_time_across_dst(db_url):
+    # Arrange, 19:00 in Berlin is 18:00 UTC in winter and 17:00 UTC in summer
+    game = crud.add_game("Root", 2, 4)
+    start = datetime(2030, 3, 20, 19, 0, tzinfo=get_zone("Europe/Berlin"))
+    first = crud.schedule_game(
+        game.id, start, initiator_id=1, nickname="host", use_steam=False, server_password=None, serverdata=None,
+        room=1, repeat_weekly=True, timezone="Europe/Berlin",
+    )
+
+    # Act
+    winter = crud.get_scheduled_game_by_id(first.id)
+    summer = crud.get_occurrence(f"{first.series_id}.20300403")
+
+    # Assert
+    assert winter.datetime == datetime(2030, 3, 20, 18, 0, tzinfo=UTC)
+    assert summer.datetime == datetime(2030, 4, 3, 17, 0, tzinfo=UTC)
+    assert crud.get_occurrence(f"{first.series_id}.20300404") is None
+
+
+def test_schedule_since_start_of_day_keeps_started_games(db_url):
+    # Arrange
+    game = crud.add_game("Root", 2, 4)
+    today = start_of_day(get_zone())
+    started, yesterday = [
+        crud.schedule_game(game.id, start, 1, "host", False, None, None).id
+        for start in (today, today - timedelta(minutes=1))
+    ]
+
+    # Act
+    board = [g.id for g in crud.get_scheduled_games(since=today)]
+    upcoming = [g.id for g in crud.get_scheduled_games()]
+
+    # Assert
+    assert today.astimezone(get_zone()).time() == datetime.min.time()
+    assert board == [started] and yesterday not in board
+    assert upcoming == []
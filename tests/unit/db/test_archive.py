@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from tablettop_bot.core.archive import ArchiveJob
+from tablettop_bot.core.timezones import utcnow
+from tablettop_bot.db import crud, database
+from tablettop_bot.db.models import ArchivedGame, ArchivedGamePlayer, GamePlayer, ScheduledGame
+
+
+def schedule(start, repeat_weekly=False):
+    game = crud.add_game("Каркассон", 2, 5)
+    return crud.schedule_game(
+        game.id, start, initiator_id=1, nickname="host", use_steam=False, server_password=None, serverdata=None,
+        room=1, repeat_weekly=repeat_weekly,
+    )
+
+
+def count(model) -> int:
+    with database.get_session() as db:
+        return db.scalar(select(func.count()).select_from(model))
+
+
+def test_past_games_are_moved_in_batches(db_url):
+    # Arrange
+    now = utcnow()
+    past = [schedule(now - timedelta(days=day)) for day in (1, 2, 3)]
+    future = schedule(now + timedelta(days=1))
+    crud.enroll_player(past[0].id, 2, "anna")
+
+    # Act
+    archived = crud.archive_past_games(now - timedelta(minutes=30), batch_size=2)
+
+    # Assert
+    assert archived == 3
+    assert [game.id for game in crud.get_scheduled_games()] == [future.id]
+    assert count(ScheduledGame) == 1 and count(GamePlayer) == 1
+    assert count(ArchivedGame) == 3 and count(ArchivedGamePlayer) == 4
+    with database.get_session() as db:
+        archived_game = db.scalars(select(ArchivedGame).where(ArchivedGame.scheduled_game_id == past[0].id)).one()
+        assert archived_game.datetime == past[0].datetime
+
+
+def test_reused_scheduled_game_ids_are_archived_again(db_url):
+    # Arrange, SQLite gives the next game the id of the archived last one
+    now = utcnow()
+    first = schedule(now - timedelta(days=2))
+    crud.enroll_player(first.id, 2, "anna")
+    crud.archive_past_games(now)
+    second = schedule(now - timedelta(days=1))
+    crud.enroll_player(second.id, 3, "boris")
+
+    # Act
+    archived = crud.archive_past_games(now)
+
+    # Assert
+    assert second.id == first.id and archived == 1
+    with database.get_session() as db:
+        games = db.execute(select(ArchivedGame.id, ArchivedGame.datetime).order_by(ArchivedGame.id)).all()
+        players = db.execute(select(ArchivedGamePlayer.archived_game_id, ArchivedGamePlayer.user_id)).all()
+    assert [start for _, start in games] == [first.datetime, second.datetime]
+    assert sorted(players) == [(games[0].id, 1), (games[0].id, 2), (games[1].id, 1), (games[1].id, 3)]
+
+
+def test_series_players_survive_archival(db_url):
+    # Arrange
+    now = utcnow()
+    first = schedule(now - timedelta(days=1), repeat_weekly=True)
+    crud.enroll_player(first.id, 2, "anna")
+    job = ArchiveJob(grace_minutes=30, clock=lambda: now)
+
+    # Act
+    archived = job.run_once()
+    next_game = [game for game in crud.get_scheduled_games() if game.series_id == first.series_id][0]
+
+    # Assert
+    assert archived == 1
+    assert next_game.id is None and next_game.players == ((1, "host"), (2, "anna"))
+    assert job.run_once() == 0
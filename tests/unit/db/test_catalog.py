@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from tablettop_bot.core.timezones import utcnow
+from tablettop_bot.db import crud
+from tablettop_bot.db.instrumentation import track_queries
+from tablettop_bot.db.read_models import GameRow, ScheduledGameRow
+
+
+def test_catalog_serves_reads_from_memory(db_url):
+    # Arrange
+    crud.add_game("Root", 2, 4, online=False)
+    crud.add_game("Arkham", 1, 4, online=True)
+    crud.get_all_games()
+
+    # Act
+    with track_queries("catalog") as stats:
+        names = [game.name for game in crud.get_all_games()]
+        online = [game.name for game in crud.get_online_games()]
+        offline = [game.name for game in crud.get_offline_games()]
+        details = crud.get_game_details(crud.get_all_games()[0].id)
+
+    # Assert
+    assert stats.count == 0
+    assert names == ["Arkham", "Root"]
+    assert online == ["Arkham"]
+    assert offline == ["Root"]
+    assert details.name == "Arkham"
+
+
+def test_add_game_invalidates_catalog(db_url):
+    # Arrange
+    crud.add_game("Root", 2, 4)
+    assert crud.get_game_name_by_id(999) == "Unknown Game"
+
+    # Act
+    game = crud.add_game("Spartacus", 3, 6)
+
+    # Assert
+    assert crud.get_game_name_by_id(game.id) == "Spartacus"
+    assert len(crud.get_all_games()) == 2
+
+
+def test_catalog_and_board_return_read_only_rows(db_url):
+    # Arrange
+    game = crud.add_game("Root", 2, 4)
+    crud.schedule_game(game.id, utcnow() + timedelta(days=1), 1, "host", False, None, None)
+
+    # Act
+    library = crud.get_all_games()
+    board = crud.get_scheduled_games()
+
+    # Assert
+    assert isinstance(library[0], GameRow)
+    assert isinstance(board[0], ScheduledGameRow)
+    assert board[0].key == str(board[0].id)
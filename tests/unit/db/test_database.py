@@ -0,0 +1,17 @@
+from tablettop_bot.db import database
+
+
+def test_sessions_share_the_engine_until_the_url_changes(db_url, tmp_path, monkeypatch):
+    # Arrange
+    first = database.get_engine()
+
+    # Act
+    session = database.get_session()
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite:///{tmp_path / 'other.db'}")
+    other = database.get_engine()
+
+    # Assert
+    assert session.get_bind() is first
+    session.close()
+    assert other is not first
+    assert other is database.get_engine()
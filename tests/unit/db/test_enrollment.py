@@ -0,0 +1,87 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from tablettop_bot.core.timezones import utcnow
+from tablettop_bot.db import crud
+from tablettop_bot.db.crud import EnrollmentStatus
+
+
+def schedule(max_players: int):
+    game = crud.add_game("Особняки Безумия", 1, max_players)
+    return crud.schedule_game(
+        game.id, utcnow() + timedelta(days=1), initiator_id=1, nickname="host",
+        use_steam=False, server_password=None, serverdata=None, room=1,
+    )
+
+
+def test_enroll_player_reports_status(db_url):
+    # Arrange
+    scheduled_game = schedule(max_players=2)
+
+    # Act
+    statuses = [
+        crud.enroll_player(scheduled_game.id, 2, "anna"),
+        crud.enroll_player(scheduled_game.id, 2, "anna"),
+        crud.enroll_player(scheduled_game.id, 3, "boris", waitlist=False),
+        crud.enroll_player(scheduled_game.id + 1, 3, "boris"),
+    ]
+
+    # Assert
+    assert statuses == [
+        EnrollmentStatus.JOINED, EnrollmentStatus.ALREADY, EnrollmentStatus.FULL, EnrollmentStatus.NOT_FOUND
+    ]
+    assert crud.get_players(scheduled_game.id) == [(1, "host"), (2, "anna")]
+    assert [game.id for game in crud.get_enrolled_games_by_user(2)] == [scheduled_game.id]
+
+
+def test_concurrent_enrollment_never_overfills_or_duplicates(db_url):
+    # Arrange
+    scheduled_game = schedule(max_players=6)
+    user_ids = [100 + i % 150 for i in range(300)]
+
+    # Act
+    with ThreadPoolExecutor(max_workers=100) as executor:
+        statuses = list(executor.map(lambda user_id: crud.enroll_player(scheduled_game.id, user_id, str(user_id)), user_ids))
+
+    # Assert
+    counts = Counter(statuses)
+    assert counts[EnrollmentStatus.JOINED] == 5
+    assert counts[EnrollmentStatus.NOT_FOUND] == 0
+    player_ids = [user_id for user_id, _ in crud.get_players(scheduled_game.id)]
+    assert len(player_ids) == len(set(player_ids)) == 6
+    assert len(crud.get_waitlist(scheduled_game.id)) == 145
+
+
+def test_leaving_promotes_the_first_waitlisted_player(db_url):
+    # Arrange
+    scheduled_game = schedule(max_players=2)
+    crud.enroll_player(scheduled_game.id, 2, "anna")
+    statuses = [crud.enroll_player(scheduled_game.id, user_id, str(user_id)) for user_id in (3, 4, 5)]
+
+    # Act
+    left, promoted = crud.leave_game(scheduled_game.id, 2)
+    promoted_by_capacity = crud.set_game_capacity(scheduled_game.id, 4)
+
+    # Assert
+    assert statuses == [EnrollmentStatus.WAITLISTED] * 3
+    assert left and [player.user_id for player in promoted] == [3]
+    assert [player.user_id for player in promoted_by_capacity] == [4, 5]
+    assert [user_id for user_id, _ in crud.get_players(scheduled_game.id)] == [1, 3, 4, 5]
+    assert crud.get_waitlist(scheduled_game.id) == []
+
+
+def test_concurrent_unsubscribes_promote_one_player_per_seat(db_url):
+    # Arrange
+    scheduled_game = schedule(max_players=11)
+    for user_id in range(2, 62):
+        crud.enroll_player(scheduled_game.id, user_id, str(user_id))
+
+    # Act
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(lambda user_id: crud.leave_game(scheduled_game.id, user_id), range(2, 12)))
+
+    # Assert
+    promoted = [player.user_id for _, players in results for player in players]
+    assert sorted(promoted) == list(range(12, 22))
+    assert len(crud.get_players(scheduled_game.id)) == 11
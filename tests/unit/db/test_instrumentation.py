@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from tablettop_bot.db.instrumentation import QueryBudgetExceeded, normalize_statement, query_budget, track_queries
+
+
+@pytest.fixture
+def connection():
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE games (id INTEGER PRIMARY KEY, name TEXT)"))
+        connection.execute(text("INSERT INTO games (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+        yield connection
+
+
+def test_track_queries_counts_statements(connection):
+    # Act
+    with track_queries("lookup") as stats:
+        for game_id in (1, 2, 3):
+            connection.execute(text("SELECT name FROM games WHERE id = :id"), {"id": game_id})
+
+    # Assert
+    assert stats.count == 3
+    assert stats.repeated_shapes(3) == [("SELECT name FROM games WHERE id = ?", 3)]
+
+
+def test_normalize_statement_folds_literals_and_in_lists():
+    # Assert
+    assert normalize_statement("SELECT * FROM games WHERE id IN (?, ?, ?)") == "SELECT * FROM games WHERE id IN (?)"
+    assert normalize_statement("SELECT *\n  FROM games WHERE id = 7") == "SELECT * FROM games WHERE id = ?"
+
+
+def test_query_budget_fails_on_n_plus_one(connection):
+    # Act / Assert
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+        with query_budget(n_plus_one_threshold=3, name="format_scheduled_games"):
+            for game_id in (1, 2, 3):
+                connection.execute(text("SELECT name FROM games WHERE id = :id"), {"id": game_id})
+
+
+def test_query_budget_passes_within_budget(connection):
+    # Act
+    with query_budget(max_queries=1, n_plus_one_threshold=2) as stats:
+        connection.execute(text("SELECT name FROM games WHERE id IN (1, 2, 3)"))
+
+    # Assert
+    assert stats.count == 1
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import inspect, text
+
+from tablettop_bot.db import crud, database
+from tablettop_bot.db.catalog import catalog
+from tablettop_bot.db.migrations import MIGRATIONS, get_applied_versions, migrate
+from tablettop_bot.db.search import SqliteFtsSearchBackend
+
+# Schema of the tables as the baseline release created them, before the migration runner
+BASELINE_SCHEMA = [
+    "CREATE TABLE games (id INTEGER NOT NULL, name VARCHAR, online BOOLEAN, min_players INTEGER, "
+    "max_players INTEGER, description VARCHAR, link VARCHAR, PRIMARY KEY (id))",
+    "CREATE TABLE users (id INTEGER NOT NULL, first_message_timestamp DATETIME, last_message_timestamp DATETIME, "
+    "username VARCHAR, first_name VARCHAR, last_name VARCHAR, phone_number VARCHAR, lang VARCHAR, role VARCHAR, "
+    "PRIMARY KEY (id))",
+    "CREATE TABLE events (id INTEGER NOT NULL, timestamp DATETIME, user_id BIGINT, type VARCHAR, state VARCHAR, "
+    "content_type VARCHAR, content VARCHAR, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id))",
+    "CREATE TABLE scheduled_games (id INTEGER NOT NULL, game_id INTEGER, date DATE, time TIME, datetime DATETIME, "
+    "initiator_id INTEGER, initiator_name VARCHAR, use_steam BOOLEAN, server_data VARCHAR, server_password VARCHAR, "
+    "discord_telegram_link VARCHAR, player_ids TEXT, player_nicknames TEXT, room INTEGER, repweekly BOOLEAN, "
+    '"PGID" INTEGER, "GameTree" TEXT, skipped BOOLEAN, PRIMARY KEY (id), FOREIGN KEY(game_id) REFERENCES games (id))',
+]
+
+
+def test_migrate_applies_pending_migrations_once(tmp_path, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite:///{tmp_path / 'fresh.db'}")
+    engine = database.get_engine()
+
+    # Act
+    first = migrate(engine)
+    second = migrate(engine)
+
+    # Assert
+    assert first == sorted(step.version for step in MIGRATIONS)
+    assert second == []
+    assert get_applied_versions(engine) == set(first)
+    assert "scheduled_games" in inspect(engine).get_table_names()
+
+
+def test_migrate_keeps_data_of_existing_database(db_url):
+    # Arrange
+    engine = database.get_engine()
+    game = crud.add_game("Каркассон", 2, 5)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE schema_migrations"))
+
+    # Act
+    migrate(engine)
+    seeded = database.init_games_table()
+    reseeded = database.init_games_table()
+
+    # Assert
+    assert crud.get_game_details(game.id).name == "Каркассон"
+    assert seeded > 0 and reseeded == 0
+
+
+def test_migrate_upgrades_baseline_database_with_data(tmp_path, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite:///{tmp_path / 'baseline.db'}")
+    engine = database.get_engine()
+    # Wall time in the default zone, Europe/Moscow, like the baseline stored it
+    start = (datetime.now() + timedelta(days=2)).replace(hour=18, minute=0, second=0, microsecond=0)
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO games (id, name, max_players) VALUES (1, 'Каркассон', 2)"))
+        connection.execute(text("INSERT INTO users (id, username, lang, role) VALUES (1, 'anna', 'ru', 'user')"))
+        connection.execute(
+            text("INSERT INTO events (id, timestamp, user_id, type) VALUES (1, :start, 1, 'message')"),
+            {"start": start.isoformat(sep=" ")},
+        )
+        connection.execute(text(
+            "INSERT INTO scheduled_games (id, game_id, date, time, datetime, initiator_id, initiator_name, "
+            "player_ids, player_nicknames, room, repweekly, skipped) VALUES "
+            "(1, 1, :date, :time, :start, 1, 'anna', '1,2,2', 'anna,boris', 1, 0, 0), "
+            "(2, 1, :date, :time, :start, 1, 'anna', '1', 'anna', 2, 0, 1)"
+        ), {"date": start.date().isoformat(), "time": start.time().isoformat(), "start": start.isoformat(sep=" ")})
+    catalog.invalidate()
+
+    # Act
+    migrate(engine)
+    touched = crud.touch_user(1, username="anna_k")
+    added = crud.add_game("Кодовые имена", 2, 8)
+    # Without a fallback a missing games_fts table fails the search instead of hiding behind the n-grams
+    fts = SqliteFtsSearchBackend(fallback=None)
+
+    # Assert
+    (game,) = crud.get_scheduled_games()
+    assert game.id == 1
+    assert game.datetime == start.replace(tzinfo=timezone(timedelta(hours=3))).astimezone(timezone.utc)
+    assert crud.read_event(1).timestamp == game.datetime
+    assert [g.id for g in crud.get_enrolled_games_by_user(2)] == [1]
+    assert crud.enroll_player(1, 3, "vera") == crud.EnrollmentStatus.WAITLISTED
+    assert (touched.username, touched.timezone, crud.read_user(1).lang) == ("anna_k", None, "ru")
+    assert [g.id for g in fts.search("карк")] == [1]
+    assert [g.id for g in fts.search("кодов")] == [added.id]
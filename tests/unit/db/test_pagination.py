@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from tablettop_bot.core.timezones import utcnow
+from tablettop_bot.db import crud
+
+
+def test_games_page_seeks_forward_and_back(db_url):
+    # Arrange
+    for name in ["E", "A", "D", "B", "C"]:
+        crud.add_game(name, 1, 4)
+
+    # Act
+    first = crud.get_games_page(limit=2)
+    second = crud.get_games_page(after_id=first.last_id, limit=2)
+    third = crud.get_games_page(after_id=second.last_id, limit=2)
+    back = crud.get_games_page(before_id=third.first_id, limit=2)
+
+    # Assert
+    assert [game.name for game in first.items] == ["A", "B"]
+    assert (first.has_prev, first.has_next) == (False, True)
+    assert [game.name for game in second.items] == ["C", "D"]
+    assert [game.name for game in third.items] == ["E"]
+    assert (third.has_prev, third.has_next) == (True, False)
+    assert back.items == second.items
+
+
+def test_scheduled_games_page_seeks_by_datetime_and_key(db_url):
+    # Arrange
+    game = crud.add_game("Root", 1, 4)
+    start = utcnow().replace(second=0, microsecond=0) + timedelta(days=1)
+    scheduled_ids = [
+        crud.schedule_game(game.id, start + timedelta(hours=hours), 1, "host", False, None, None).id
+        for hours in (3, 1, 2, 1, 0)
+    ]
+
+    # Act
+    first = crud.get_scheduled_games_page(limit=2)
+    second = crud.get_scheduled_games_page(after_key=first.last_key, limit=2)
+    third = crud.get_scheduled_games_page(after_key=second.last_key, limit=2)
+    back = crud.get_scheduled_games_page(before_key=second.first_key, limit=2)
+
+    # Assert
+    ordered = [g.id for page in (first, second, third) for g in page.items]
+    assert ordered == [scheduled_ids[4], scheduled_ids[1], scheduled_ids[3], scheduled_ids[2], scheduled_ids[0]]
+    assert (third.has_prev, third.has_next) == (True, False)
+    assert [g.id for g in back.items] == [g.id for g in first.items]
+    assert back.has_prev is False
+
+
+def test_scheduled_games_page_merges_series_occurrences(db_url):
+    # Arrange
+    game = crud.add_game("Root", 1, 4)
+    start = utcnow().replace(second=0, microsecond=0) + timedelta(days=1)
+    for hours in (0, 2):
+        crud.schedule_game(game.id, start + timedelta(hours=hours), 1, "host", False, None, None, repeat_weekly=True)
+    for hours in (-1, 2, 170, 338):
+        crud.schedule_game(game.id, start + timedelta(hours=hours), 1, "host", False, None, None)
+    expected = [g.key for g in crud.get_scheduled_games()]
+
+    # Act
+    pages = [crud.get_scheduled_games_page(limit=3, max_days=30)]
+    while pages[-1].has_next:
+        pages.append(crud.get_scheduled_games_page(after_key=pages[-1].last_key, limit=3, max_days=30))
+    back = crud.get_scheduled_games_page(before_key=pages[2].first_key, limit=3, max_days=30)
+
+    # Assert
+    assert [g.key for page in pages for g in page.items] == expected
+    assert len(expected) == 10 and any("." in key for key in expected)
+    assert [g.key for g in back.items] == [g.key for g in pages[1].items]
+    assert (back.has_prev, back.has_next) == (True, True)
@@ -0,0 +1,101 @@
+"""
+Query plan regression checks of the critical crud queries.
+
+Every case runs a crud function on a synthetic dataset, captures the statements it sends
+and explains them: EXPLAIN QUERY PLAN on SQLite, EXPLAIN on PostgreSQL. A full scan of a
+table that grows with the users or the schedule fails the case, so a schema or query
+change that drops an index path breaks the suite. Set QUERY_PLAN_DATABASE_URL to an
+empty PostgreSQL database to check its planner as well.
+"""
+
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from tablettop_bot.db import crud, database, synthetic
+from tablettop_bot.db.migrations import migrate
+
+SCALE = synthetic.Scale(users=3_000, games=200, series=100, scheduled_games=3_000, archived_games=2_000, events=10_000)
+NOW = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+# Tables that grow with the users or the schedule, the game library is small and cached
+LARGE_TABLES = {
+    "users", "events", "scheduled_games", "game_players", "game_series", "series_exceptions", "archived_games",
+    "archived_game_players",
+}
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)\b(?! USING)")
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    url = os.getenv("QUERY_PLAN_DATABASE_URL") or f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+    original = database.DATABASE_URL
+    database.DATABASE_URL = url
+    engine = database.get_engine()
+    migrate(engine)
+    generated = synthetic.generate(SCALE, seed=0, engine=engine, now=NOW)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    yield generated
+    database.DATABASE_URL = original
+
+
+def capture(function, *args) -> list[tuple[str, object]]:
+    """Run a crud function and return the SELECT statements it executed with their parameters."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        function(*args)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    return statements
+
+
+def full_scans(statement: str, parameters) -> list[str]:
+    """Large tables a statement reads without an index."""
+    engine = database.get_engine()
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            lines = [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+            tables = [match.group(1) for line in lines for match in [_POSTGRES_SCAN.search(line)] if match]
+        else:
+            lines = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            tables = [match.group(1) for line in lines for match in [_SQLITE_SCAN.match(line)] if match]
+    return [table for table in tables if table in LARGE_TABLES]
+
+
+CASES = {
+    "board": lambda data: (crud.get_scheduled_games,),
+    "enrolled_by_user": lambda data: (crud.get_enrolled_games_by_user, data.users[0]),
+    "hosted_by_user": lambda data: (crud.get_hosted_games_by_user, data.users[0]),
+    "room_availability": lambda data: (crud.get_available_room, NOW + timedelta(days=3)),
+    "read_user": lambda data: (crud.read_user, data.users[0]),
+    "read_user_by_username": lambda data: (crud.read_user_by_username, f"@Player{data.users[0]}"),
+    "search_users_by_username": lambda data: (crud.search_users_by_username, "player12"),
+    "events_by_user": lambda data: (crud.read_events_by_user, data.users[0]),
+}
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_critical_queries_use_indexes(dataset, case):
+    # Arrange
+    function, *args = CASES[case](dataset)
+
+    # Act
+    statements = capture(function, *args)
+
+    # Assert
+    assert statements
+    for statement, parameters in statements:
+        assert full_scans(statement, parameters) == [], statement
@@ -0,0 +1,43 @@
+from datetime import date, datetime
+
+import pytest
+
+from tablettop_bot.db.recurrence import Rule, expand, format_rrule, parse_rrule
+
+
+def test_parse_and_format_rrule_round_trip():
+    # Arrange
+    text = "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH;UNTIL=20301231;COUNT=10"
+
+    # Act
+    rule = parse_rrule(text)
+
+    # Assert
+    assert rule == Rule(interval=2, weekdays=(0, 3), until=date(2030, 12, 31), count=10)
+    assert format_rrule(rule) == text
+    with pytest.raises(ValueError):
+        parse_rrule("FREQ=DAILY")
+
+
+def test_expand_only_generates_the_window():
+    # Arrange, a biweekly Monday and Thursday series that started years ago
+    dtstart = datetime(2020, 1, 2, 19, 0)  # a Thursday
+    rule = parse_rrule("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH")
+
+    # Act
+    days = expand(dtstart, rule, date(2024, 1, 1), date(2024, 1, 28), exceptions=[date(2024, 1, 11)])
+
+    # Assert
+    assert days == [date(2024, 1, 8), date(2024, 1, 22), date(2024, 1, 25)]
+
+
+def test_expand_counts_occurrences_from_dtstart():
+    # Arrange
+    dtstart = datetime(2024, 1, 3, 19, 0)  # a Wednesday
+    rule = parse_rrule("FREQ=WEEKLY;BYDAY=MO,WE;COUNT=3")
+
+    # Act
+    days = expand(dtstart, rule, date(2024, 1, 1), date(2024, 2, 1))
+
+    # Assert
+    assert days == [date(2024, 1, 3), date(2024, 1, 8), date(2024, 1, 10)]
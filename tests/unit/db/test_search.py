@@ -0,0 +1,61 @@
+from tablettop_bot.db import crud
+from tablettop_bot.db.models import Game
+from tablettop_bot.db.search import NgramIndex, NgramSearchBackend, PostgresSearchBackend
+
+GAMES = [
+    Game(id=1, name="🐙 Ужас Аркхэма. Карточная игра", description="Каждый игрок берет на себя роль сыщика"),
+    Game(id=2, name="🐙 Особняки Безумия", description="Таинственный особняк"),
+    Game(id=3, name="🩸Спартак. Кровь и песок", description="Древний Рим"),
+    Game(id=4, name="Arkham Horror", description="Cosmic horror in Arkham"),
+]
+
+
+def test_ngram_index_matches_prefixes():
+    # Arrange
+    index = NgramIndex(GAMES)
+
+    # Act
+    results = index.search("спарт")
+
+    # Assert
+    assert [game.id for game in results] == [3]
+
+
+def test_ngram_index_tolerates_typos_and_ranks_names_first():
+    # Arrange
+    index = NgramIndex(GAMES)
+
+    # Act
+    results = index.search("arkam")
+
+    # Assert
+    assert [game.id for game in results] == [4]
+    assert [game.id for game in index.search("аркхема")] == [1]
+
+
+def test_ngram_index_ignores_unknown_words():
+    # Assert
+    assert NgramIndex(GAMES).search("монополия") == []
+
+
+def test_search_games_uses_sqlite_fts_and_falls_back_for_typos(db_url):
+    # Arrange
+    crud.add_game("Особняки Безумия", 1, 6, description="Таинственный особняк")
+    crud.add_game("Спартак. Кровь и песок", 3, 6, description="Древний Рим")
+
+    # Assert
+    assert [game.name for game in crud.search_games("спар")] == ["Спартак. Кровь и песок"]
+    assert [game.name for game in crud.search_games("рим")] == ["Спартак. Кровь и песок"]
+    assert [game.name for game in crud.search_games("осбняки")] == ["Особняки Безумия"]
+
+
+def test_postgres_search_falls_back_to_trigrams_when_the_query_fails(db_url):
+    # Arrange
+    crud.add_game("Спартак. Кровь и песок", 3, 6, description="Древний Рим")
+    backend = PostgresSearchBackend(NgramSearchBackend())
+
+    # Act
+    results = backend.search("спартк")
+
+    # Assert
+    assert [game.name for game in results] == ["Спартак. Кровь и песок"]
@@ -0,0 +1,128 @@
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from tablettop_bot.core.timezones import utcnow
+from tablettop_bot.db import crud, database
+from tablettop_bot.db.migrations import migrate_game_trees
+
+
+def schedule_weekly(start, rrule=None):
+    game = crud.add_game("Особняки Безумия", 1, 6)
+    return crud.schedule_game(
+        game.id, start, initiator_id=1, nickname="host", use_steam=False, server_password=None, serverdata=None,
+        room=1, repeat_weekly=True, rrule=rrule,
+    )
+
+
+def test_series_occurrences_are_expanded_lazily(db_url):
+    # Arrange
+    first = schedule_weekly(utcnow() + timedelta(days=1))
+    crud.enroll_player(first.id, 2, "anna")
+
+    # Act
+    occurrences = [game for game in crud.get_scheduled_games() if game.series_id == first.series_id]
+
+    # Assert
+    assert len(occurrences) == 3
+    assert [game.id is None for game in occurrences] == [False, True, True]
+    assert {game.players for game in occurrences} == {((1, "host"), (2, "anna"))}
+    assert [game.datetime - first.datetime for game in occurrences] == [timedelta(days=d) for d in (0, 7, 14)]
+
+
+def test_materialize_and_cancel_occurrences(db_url):
+    # Arrange
+    first = schedule_weekly(utcnow() + timedelta(days=1), rrule="FREQ=WEEKLY;COUNT=3")
+    crud.enroll_player(first.id, 2, "anna")
+    second, third = [game for game in crud.get_scheduled_games() if game.id is None]
+
+    # Act
+    game_id = crud.materialize_occurrence(second.key)
+    again = crud.materialize_occurrence(second.key)
+    status = crud.enroll_player(game_id, 3, "boris")
+    crud.cancel_occurrence(third.key)
+    crud.cancel_occurrence(first.key)
+
+    # Assert
+    assert game_id == again and status == crud.EnrollmentStatus.JOINED
+    assert [game.id for game in crud.get_scheduled_games()] == [game_id]
+    assert [user_id for user_id, _ in crud.get_players(game_id)] == [1, 2, 3]
+    assert crud.materialize_occurrence(third.key) is None
+
+
+def test_player_who_left_a_series_is_not_enrolled_again(db_url):
+    # Arrange
+    first = schedule_weekly(utcnow() + timedelta(days=1))
+    crud.enroll_player(first.id, 2, "anna")
+    crud.enroll_player(first.id, 3, "boris")
+    second_id = crud.materialize_occurrence(crud.get_scheduled_games()[1].key)
+
+    # Act
+    left, _ = crud.leave_game(second_id, 2)
+    third = crud.get_scheduled_games()[2]
+
+    # Assert
+    assert left
+    assert [user_id for user_id, _ in crud.get_players(second_id)] == [1, 3]
+    assert [user_id for user_id, _ in crud.get_players(first.id)] == [1, 2, 3]
+    assert third.id is None and third.players == ((1, "host"), (3, "boris"))
+
+
+def test_materialized_occurrence_waitlists_players_beyond_its_seats(db_url):
+    # Arrange
+    game = crud.add_game("Кодовые имена", 2, 2)
+    first = crud.schedule_game(
+        game.id, utcnow() + timedelta(days=1), initiator_id=1, nickname="host", use_steam=False,
+        server_password=None, serverdata=None, room=1, repeat_weekly=True,
+    )
+    crud.set_game_capacity(first.id, 3)
+    crud.enroll_player(first.id, 2, "anna")
+    crud.enroll_player(first.id, 3, "boris")
+
+    # Act
+    game_id = crud.materialize_occurrence(crud.get_scheduled_games()[1].key)
+
+    # Assert
+    assert [user_id for user_id, _ in crud.get_players(game_id)] == [1, 2]
+    assert [player.user_id for player in crud.get_waitlist(game_id)] == [3]
+
+
+def test_delete_series_removes_every_occurrence(db_url):
+    # Arrange
+    first = schedule_weekly(utcnow() + timedelta(days=1))
+    crud.materialize_occurrence(crud.get_scheduled_games()[1].key)
+
+    # Act
+    deleted = crud.delete_series(first.series_id)
+
+    # Assert
+    assert deleted == 2
+    assert crud.get_scheduled_games() == []
+
+
+def test_migrate_game_trees_groups_legacy_series(db_url):
+    # Arrange
+    engine = database.get_engine()
+    with engine.begin() as connection:
+        connection.execute(text('ALTER TABLE scheduled_games ADD COLUMN repweekly BOOLEAN'))
+        connection.execute(text('ALTER TABLE scheduled_games ADD COLUMN "PGID" INTEGER'))
+        connection.execute(text('ALTER TABLE scheduled_games ADD COLUMN "GameTree" TEXT'))
+        connection.execute(text(
+            'INSERT INTO scheduled_games (id, game_id, datetime, repweekly, "PGID", "GameTree") VALUES '
+            "(1, 1, '2024-01-01 19:00:00', 1, NULL, '1,2,3'), (2, 1, '2024-01-08 19:00:00', 1, 1, '1,2,3'), "
+            "(3, 1, '2024-01-15 19:00:00', 1, 2, '1,2,3'), (4, 2, '2024-01-02 18:00:00', 1, NULL, '4'), "
+            "(5, 2, '2024-01-03 18:00:00', 0, NULL, NULL)"
+        ))
+
+    # Act
+    created = migrate_game_trees(engine)
+    repeated = migrate_game_trees(engine)
+
+    # Assert
+    with engine.connect() as connection:
+        series = dict(connection.execute(text("SELECT id, series_id FROM scheduled_games")).all())
+        dtstart = connection.execute(text("SELECT dtstart FROM game_series WHERE id = :id"), {"id": series[1]}).scalar()
+    assert (created, repeated) == (2, 0)
+    assert series[1] == series[2] == series[3] != series[4]
+    assert series[5] is None
+    assert str(dtstart).startswith("2024-01-01 16:00")  # 19:00 in Moscow
@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+
+from tablettop_bot.db import crud, database, synthetic
+from tablettop_bot.db.models import Game, GamePlayer, ScheduledGame
+
+SCALE = synthetic.Scale(users=50, games=10, series=3, scheduled_games=20, archived_games=30, events=200)
+NOW = datetime(2026, 1, 5, 12, tzinfo=timezone.utc)
+
+
+def snapshot():
+    with database.get_session() as db:
+        return (
+            db.execute(select(Game.name, Game.max_players).order_by(Game.id)).all(),
+            db.execute(select(ScheduledGame.id, ScheduledGame.datetime).order_by(ScheduledGame.id)).all(),
+            db.execute(select(GamePlayer.scheduled_game_id, GamePlayer.user_id, GamePlayer.status)
+                       .order_by(GamePlayer.id)).all(),
+        )
+
+
+def test_same_seed_generates_same_rows(db_url, tmp_path, monkeypatch):
+    # Arrange
+    first = synthetic.generate(SCALE, seed=7, now=NOW)
+    rows = snapshot()
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite:///{tmp_path / 'second.db'}")
+    database.create_tables()
+
+    # Act
+    second = synthetic.generate(SCALE, seed=7, now=NOW)
+
+    # Assert
+    assert first.rows == second.rows
+    assert first.rows["scheduled_games"] == SCALE.series + SCALE.scheduled_games
+    assert snapshot() == rows
+
+
+def test_generated_games_respect_seats(db_url):
+    # Arrange
+    synthetic.generate(SCALE, seed=1, now=NOW)
+
+    # Act
+    with database.get_session() as db:
+        overbooked = db.scalar(
+            select(func.count()).select_from(
+                select(GamePlayer.scheduled_game_id).join(ScheduledGame).join(Game)
+                .where(GamePlayer.status == crud.PlayerStatus.JOINED.value)
+                .group_by(GamePlayer.scheduled_game_id, Game.max_players)
+                .having(func.count() > Game.max_players).subquery()
+            )
+        )
+        hosts = db.scalar(
+            select(func.count()).select_from(ScheduledGame).join(
+                GamePlayer, (GamePlayer.scheduled_game_id == ScheduledGame.id)
+                & (GamePlayer.user_id == ScheduledGame.initiator_id)
+            )
+        )
+
+    # Assert
+    assert overbooked == 0
+    assert hosts == SCALE.series + SCALE.scheduled_games
@@ -0,0 +1,58 @@
+from tablettop_bot.db import crud
+from tablettop_bot.db.models import User
+from tablettop_bot.db.read_models import UserRow
+
+
+def test_username_lookup_ignores_case_and_at_sign(db_url):
+    # Arrange
+    crud.create_user(1, username="AnnaK")
+    crud.create_user(2, username="annabel")
+    crud.create_user(3, username="boris")
+
+    # Act
+    found = crud.read_user_by_username("@annak")
+    candidates = crud.search_users_by_username("ANNA")
+
+    # Assert
+    assert found.id == 1
+    assert [(row.id, row.username) for row in candidates] == [(2, "annabel"), (1, "AnnaK")]
+    assert crud.search_users_by_username("@") == []
+
+
+def test_username_search_matches_underscores_literally(db_url):
+    # Arrange
+    crud.create_user(1, username="anna_k")
+    crud.create_user(2, username="annaxk")
+
+    # Act
+    candidates = crud.search_users_by_username("Anna_")
+
+    # Assert
+    assert [row.id for row in candidates] == [1]
+
+
+def test_iter_users_streams_selected_columns(db_url):
+    # Arrange
+    for user_id in range(1, 6):
+        crud.create_user(user_id, username=f"player{user_id}", lang="ru")
+
+    # Act
+    rows = list(crud.iter_users(User.id, batch_size=2))
+    default_rows = list(crud.iter_users())
+
+    # Assert
+    assert rows == [(user_id,) for user_id in range(1, 6)]
+    assert default_rows[0] == (1, "ru")
+
+
+def test_touch_user_creates_then_updates_read_only_row(db_url):
+    # Arrange
+    created = crud.touch_user(7, username="anna", first_name="Anna")
+
+    # Act
+    touched = crud.touch_user(7, username="anna_k")
+
+    # Assert
+    assert created == UserRow(7, "anna", "Anna", None, "en", "user", None)
+    assert touched == created._replace(username="anna_k")
+    assert crud.read_user(7).username == "anna_k"